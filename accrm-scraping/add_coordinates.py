@@ -1,79 +1,49 @@
 #!/usr/bin/env python3
 """
 Add coordinates to ACRRM training sites using geocoding.
-Uses Nominatim (OpenStreetMap) geocoding service with rate limiting.
+Uses Nominatim (OpenStreetMap) through geocoder's remote tier and geocode_cache.
 """
 
+import argparse
 import json
-import time
-import requests
 from typing import Dict, Optional, List
-import sys
 
-def geocode_address(address: str, city: str, state: str, postcode: str) -> Optional[Dict[str, float]]:
-    """
-    Geocode an address using Nominatim (OpenStreetMap).
-
-    Args:
-        address: Street address
-        city: City/suburb name
-        state: Australian state code
-        postcode: Postcode
-
-    Returns:
-        Dict with 'lat' and 'lng' keys, or None if geocoding failed
-    """
-    # Build query string
-    query_parts = []
-    if address:
-        query_parts.append(address)
-    if city:
-        query_parts.append(city)
-    if state:
-        query_parts.append(state)
-    if postcode:
-        query_parts.append(postcode)
-    query_parts.append("Australia")
-
-    query = ", ".join(query_parts)
-
-    # Nominatim API endpoint
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        'q': query,
-        'format': 'json',
-        'limit': 1,
-        'countrycodes': 'au'
-    }
-    headers = {
-        'User-Agent': 'ACRRM-Training-Map/1.0 (Educational Use)'
-    }
-
-    try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        results = response.json()
-
-        if results and len(results) > 0:
-            lat = float(results[0]['lat'])
-            lng = float(results[0]['lon'])
-            return {'lat': lat, 'lng': lng}
-        else:
-            # Try with just city, state, postcode if full address fails
-            if address:
-                simpler_query = f"{city}, {state} {postcode}, Australia"
-                params['q'] = simpler_query
-                response = requests.get(url, params=params, headers=headers, timeout=10)
-                results = response.json()
-                if results and len(results) > 0:
-                    lat = float(results[0]['lat'])
-                    lng = float(results[0]['lon'])
-                    return {'lat': lat, 'lng': lng}
-            return None
-
-    except Exception as e:
-        print(f"Error geocoding '{query}': {e}", file=sys.stderr)
-        return None
+import dataset_store
+import geocode_async
+import geocode_cache
+import geocoder
+import paths
+from site_journal import GEOCODE_FIELDS, SiteJournal, journal_for
+
+def geocode_site(site: Dict) -> Optional[geocoder.Candidate]:
+    """Geocode a site's address, then its locality, with Nominatim (None if neither is found)"""
+    return geocoder.TIER_FUNCTIONS['remote'](site)
+
+def apply_coords(site: Dict, candidate: Optional[geocoder.Candidate]) -> bool:
+    """Store a geocoding result on a site, or mark it failed at its state capital; returns success"""
+    geocoder.apply(site, candidate or geocoder.fallback(site))
+    return candidate is not None
+
+def queries_attempted(site: Dict, candidate: Optional[geocoder.Candidate]) -> int:
+    """Queries geocode_site tried for a site: up to the one that found it, else all of them"""
+    kinds = [kind for _, kind in geocoder.site_queries(site)]
+    return kinds.index(candidate.detail) + 1 if candidate else len(kinds)
+
+def site_query(site: Dict) -> str:
+    return geocoder.site_queries(site)[0][0]
+
+def prefetch_sites(sites: List[Dict]):
+    """Geocode the queries of every site without coordinates ahead of the serial loop"""
+    pending = [site for site in sites if not ('lat' in site and 'lng' in site)]
+    geocode_async.prefetch(site_query(site) for site in pending)
+
+    # Then the simpler queries the loop will fall back to for addresses that found nothing
+    geocode_async.prefetch(
+        query
+        for site in pending
+        if geocode_cache.lookup(site_query(site)) == (True, None)
+        for query, _ in geocoder.site_queries(site)[1:]
+    )
 
 def add_coordinates_to_sites(input_file: str, output_file: str):
     """
@@ -90,6 +60,14 @@ def add_coordinates_to_sites(input_file: str, output_file: str):
 
     print(f"Found {len(sites)} sites")
 
+    # Results are journaled per site, so an interrupted run resumes where it stopped
+    journal = SiteJournal(journal_for(output_file))
+    resumed = journal.replay(sites)
+    if resumed:
+        print(f"Resuming: {resumed} sites restored from {journal.filename}")
+
+    prefetch_sites(sites)
+
     # Process each site
     successful = 0
     failed = 0
@@ -104,51 +82,125 @@ def add_coordinates_to_sites(input_file: str, output_file: str):
         # Geocode
         print(f"[{i}/{len(sites)}] Geocoding {site['name']} in {site.get('city', 'Unknown')}, {site.get('state', 'Unknown')}...")
 
-        coords = geocode_address(
-            site.get('address', ''),
-            site.get('city', ''),
-            site.get('state', ''),
-            site.get('postcode', '')
-        )
-
-        if coords:
-            site['lat'] = coords['lat']
-            site['lng'] = coords['lng']
-            print(f"  ✓ Success: {coords['lat']}, {coords['lng']}")
+        candidate = geocode_site(site)
+
+        if apply_coords(site, candidate):
+            print(f"  ✓ Success: {candidate.lat}, {candidate.lng}")
             successful += 1
         else:
             print(f"  ✗ Failed to geocode")
             failed += 1
-            # Set default coordinates for Australian center so site still appears
-            site['lat'] = -25.2744
-            site['lng'] = 133.7751
-            site['geocoding_failed'] = True
 
-        # Rate limiting - Nominatim allows 1 request per second
-        if i < len(sites):  # Don't sleep after last item
-            time.sleep(1.1)  # Slightly over 1 second to be safe
-
-        # Save progress every 50 sites
-        if i % 50 == 0:
-            print(f"\nSaving progress... ({successful} successful, {failed} failed so far)")
-            with open(output_file, 'w') as f:
-                json.dump(sites, f, indent=2)
+        # Checkpoint this site's result (O(1), unlike rewriting the whole file)
+        journal.record(i - 1, site, GEOCODE_FIELDS)
 
     # Save final results
     print(f"\n{'='*60}")
     print(f"Geocoding complete!")
     print(f"Successful: {successful}/{len(sites)} ({successful/len(sites)*100:.1f}%)")
     print(f"Failed: {failed}/{len(sites)} ({failed/len(sites)*100:.1f}%)")
+    print(geocode_cache.summary())
     print(f"\nSaving to {output_file}...")
 
-    with open(output_file, 'w') as f:
-        json.dump(sites, f, indent=2)
+    journal.compact(sites, output_file)
+
+    print("Done!")
+
+def add_coordinates_batch(input_file: str, output_file: str, seed: Optional[str] = None):
+    """
+    Add coordinates to all sites, geocoding each distinct address only once.
+
+    Sites without coordinates are grouped by their normalized query first
+    (the same key geocode_cache uses), so sites sharing an address cost one
+    lookup between them, and the result is fanned back out to every site in
+    the group.
+
+    Args:
+        input_file: Path to input JSON file
+        output_file: Path to output JSON file
+        seed: dataset_store partition whose coordinates unchanged sites reuse
+    """
+    print(f"Loading sites from {input_file}...")
+    with open(input_file, 'r') as f:
+        sites = json.load(f)
+
+    journal = SiteJournal(journal_for(output_file))
+    resumed = journal.replay(sites)
+    if resumed:
+        print(f"Resuming: {resumed} sites restored from {journal.filename}")
+
+    # Sites unchanged since they were stored keep their coordinates and aren't geocoded again
+    if seed:
+        seeded = dataset_store.seed_coordinates(seed, sites)
+        print(f"Reusing stored coordinates for {seeded} unchanged sites from the {seed} partition")
+
+    pending = [index for index, site in enumerate(sites) if not ('lat' in site and 'lng' in site)]
+
+    # Normalized query -> indexes of the sites sharing it, in file order of first appearance
+    groups: Dict[str, List[int]] = {}
+    for index in pending:
+        groups.setdefault(geocode_cache.normalize_query(site_query(sites[index])), []).append(index)
+
+    print(f"Found {len(sites)} sites, {len(pending)} without coordinates")
+    print(f"Unique queries: {len(groups)} ({len(pending) - len(groups)} duplicates coalesced)")
+
+    # Counted from here so the prefetch's requests are included in the report
+    requests_before = geocode_cache.stats['requests']
+    prefetch_sites(sites)
+
+    successful = 0
+    failed = 0
+    # Queries looked up here, once per group, vs by geocoding site by site (add_coordinates_to_sites)
+    batch_queries = 0
+    per_site_queries = 0
+
+    for i, group in enumerate(groups.values(), 1):
+        site = sites[group[0]]
+        print(f"[{i}/{len(groups)}] Geocoding {site.get('address', '')}, {site.get('city', 'Unknown')}, "
+              f"{site.get('state', 'Unknown')} for {len(group)} site(s)...")
+
+        candidate = geocode_site(site)
+        attempted = queries_attempted(site, candidate)
+        batch_queries += attempted
+        # Geocoding site by site would repeat these queries for every site in the group
+        per_site_queries += attempted * len(group)
+
+        for index in group:
+            if apply_coords(sites[index], candidate):
+                successful += 1
+            else:
+                failed += 1
+            journal.record(index, sites[index], GEOCODE_FIELDS)
+        if candidate:
+            print(f"  ✓ Success: {candidate.lat}, {candidate.lng}")
+        else:
+            print(f"  ✗ Failed to geocode")
+
+    requests_sent = geocode_cache.stats['requests'] - requests_before
+
+    print(f"\n{'='*60}")
+    print(f"Geocoding complete!")
+    if pending:
+        print(f"Successful: {successful}/{len(pending)} ({successful/len(pending)*100:.1f}%)")
+        print(f"Failed: {failed}/{len(pending)} ({failed/len(pending)*100:.1f}%)")
+    print(f"Queries: {batch_queries} looked up; site by site: {per_site_queries} "
+          f"(saved {per_site_queries - batch_queries} by coalescing)")
+    print(f"Requests sent: {requests_sent} (the other queries were answered by the geocode cache)")
+    print(geocode_cache.summary())
+    print(f"\nSaving to {output_file}...")
+
+    journal.compact(sites, output_file)
 
     print("Done!")
 
 if __name__ == "__main__":
-    input_file = "/Users/fergaltemple/acrrm-all-sites.json"
-    output_file = "/Users/fergaltemple/acrrm-all-sites-with-coords.json"
+    parser = argparse.ArgumentParser(description="Geocode ACRRM training sites with Nominatim")
+    parser.add_argument('--batch', action='store_true',
+                        help="Deduplicate queries across all sites and geocode each one once")
+    args = parser.parse_args()
+
+    input_file = paths.ACRRM_RAW
+    output_file = paths.ACRRM_GEOCODED
 
     print("ACRRM Training Sites - Coordinate Geocoding")
     print("=" * 60)
@@ -161,4 +213,7 @@ if __name__ == "__main__":
     print("=" * 60)
     print("\nStarting geocoding...")
 
-    add_coordinates_to_sites(input_file, output_file)
+    if args.batch:
+        add_coordinates_batch(input_file, output_file)
+    else:
+        add_coordinates_to_sites(input_file, output_file)
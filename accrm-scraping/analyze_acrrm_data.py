@@ -4,8 +4,10 @@
 import json
 from collections import Counter
 
+import paths
+
 # Load the data
-with open('/Users/fergaltemple/acrrm-all-sites.json', 'r', encoding='utf-8') as f:
+with open(paths.ACRRM_RAW, 'r', encoding='utf-8') as f:
     posts = json.load(f)
 
 print("=" * 70)
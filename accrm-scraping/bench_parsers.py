@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Parser benchmarks over the committed page snapshots.
+
+Runs each extractor repeatedly against its saved pages and reports
+records/sec, per-page latency percentiles and peak Python heap memory:
+
+    acrrm    scrape_acrrm.parse_page on page_source.html
+    anzca    scrape_anzca_v2.parse_state_page on the seven anzca_*_page.html
+    ranzcog  scrape_ranzcog.parse_ranzcog_page on ranzcog_page_source.html
+
+Results can be saved as a baseline (--save-baseline) and later runs
+compared against it; the script exits with status 1 if any benchmark's
+throughput drops by more than --threshold. Baselines are only comparable
+on the machine that recorded them.
+
+Peak memory is measured with tracemalloc in a separate pass, so it covers
+Python objects only, not memory allocated inside libxml2.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import html_backend
+import scrape_acrrm
+import scrape_anzca_v2
+import scrape_ranzcog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, 'bench_parsers_baseline.json')
+
+ANZCA_STATES = ['nsw', 'nt', 'qld', 'sa', 'tas', 'vic', 'wa']
+
+def _read(filename: str) -> str:
+    with open(os.path.join(HERE, filename), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def load_fixtures() -> Dict[str, List[Tuple[str, Callable[[str], list]]]]:
+    """Benchmark name -> list of (html, parse function taking a backend) per page"""
+    anzca_pages = []
+    for state in ANZCA_STATES:
+        html = _read(f'anzca_{state}_page.html')
+        parse = (lambda state_code: lambda html, backend: scrape_anzca_v2.parse_state_page(
+            html, state_code, '', backend=backend))(state.upper())
+        anzca_pages.append((html, parse))
+
+    return {
+        'acrrm': [(_read('page_source.html'), scrape_acrrm.parse_page)],
+        'anzca': anzca_pages,
+        'ranzcog': [(_read('ranzcog_page_source.html'),
+                     lambda html, backend: scrape_ranzcog.parse_ranzcog_page(html, '', backend=backend))],
+    }
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_benchmark(pages, backend: str, iterations: int) -> Dict:
+    """Time `iterations` passes over the pages, then measure one pass's peak memory"""
+    # Warm up caches (compiled XPaths, regexes, imports)
+    for html, parse in pages:
+        parse(html, backend)
+
+    latencies = []
+    records = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for html, parse in pages:
+            page_started = time.perf_counter()
+            records += len(parse(html, backend))
+            latencies.append(time.perf_counter() - page_started)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for html, parse in pages:
+        parse(html, backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'pages': len(latencies),
+        'records': records,
+        'records_per_sec': records / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p90_ms': percentile(latencies, 90) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'peak_mem_kb': peak / 1024,
+    }
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return a message for each benchmark whose throughput regressed"""
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]['records_per_sec']
+        after = result['records_per_sec']
+        if after < before * (1 - threshold):
+            regressions.append(f"{key}: {after:,.0f} records/sec vs baseline {before:,.0f} "
+                               f"({(after / before - 1) * 100:+.1f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the page parsers on the committed HTML snapshots")
+    parser.add_argument('--iterations', type=int, default=20,
+                        help="Passes over each benchmark's pages (default: 20)")
+    parser.add_argument('--backend', action='append', choices=sorted(html_backend.BACKENDS),
+                        help="Parser backend to run (repeatable; default: all available)")
+    parser.add_argument('--only', action='append', choices=['acrrm', 'anzca', 'ranzcog'],
+                        help="Benchmark to run (repeatable; default: all)")
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help="Baseline results file (default: bench_parsers_baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed throughput drop before failing, as a fraction (default: 0.2)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    backends = args.backend or sorted(html_backend.BACKENDS)
+    names = args.only or sorted(fixtures)
+
+    print("Parser Benchmarks")
+    print("=" * 100)
+    print(f"{'benchmark':<20} {'pages':>6} {'records':>8} {'records/sec':>12} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'peak KB':>10}")
+    print("-" * 100)
+
+    results = {}
+    for name in names:
+        for backend in backends:
+            key = f"{name}/{backend}"
+            result = run_benchmark(fixtures[name], backend, args.iterations)
+            results[key] = result
+            print(f"{key:<20} {result['pages']:>6} {result['records']:>8} {result['records_per_sec']:>12,.0f} "
+                  f"{result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                  f"{result['peak_mem_kb']:>10,.0f}")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one.")
+        return
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nThroughput regressed by more than {args.threshold * 100:.0f}%:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+
+    print(f"\nNo throughput regressions beyond {args.threshold * 100:.0f}% of baseline.")
+
+if __name__ == "__main__":
+    main()
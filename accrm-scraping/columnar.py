@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Compact columnar encoding of the published training sites.
+
+training-sites-full.json repeats every key in every record and long
+strings ("Organisation: The Australian College of Rural and Remote
+Medicine | ...", rotation names) hundreds of times. The columnar form
+stores one column per field and every string once, in a shared table
+ordered by frequency, so the common strings get the shortest indices:
+
+    {
+      "format": "training-sites-columnar", "version": 1, "count": 1074,
+      "strings": ["Core Generalist Training", ...],
+      "coordScale": 100000,
+      "columns": {
+        "name":          {"kind": "text",   "values": ["Bass House Surgery", ...]},
+        "type":          {"kind": "string", "values": [2, 2, -1, ...]},
+        "lat":           {"kind": "coord",  "values": [-4105056, ...]},
+        "mmm":           {"kind": "int",    "values": [3, null, ...]},
+        "rotations":     {"kind": "set",    "vocab": [3, 9, ...], "values": [1, 5, -1, ...]},
+        "trainingTypes": {"kind": "list",   "values": [[0, 4], null, ...]},
+        "source":        {"kind": "string", "rows": [921, ...], "values": [40, ...]},
+        "geocoding_failed": {"kind": "flag", "rows": [1021, ...]},
+        ...
+      },
+      "index": {...}
+    }
+
+Column kinds, with how a missing field is encoded:
+
+    string  index into strings (-1)
+    text    the string itself (null), for mostly unique strings such as names
+    coord   degrees * coordScale rounded, about a metre (null)
+    int     the integer (null)
+    set     bitmask over vocab, the column's values as string indices (-1);
+            only used when every list is in vocab order without repeats,
+            so decoding gives back the lists as they were
+    list    list of string indices (null)
+    flag    rows where the field is true (all others lack it)
+    json    the value as is (null), for anything else
+
+A column present in fewer than half the sites is sparse: "rows" lists the
+sites that have the field and "values" holds only theirs. "index" is the
+sites' filter bitmaps (filter_index.py), so the app gets them in the same
+request.
+
+src/utils/siteData.js decodes it in the browser; decode() here does the
+same, giving back the sites as published except that coordinates are
+rounded to 1/coordScale degree. A missing field and a null one decode the
+same way, as absent.
+
+    python columnar.py ../public/data/training-sites-full.json
+"""
+
+import argparse
+import gzip
+import json
+import os
+from collections import Counter
+from typing import Dict, List, Optional
+
+import filter_index
+
+FORMAT = 'training-sites-columnar'
+VERSION = 1
+
+COORD_FIELDS = ('lat', 'lng')
+COORD_SCALE = 100000
+
+# Set columns hold at most this many values, so masks stay within JavaScript's 32-bit bitwise operators
+MAX_SET_SIZE = 31
+
+def columnar_file_for(json_file: str) -> str:
+    """Columnar artifact published next to a sites JSON file"""
+    return os.path.splitext(json_file)[0] + '.columnar.json'
+
+def _column_kind(field: str, values: List) -> str:
+    present = [value for value in values if value is not None]
+    if field in COORD_FIELDS and all(isinstance(value, (int, float)) for value in present):
+        return 'coord'
+    if all(value is True for value in present):
+        return 'flag'
+    if all(isinstance(value, str) for value in present):
+        # Indexing strings that hardly repeat only adds the index
+        return 'text' if len(set(present)) * 2 > len(present) else 'string'
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return 'int'
+    if all(isinstance(value, list) and all(isinstance(item, str) for item in value) for value in present):
+        distinct = {item for value in present for item in value}
+        return 'set' if len(distinct) <= MAX_SET_SIZE else 'list'
+    return 'json'
+
+def _set_vocab(values: List, index: Dict[str, int]) -> Optional[List[str]]:
+    """A set column's vocab, most frequent first, or None if masks over it would lose list order or repeats"""
+    vocab = sorted({item for value in values if value is not None for item in value}, key=index.get)
+    position = {item: i for i, item in enumerate(vocab)}
+    for value in values:
+        if value is not None and [position[item] for item in value] != sorted({position[item] for item in value}):
+            return None
+    return vocab
+
+def encode(sites: List[Dict]) -> Dict:
+    """The columnar form of a list of sites"""
+    fields = list(dict.fromkeys(field for site in sites for field in site))
+    columns = {field: [site.get(field) for site in sites] for field in fields}
+    kinds = {field: _column_kind(field, values) for field, values in columns.items()}
+
+    # One string table for every string and list column, most frequent first
+    counts = Counter()
+    for field, values in columns.items():
+        if kinds[field] == 'string':
+            counts.update(value for value in values if value is not None)
+        elif kinds[field] in ('set', 'list'):
+            counts.update(item for value in values if value is not None for item in value)
+    strings = sorted(counts, key=lambda value: -counts[value])
+    index = {value: i for i, value in enumerate(strings)}
+
+    encoded = {}
+    for field, values in columns.items():
+        kind = kinds[field]
+        column = {'kind': kind}
+        rows = [row for row, value in enumerate(values) if value is not None]
+        if kind == 'flag':
+            column['rows'] = rows
+            encoded[field] = column
+            continue
+        if len(rows) * 2 < len(values):
+            column['rows'] = rows
+            values = [values[row] for row in rows]
+
+        vocab = _set_vocab(values, index) if kind == 'set' else None
+        if kind == 'set' and vocab is None:
+            kind = column['kind'] = 'list'
+
+        if kind == 'coord':
+            column['values'] = [None if value is None else round(value * COORD_SCALE) for value in values]
+        elif kind == 'string':
+            column['values'] = [-1 if value is None else index[value] for value in values]
+        elif kind == 'set':
+            bit = {item: 1 << i for i, item in enumerate(vocab)}
+            column['vocab'] = [index[item] for item in vocab]
+            column['values'] = [-1 if value is None else sum(bit[item] for item in set(value)) for value in values]
+        elif kind == 'list':
+            column['values'] = [None if value is None else [index[item] for item in value] for value in values]
+        else:
+            column['values'] = values
+        encoded[field] = column
+
+    return {'format': FORMAT, 'version': VERSION, 'count': len(sites), 'strings': strings,
+            'coordScale': COORD_SCALE, 'columns': encoded, 'index': filter_index.build(sites)}
+
+def decode(data: Dict) -> List[Dict]:
+    """Sites from their columnar form"""
+    if data.get('format') != FORMAT or data.get('version') != VERSION:
+        raise ValueError(f"Not a version {VERSION} {FORMAT} file")
+
+    strings = data['strings']
+    sites = [{} for _ in range(data['count'])]
+    for field, column in data['columns'].items():
+        kind = column['kind']
+        if kind == 'flag':
+            for row in column['rows']:
+                sites[row][field] = True
+            continue
+        if kind == 'set':
+            vocab = [strings[i] for i in column['vocab']]
+        rows = column.get('rows', range(len(sites)))
+        for row, value in zip(rows, column['values']):
+            if value is None or (value == -1 and kind in ('string', 'set')):
+                continue
+            if kind == 'coord':
+                value = value / data['coordScale']
+            elif kind == 'string':
+                value = strings[value]
+            elif kind == 'set':
+                # Encoded lists were in vocab order, so this is their original order
+                value = [item for bit, item in enumerate(vocab) if value >> bit & 1]
+            elif kind == 'list':
+                value = [strings[i] for i in value]
+            sites[row][field] = value
+    return sites
+
+def dumps(data: Dict) -> bytes:
+    """Serialization of the columnar form, without whitespace"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the compact columnar form of a sites JSON file")
+    parser.add_argument('input_file', help="Sites JSON file")
+    parser.add_argument('--output', help="Columnar JSON file (default: <input>.columnar.json)")
+    args = parser.parse_args()
+
+    with open(args.input_file, 'rb') as f:
+        source = f.read()
+    sites = json.loads(source)
+
+    data = dumps(encode(sites))
+    output_file = args.output or columnar_file_for(args.input_file)
+    with open(output_file, 'wb') as f:
+        f.write(data)
+
+    for label, raw in (('JSON', source), ('Columnar', data)):
+        print(f"{label:>8}: {len(raw):>8,} bytes, {len(gzip.compress(raw, 9)):>7,} gzipped")
+    print(f"{len(source) / len(data):.1f}x smaller; saved {len(sites)} sites to {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Resumable crawl journal for paginated scrapes.
+
+An append-only NDJSON file with one line per page attempt, keyed by the
+page's start_rank and recording the page size it was fetched with:
+
+    {"start_rank": 11, "num_ranks": 10, "status": "done", "sha256": "...", "posts": [...]}
+    {"start_rank": 21, "num_ranks": 10, "status": "failed", "error": "..."}
+
+The latest line for a start_rank wins; a page only counts as completed for
+the page size it was fetched with. A restarted crawl replays completed
+pages from the journal and only fetches pages that are missing or failed.
+Once a crawl completes without failed pages the scraper clears the
+journal, so completed pages are never replayed into a later crawl.
+Lines are fsynced as they are written, and a line truncated by a crash is
+ignored on load.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+class CrawlJournal:
+    """Append-only record of which result pages completed, and their posts"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        # start_rank -> latest entry without its posts; done entries keep the
+        # file offset of their line so posts are re-read only when replayed
+        self.pages: Dict[int, Dict] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.filename):
+            return
+
+        with open(self.filename, 'rb') as f:
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partial line from an interrupted write
+
+                entry.pop('posts', None)
+                entry['offset'] = offset
+                self.pages[entry['start_rank']] = entry
+
+    def _append(self, entry: Dict) -> int:
+        with open(self.filename, 'ab') as f:
+            offset = f.tell()
+            f.write((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        return offset
+
+    def is_done(self, start_rank: int, num_ranks: int = 10) -> bool:
+        entry = self.pages.get(start_rank)
+        return (entry is not None and entry['status'] == 'done'
+                and entry.get('num_ranks', 10) == num_ranks)
+
+    def content_hash(self, start_rank: int) -> Optional[str]:
+        entry = self.pages.get(start_rank)
+        return entry.get('sha256') if entry else None
+
+    def posts(self, start_rank: int) -> List[Dict]:
+        """Posts recorded for a completed page"""
+        entry = self.pages[start_rank]
+        with open(self.filename, 'rb') as f:
+            f.seek(entry['offset'])
+            return json.loads(f.readline())['posts']
+
+    def failed(self) -> List[int]:
+        """start_ranks whose latest attempt failed"""
+        return sorted(rank for rank, entry in self.pages.items() if entry['status'] == 'failed')
+
+    def record_done(self, start_rank: int, content_hash: str, posts: List[Dict], num_ranks: int = 10):
+        entry = {'start_rank': start_rank, 'num_ranks': num_ranks, 'status': 'done',
+                 'sha256': content_hash, 'posts': posts}
+        offset = self._append(entry)
+        del entry['posts']
+        entry['offset'] = offset
+        self.pages[start_rank] = entry
+
+    def record_failed(self, start_rank: int, error: Exception, num_ranks: int = 10):
+        entry = {'start_rank': start_rank, 'num_ranks': num_ranks, 'status': 'failed', 'error': str(error)}
+        offset = self._append(entry)
+        entry['offset'] = offset
+        self.pages[start_rank] = entry
+
+    def reset(self):
+        """Forget every page and start a fresh journal"""
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+        self.pages = {}
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Source-partitioned store of training sites.
+
+The canonical data is kept per college, one partition file each under
+data/sources/, with a manifest recording every partition's content hash
+and record count:
+
+    data/sources/manifest.json
+    data/sources/acrrm.json
+    data/sources/ranzcog.json
+    data/sources/anzca.json
+
+put() validates a source's sites once, on the way in, and rewrites its
+partition only if the content changed. The published
+public/data/training-sites-full.json is a derived artifact: publish()
+compares the manifest's hashes with those of the last build and does
+nothing if none changed, without opening a partition. When some did, the
+partitions are merged with site_merge, reusing the stored match scores of
+every pair of unchanged partitions, so a RANZCOG refresh only re-scores
+the pairs involving RANZCOG and never re-validates ACRRM (stored scores
+are dropped when site_merge.SCORE_VERSION changes). The compact
+columnar form the app loads (columnar.py) is published next to it.
+
+    python dataset_store.py put ranzcog ranzcog-sites-geocoded.json
+    python dataset_store.py publish
+    python dataset_store.py status
+"""
+
+import argparse
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import columnar
+import paths
+import site_merge
+from site_journal import GEOCODE_FIELDS
+
+STORE_DIR = os.environ.get('DATASET_STORE_DIR', paths.SOURCES_DIR)
+PUBLISHED_FILE = paths.PUBLISHED
+
+MANIFEST = 'manifest.json'
+# Held while the manifest is read and rewritten, by threads and processes alike
+MANIFEST_LOCK = 'manifest.lock'
+# Hashes and match scores of the last publish; derived, so not tracked
+BUILD_STATE = 'build-state.json'
+
+# Merge priority of the known colleges; new sources go after them
+SOURCE_ORDER = ('acrrm', 'ranzcog', 'anzca')
+
+# Fields that decide where a site is geocoded (its geocoding results are GEOCODE_FIELDS)
+LOCATION_FIELDS = ('name', 'address', 'city', 'state', 'postcode')
+
+# Sites must sit within this box (lat, lng) around Australia and its territories
+BOUNDS = ((-55.0, -9.0), (105.0, 170.0))
+
+def _path(name: str) -> str:
+    return os.path.join(STORE_DIR, name)
+
+def _read_json(filename: str, default=None):
+    if not os.path.exists(filename):
+        return default
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+def _write_atomic(filename: str, data: bytes):
+    # A unique temp file per writer, so concurrent writes never share one
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)),
+                                    prefix=f"{os.path.basename(filename)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, filename)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+
+_thread_lock = threading.Lock()
+
+@contextlib.contextmanager
+def _manifest_locked():
+    """Exclusive access to the manifest (flock alone doesn't exclude threads sharing a process)"""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with _thread_lock, open(_path(MANIFEST_LOCK), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _encode(data) -> bytes:
+    """Serialization used for partitions and the published file (hashed as written)"""
+    return json.dumps(data, indent=2).encode('utf-8')
+
+def load_manifest() -> Dict:
+    return _read_json(_path(MANIFEST), {'partitions': {}})
+
+def partition_order(manifest: Dict) -> List[str]:
+    """Partition names in merge priority order"""
+    names = list(manifest['partitions'])
+    return sorted(names, key=lambda name: (SOURCE_ORDER.index(name) if name in SOURCE_ORDER else len(SOURCE_ORDER),
+                                           names.index(name)))
+
+def validate(sites: List[Dict]) -> List[str]:
+    """Problems with a source's sites, empty if they are fine to store"""
+    problems = []
+    (min_lat, max_lat), (min_lng, max_lng) = BOUNDS
+    for i, site in enumerate(sites):
+        label = f"site {i} ({site.get('name')!r})"
+        if not isinstance(site.get('name'), str) or not site['name'].strip():
+            problems.append(f"{label}: missing name")
+        lat, lng = site.get('lat'), site.get('lng')
+        if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+            problems.append(f"{label}: missing coordinates")
+        elif not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+            problems.append(f"{label}: coordinates {lat}, {lng} outside Australia")
+        training_types = site.get('trainingTypes', [])
+        if not isinstance(training_types, list) or not all(isinstance(t, str) for t in training_types):
+            problems.append(f"{label}: trainingTypes is not a list of strings")
+    return problems
+
+def put(name: str, sites: List[Dict]) -> bool:
+    """
+    Store a source's sites as its partition.
+
+    Returns:
+        True if the partition changed
+
+    Raises:
+        ValueError: If the sites fail validation (nothing is stored)
+    """
+    problems = validate(sites)
+    if problems:
+        raise ValueError(f"{len(problems)} invalid sites in {name}: " + '; '.join(problems[:5]))
+
+    data = _encode(sites)
+    digest = hashlib.sha256(data).hexdigest()
+    with _manifest_locked():
+        manifest = load_manifest()
+        entry = manifest['partitions'].get(name)
+        if entry and entry['sha256'] == digest:
+            return False
+
+        _write_atomic(_path(f"{name}.json"), data)
+        manifest['partitions'][name] = {'file': f"{name}.json", 'sha256': digest, 'records': len(sites)}
+        _write_atomic(_path(MANIFEST), _encode(manifest))
+    return True
+
+def partition_file(name: str) -> str:
+    """Path of a partition's file"""
+    return _path(load_manifest()['partitions'][name]['file'])
+
+def load(name: str) -> List[Dict]:
+    """A partition's sites"""
+    return _read_json(partition_file(name))
+
+def seed_coordinates(name: str, sites: List[Dict]) -> int:
+    """
+    Give freshly scraped sites the stored coordinates of their unchanged
+    counterparts in a partition, so only new or moved sites are geocoded.
+
+    A site is unchanged if its LOCATION_FIELDS match a stored site's; sites
+    that already have coordinates are left alone. Stored failures are
+    copied too (geocoding_failed), for regeocode to retry.
+
+    Returns:
+        Number of sites given stored coordinates
+    """
+    if name not in load_manifest()['partitions']:
+        return 0
+    stored = {tuple(site.get(field) for field in LOCATION_FIELDS): site for site in load(name)}
+
+    seeded = 0
+    for site in sites:
+        if 'lat' in site and 'lng' in site:
+            continue
+        match = stored.get(tuple(site.get(field) for field in LOCATION_FIELDS))
+        if match is None or 'lat' not in match or 'lng' not in match:
+            continue
+        for field in GEOCODE_FIELDS:
+            if field in match:
+                site[field] = match[field]
+        seeded += 1
+    return seeded
+
+def _file_hash(filename: str) -> Optional[str]:
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def changed_partitions(output_file: str = PUBLISHED_FILE) -> Optional[List[str]]:
+    """
+    Partitions changed since output_file was last published.
+
+    Returns:
+        Their names, or None if output_file must be rebuilt from scratch
+        (never published, or edited since)
+    """
+    manifest = load_manifest()
+    state = _read_json(_path(BUILD_STATE), {})
+    if state.get('output') != os.path.abspath(output_file) or state.get('output_sha256') != _file_hash(output_file):
+        return None
+    if state.get('columnar_sha256') != _file_hash(columnar.columnar_file_for(output_file)):
+        return None
+    if state.get('score_version') != site_merge.SCORE_VERSION:
+        return None
+    built = state.get('partitions', {})
+    names = partition_order(manifest)
+    if list(built) != names:
+        return None
+    return [name for name in names if built[name] != manifest['partitions'][name]['sha256']]
+
+def publish(output_file: str = PUBLISHED_FILE, report_file: Optional[str] = None, force: bool = False) -> bool:
+    """
+    Rebuild the published dataset from the partitions if any changed.
+
+    Returns:
+        True if output_file was rewritten
+    """
+    changed = None if force else changed_partitions(output_file)
+    if changed == []:
+        print(f"{output_file} is up to date")
+        return False
+
+    # Partitions are read together with the manifest, so the hashes recorded below are theirs
+    with _manifest_locked():
+        manifest = load_manifest()
+        names = partition_order(manifest)
+        hashes = [manifest['partitions'][name]['sha256'] for name in names]
+        sources = [(name, _read_json(_path(manifest['partitions'][name]['file']))) for name in names]
+    state = _read_json(_path(BUILD_STATE), {})
+
+    # Match scores between partitions are keyed by both contents, so unchanged pairs are reused
+    reuse = not force and state.get('score_version') == site_merge.SCORE_VERSION
+    stored_scores = state.get('pair_scores', {}) if reuse else {}
+    pair_scores: Dict[Tuple[int, int], List] = {}
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            key = f"{hashes[i]}:{hashes[j]}"
+            if key in stored_scores:
+                pair_scores[(i, j)] = [tuple(entry) for entry in stored_scores[key]]
+    reused = len(pair_scores)
+
+    print(f"Publishing {', '.join(names)} ({'all' if changed is None else ', '.join(changed) or 'none'} changed)")
+    merged, report = site_merge.merge_sources(sources, pair_scores)
+    print(f"Reused match scores for {reused} of {len(pair_scores)} partition pairs; "
+          f"{len(report['matches'])} matches, {len(report['review'])} near misses, {len(merged)} sites")
+
+    data = _encode(merged)
+    _write_atomic(output_file, data)
+    columnar_data = columnar.dumps(columnar.encode(merged))
+    _write_atomic(columnar.columnar_file_for(output_file), columnar_data)
+    if report_file:
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    _write_atomic(_path(BUILD_STATE), json.dumps({
+        'output': os.path.abspath(output_file),
+        'output_sha256': hashlib.sha256(data).hexdigest(),
+        'columnar_sha256': hashlib.sha256(columnar_data).hexdigest(),
+        'partitions': dict(zip(names, hashes)),
+        'score_version': site_merge.SCORE_VERSION,
+        'pair_scores': {f"{hashes[i]}:{hashes[j]}": scores for (i, j), scores in pair_scores.items()},
+    }).encode('utf-8'))
+    print(f"Saved {output_file} ({len(data):,} bytes) and its columnar form ({len(columnar_data):,} bytes)")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-source dataset partitions and the published dataset built from them")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    put_parser = subparsers.add_parser('put', help="Store a source's sites JSON as its partition")
+    put_parser.add_argument('source', help="Source name, e.g. ranzcog")
+    put_parser.add_argument('input_file', help="Sites JSON file")
+
+    publish_parser = subparsers.add_parser('publish', help="Rebuild the published dataset if a partition changed")
+    publish_parser.add_argument('--output', default=PUBLISHED_FILE, help="Published JSON file")
+    publish_parser.add_argument('--report', help="Write the merge's match report to this JSON file")
+    publish_parser.add_argument('--force', action='store_true', help="Rebuild and re-score everything")
+
+    subparsers.add_parser('status', help="List partitions and whether the published dataset is current")
+    args = parser.parse_args()
+
+    if args.command == 'put':
+        with open(args.input_file, 'r') as f:
+            sites = json.load(f)
+        changed = put(args.source, sites)
+        print(f"{args.source}: {len(sites)} sites {'stored' if changed else 'unchanged'}")
+    elif args.command == 'publish':
+        publish(args.output, args.report, args.force)
+    else:
+        manifest = load_manifest()
+        for name in partition_order(manifest):
+            entry = manifest['partitions'][name]
+            print(f"  {name}: {entry['records']} sites, sha256 {entry['sha256'][:12]}")
+        changed = changed_partitions()
+        print("Published dataset: " + ('needs a full rebuild' if changed is None else
+                                       f"stale ({', '.join(changed)} changed)" if changed else 'up to date'))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Declarative field extraction shared by the college scrapers.
+
+A scraper describes what it extracts as a list of FieldRules, each naming a
+selector, an optional label prefix, a transform and a target field. Schema
+compiles those rules once:
+
+    - rules sharing a selector are grouped, so each group runs one
+      find_all per record and reads each element's text once
+    - prefix rules in a group become a dispatch table keyed by label
+      ("Post type:" -> rule), so each element costs one dict lookup instead
+      of a chain of startswith checks
+    - element text is cached per record, so two groups matching the same
+      elements (e.g. all <li> and the <li> inside a call-out) share it
+
+Selectors are paths of steps, where a step is a tag name, a list of tag
+names, or a (tag(s), class) tuple. Every step but the last takes the first
+match; the last step takes all matches. A selector of None means the record
+element itself. They run on html_backend Nodes, so any parser backend works.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import html_backend
+
+Step = Union[str, List[str], Tuple]
+Selector = Optional[Tuple[Step, ...]]
+
+class FieldRule(NamedTuple):
+    """
+    How to extract one field from a record.
+
+    field: Target field, or None if the transform returns a dict of fields
+        to merge into the record
+    selector: Path to the elements within the record (None: the record)
+    prefix: Label the element text must start with; the transform receives
+        the text after it. Rules without a prefix receive the whole text.
+    transform: Maps the text to the value; returning None skips it
+        (default: use the text as-is)
+    many: Use every matching element, collecting the values into a list
+        (or joining them, see `join`); otherwise only the first is used
+    join: Append each value to an existing string field with this separator
+    strip: Read text with get_text(strip=True) (otherwise raw get_text())
+    """
+    field: Optional[str]
+    selector: Selector = None
+    prefix: Optional[str] = None
+    transform: Optional[Callable[[str], Any]] = None
+    many: bool = False
+    join: Optional[str] = None
+    strip: bool = True
+
+class _RuleGroup:
+    """Rules that share a selector, compiled for a single pass over its matches"""
+
+    def __init__(self, selector: Selector, strip: bool):
+        self.selector = selector
+        self.strip = strip
+        self.labelled: Dict[str, FieldRule] = {}      # "Post type:" -> rule
+        self.prefixed: List[FieldRule] = []           # Prefixes without a ':' label
+        self.plain: List[FieldRule] = []              # Rules without a prefix
+
+    def add(self, rule: FieldRule):
+        if rule.prefix is None:
+            self.plain.append(rule)
+        elif rule.prefix.endswith(':') and ':' not in rule.prefix[:-1]:
+            self.labelled[rule.prefix] = rule
+        else:
+            self.prefixed.append(rule)
+
+    def dispatch(self, text: str) -> Tuple[Optional[FieldRule], str]:
+        """Find the prefix rule for an element's text, and the text after the prefix"""
+        head, colon, _ = text.partition(':')
+        if colon:
+            rule = self.labelled.get(head + colon)
+            if rule is not None:
+                return rule, text[len(rule.prefix):]
+
+        for rule in self.prefixed:
+            if text.startswith(rule.prefix):
+                return rule, text[len(rule.prefix):]
+
+        return None, text
+
+def _selector_key(selector: Selector) -> Optional[Tuple]:
+    """Hashable form of a selector (lists of tag names become tuples)"""
+    if selector is None:
+        return None
+    return tuple(('names', tuple(step)) if isinstance(step, list) else step for step in selector)
+
+def _step_args(step: Step) -> Tuple[Any, Optional[str]]:
+    if isinstance(step, tuple):
+        return step[0], step[1]
+    return step, None
+
+def select(node: html_backend.Node, selector: Selector) -> List[html_backend.Node]:
+    """Resolve a selector path against a node"""
+    if selector is None:
+        return [node]
+
+    for step in selector[:-1]:
+        name, class_ = _step_args(step)
+        node = node.find(name, class_=class_)
+        if node is None:
+            return []
+
+    name, class_ = _step_args(selector[-1])
+    return node.find_all(name, class_=class_)
+
+def _assign(record: Dict, rule: FieldRule, value: Any):
+    if value is None:
+        return
+    if rule.field is None:
+        record.update(value)
+    elif rule.join is not None and rule.field in record:
+        record[rule.field] += rule.join + value
+    else:
+        record[rule.field] = value
+
+class Schema:
+    """
+    Compiled set of FieldRules, applied to each record element of a page.
+
+    Args:
+        rules: FieldRules, applied in order of their selector's first use
+        records: Selector for the record elements of a page (optional if
+            only extract_record is used)
+        required: Fields a record must have (truthy) to be kept by extract()
+    """
+
+    def __init__(self, rules: Iterable[FieldRule], records: Selector = None,
+                 required: Tuple[str, ...] = ()):
+        self.records = records
+        self.required = required
+        self.groups: List[_RuleGroup] = []
+
+        by_key: Dict[Tuple, _RuleGroup] = {}
+        for rule in rules:
+            key = (_selector_key(rule.selector), rule.strip)
+            group = by_key.get(key)
+            if group is None:
+                group = _RuleGroup(rule.selector, rule.strip)
+                by_key[key] = group
+                self.groups.append(group)
+            group.add(rule)
+
+    def extract_record(self, node: html_backend.Node, record: Optional[Dict] = None) -> Dict:
+        """
+        Apply every rule to one record element.
+
+        Fields are written into `record` as they are extracted, so a caller
+        that passes its own dict keeps the fields extracted before an error.
+        """
+        if record is None:
+            record = {}
+        texts: Dict[Tuple[html_backend.Node, bool], str] = {}
+
+        def text_of(element, strip):
+            key = (element, strip)
+            text = texts.get(key)
+            if text is None:
+                text = element.get_text(strip=strip)
+                texts[key] = text
+            return text
+
+        for group in self.groups:
+            elements = select(node, group.selector)
+
+            if group.labelled or group.prefixed:
+                for element in elements:
+                    rule, value = group.dispatch(text_of(element, group.strip))
+                    if rule is not None:
+                        _assign(record, rule, rule.transform(value) if rule.transform else value)
+
+            for rule in group.plain:
+                if not rule.many:
+                    if elements:
+                        text = text_of(elements[0], group.strip)
+                        _assign(record, rule, rule.transform(text) if rule.transform else text)
+                    continue
+
+                values = []
+                for element in elements:
+                    text = text_of(element, group.strip)
+                    value = rule.transform(text) if rule.transform else text
+                    if value is None:
+                        continue
+                    if rule.join is not None:
+                        _assign(record, rule, value)
+                    else:
+                        values.append(value)
+                if values:
+                    _assign(record, rule, values)
+
+        return record
+
+    def extract(self, root: html_backend.Node) -> List[Dict]:
+        """Extract every record on a page, keeping those with all required fields"""
+        records = []
+        for node in select(root, self.records):
+            record = self.extract_record(node)
+            if all(record.get(field) for field in self.required):
+                records.append(record)
+        return records
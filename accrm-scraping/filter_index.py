@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Bitmap index of the sites for the app's filters.
+
+For every value of each filtered field (each training type, rotation, MMM
+level and site type) the index holds a bitset of the sites having it, bit
+i standing for site i. The app answers any filter combination with a few
+word-wise ORs (values within a filter) and ANDs (across filters) instead
+of scanning every site.
+
+Bitsets are little-endian 32-bit words, base64 encoded:
+
+    {"count": 1074, "fields": {
+        "trainingTypes": {"Core Generalist Training": "//8P...", ...},
+        "mmm": {"1": "AAAA...", ...},
+        ...
+    }}
+
+columnar.py embeds it in the published columnar file; src/utils/filterIndex.js
+reads it.
+
+    python filter_index.py ../public/data/training-sites-full.json
+"""
+
+import argparse
+import base64
+import json
+from typing import Dict, List
+
+# Fields the app filters on; list fields index each of their values
+FILTER_FIELDS = ('trainingTypes', 'rotations', 'mmm', 'type')
+
+def _encode_bits(bits: int, count: int) -> str:
+    words = (count + 31) // 32
+    return base64.b64encode(bits.to_bytes(words * 4, 'little')).decode('ascii')
+
+def decode_bits(encoded: str) -> int:
+    """A bitset as an int, bit i for site i"""
+    return int.from_bytes(base64.b64decode(encoded), 'little')
+
+def build(sites: List[Dict], fields=FILTER_FIELDS) -> Dict:
+    """The filter index of a list of sites"""
+    index = {}
+    for field in fields:
+        bitsets: Dict[str, int] = {}
+        for row, site in enumerate(sites):
+            value = site.get(field)
+            if value is None:
+                continue
+            for item in (value if isinstance(value, list) else [value]):
+                key = str(item)
+                bitsets[key] = bitsets.get(key, 0) | 1 << row
+        index[field] = {key: _encode_bits(bitsets[key], len(sites)) for key in sorted(bitsets)}
+    return {'count': len(sites), 'fields': index}
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the filter index of a sites JSON file")
+    parser.add_argument('input_file', help="Sites JSON file")
+    args = parser.parse_args()
+
+    with open(args.input_file, 'r') as f:
+        sites = json.load(f)
+
+    index = build(sites)
+    print(f"{index['count']} sites, {len(json.dumps(index, separators=(',', ':')))} bytes of index")
+    for field, bitsets in index['fields'].items():
+        print(f"\n{field}:")
+        for key, encoded in bitsets.items():
+            print(f"  {key}: {bin(decode_bits(encoded)).count('1')} sites")
+
+if __name__ == "__main__":
+    main()
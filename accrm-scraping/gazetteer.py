@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Offline gazetteer of Australian localities and postcodes.
+
+Loads a CSV of localities (locality, state, postcode, lat, lng) into
+compact parallel arrays, with hash indexes on (locality, state) and on
+postcode, so lookups need no network and take microseconds.
+
+The bundled australian_localities.csv holds the towns we used to hard-code
+in add_coordinates_fast plus the localities of every geocoded training
+site. Point GAZETTEER_FILE at a complete Australian postcode dataset to
+cover every locality; files using the common `long`/`longitude` and
+`latitude` column names load as-is.
+
+Most of the bundled rows are seeded from this project's own geocoded
+sites, so as a QA reference (regeocode.py's far check, spatial_qa.py's
+expected check) they only catch sites that disagree with the rest of
+their locality or postcode: a locality whose sites were all geocoded to
+the same wrong place is its own reference and passes. The checks are only
+independent of our geocodes with GAZETTEER_FILE pointing at an external
+dataset. To extend the bundled file from newly geocoded sites:
+
+    python gazetteer.py --add-sites acrrm-all-sites-with-coords.json
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import re
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+GAZETTEER_FILE = os.environ.get('GAZETTEER_FILE',
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'australian_localities.csv'))
+
+STATES = ('ACT', 'NSW', 'NT', 'QLD', 'SA', 'TAS', 'VIC', 'WA')
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+# Column name aliases accepted when loading
+COLUMNS = {
+    'locality': ('locality', 'suburb', 'name'),
+    'state': ('state',),
+    'postcode': ('postcode',),
+    'lat': ('lat', 'latitude'),
+    'lng': ('lng', 'long', 'lon', 'longitude'),
+}
+
+NO_POSTCODE = 0
+
+TOKEN_RE = re.compile(r"[A-Z0-9']+")
+
+# Abbreviations expanded before partial and fuzzy matching ("MT ISA" -> "MOUNT ISA")
+ABBREVIATIONS = {
+    'MT': 'MOUNT',
+    'ST': 'SAINT',
+    'PT': 'PORT',
+    'NTH': 'NORTH',
+    'STH': 'SOUTH',
+}
+
+# Fuzzy matches allow this many character edits at most
+MAX_EDIT_DISTANCE = 2
+
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def normalize_name(name: str) -> str:
+    """Locality names are matched upper-case with single spaces"""
+    return ' '.join(name.upper().split())
+
+def canonical_tokens(name: str) -> List[str]:
+    """Words of a name with punctuation dropped and abbreviations expanded"""
+    return [ABBREVIATIONS.get(token, token) for token in TOKEN_RE.findall(name.upper())]
+
+def _trigrams(name: str) -> List[str]:
+    padded = f" {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+def edit_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """Levenshtein distance between a and b, or None if it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+class _FuzzyIndex:
+    """Canonical locality names per state with a trigram inverted index"""
+
+    def __init__(self, gazetteer: 'Gazetteer'):
+        # (canonical name, state) -> row
+        self.exact: Dict[Tuple[str, str], int] = {}
+        # state -> [(canonical name, row)], and state -> trigram -> positions in that list
+        self.names: Dict[str, List[Tuple[str, int]]] = {state: [] for state in STATES}
+        self.trigrams: Dict[str, Dict[str, array]] = {state: {} for state in STATES}
+
+        for (name, state), row in gazetteer.by_locality.items():
+            canonical = ' '.join(canonical_tokens(name))
+            if (canonical, state) in self.exact:
+                continue
+            self.exact[(canonical, state)] = row
+            position = len(self.names[state])
+            self.names[state].append((canonical, row))
+            postings = self.trigrams[state]
+            for gram in set(_trigrams(canonical)):
+                postings.setdefault(gram, array('I')).append(position)
+
+def _parse_postcode(postcode) -> int:
+    postcode = str(postcode or '').strip()
+    return int(postcode) if postcode.isdigit() else NO_POSTCODE
+
+class Gazetteer:
+    """Localities in parallel arrays, indexed by (locality, state) and postcode"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.states = array('B')       # Index into STATES
+        self.postcodes = array('H')    # NO_POSTCODE if unknown
+        self.lats = array('d')
+        self.lngs = array('d')
+        # (locality, state) -> row of its first entry
+        self.by_locality: Dict[Tuple[str, str], int] = {}
+        # postcode -> rows of the localities it covers
+        self.by_postcode: Dict[int, array] = {}
+        # state -> token trie of locality names, and the fuzzy index, built on first use
+        self._tries: Optional[Dict[str, Dict]] = None
+        self._fuzzy: Optional[_FuzzyIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, locality: str, state: str, postcode, lat: float, lng: float) -> int:
+        """Append a locality, returning its row"""
+        row = len(self.names)
+        name = normalize_name(locality)
+        state = state.upper().strip()
+        code = _parse_postcode(postcode)
+
+        self.names.append(name)
+        self.states.append(STATE_CODES[state])
+        self.postcodes.append(code)
+        self.lats.append(float(lat))
+        self.lngs.append(float(lng))
+
+        self.by_locality.setdefault((name, state), row)
+        self._tries = None
+        self._fuzzy = None
+        if code != NO_POSTCODE:
+            self.by_postcode.setdefault(code, array('I')).append(row)
+        return row
+
+    def state(self, row: int) -> str:
+        return STATES[self.states[row]]
+
+    def coords(self, row: int) -> Tuple[float, float]:
+        return self.lats[row], self.lngs[row]
+
+    def locality(self, locality: str, state: str) -> Optional[Tuple[float, float]]:
+        """Coordinates of a locality in a state, or None if unknown"""
+        row = self.by_locality.get((normalize_name(locality), state.upper().strip()))
+        return self.coords(row) if row is not None else None
+
+    def postcode(self, postcode) -> Optional[Tuple[float, float]]:
+        """Centroid of the localities sharing a postcode, or None if unknown"""
+        rows = self.by_postcode.get(_parse_postcode(postcode))
+        if not rows:
+            return None
+        return (sum(self.lats[r] for r in rows) / len(rows),
+                sum(self.lngs[r] for r in rows) / len(rows))
+
+    def postcode_radius(self, postcode) -> Optional[float]:
+        """Distance in km from a postcode's centroid to its furthest locality"""
+        centroid = self.postcode(postcode)
+        if centroid is None:
+            return None
+        return max(haversine_km(centroid[0], centroid[1], self.lats[r], self.lngs[r])
+                   for r in self.by_postcode[_parse_postcode(postcode)])
+
+    def _build_tries(self) -> Dict[str, Dict]:
+        """Per-state tries of locality name tokens; a None key marks a name's end row"""
+        tries: Dict[str, Dict] = {state: {} for state in STATES}
+        for (name, state), row in self.by_locality.items():
+            node = tries[state]
+            for token in canonical_tokens(name):
+                node = node.setdefault(token, {})
+            node.setdefault(None, row)
+        return tries
+
+    def contained_locality(self, text: str, state: str) -> Optional[int]:
+        """
+        Row of the most specific locality whose name appears, as whole words,
+        in free text such as a suburb or "NORTH ROCKHAMPTON CITY".
+
+        Every token position is walked down the state's trie once, so the
+        cost depends on the length of the text, not on the number of
+        localities. Of all matches, the one with the most tokens wins, then
+        the longest name, then the earliest in the text, then the first
+        loaded.
+        """
+        if self._tries is None:
+            self._tries = self._build_tries()
+        trie = self._tries.get(state.upper().strip())
+        if not trie:
+            return None
+
+        tokens = canonical_tokens(text)
+        best = None
+        best_rank = None
+        for start in range(len(tokens)):
+            node = trie
+            chars = 0
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                chars += len(tokens[end])
+                row = node.get(None)
+                if row is not None:
+                    rank = (end - start + 1, chars, -start, -row)
+                    if best_rank is None or rank > best_rank:
+                        best, best_rank = row, rank
+        return best
+
+    def fuzzy_locality(self, text: str, state: str,
+                       max_distance: int = MAX_EDIT_DISTANCE) -> Optional[Tuple[int, float]]:
+        """
+        Closest locality to a misspelt or abbreviated name in a state.
+
+        Names are compared after expanding abbreviations (MT, ST, ...), so
+        "MT ISA" matches MOUNT ISA exactly. Otherwise candidates sharing
+        enough trigrams with the name are found through the inverted index
+        (one edit changes at most three trigrams) and ranked by edit
+        distance, then trigrams shared, then load order.
+
+        Returns:
+            (row, confidence) where confidence is 1 - distance / length of
+            the longer name, or None if nothing is within max_distance edits
+        """
+        if self._fuzzy is None:
+            self._fuzzy = _FuzzyIndex(self)
+        index = self._fuzzy
+        state = state.upper().strip()
+        name = ' '.join(canonical_tokens(text))
+        if not name or state not in index.names:
+            return None
+
+        row = index.exact.get((name, state))
+        if row is not None:
+            return row, 1.0
+
+        grams = _trigrams(name)
+        shared: Dict[int, int] = {}
+        postings = index.trigrams[state]
+        for gram in set(grams):
+            for position in postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        best = None
+        best_rank = None
+        names = index.names[state]
+        for position, count in shared.items():
+            if count < len(grams) - 3 * max_distance:
+                continue
+            candidate, row = names[position]
+            distance = edit_distance(name, candidate, max_distance)
+            if distance is None:
+                continue
+            rank = (distance, -count, row)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = (row, 1 - distance / max(len(name), len(candidate))), rank
+        return best
+
+    def rows(self) -> Iterator[Tuple[str, str, int, float, float]]:
+        for row in range(len(self.names)):
+            yield self.names[row], self.state(row), self.postcodes[row], self.lats[row], self.lngs[row]
+
+def _column(fieldnames: List[str], field: str) -> str:
+    lowered = {name.lower(): name for name in fieldnames}
+    for alias in COLUMNS[field]:
+        if alias in lowered:
+            return lowered[alias]
+    raise ValueError(f"Gazetteer file has no {field} column (expected one of {COLUMNS[field]})")
+
+def load(filename: str = GAZETTEER_FILE) -> Gazetteer:
+    """Load a gazetteer CSV, skipping rows without coordinates or a known state"""
+    gazetteer = Gazetteer()
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        columns = {field: _column(reader.fieldnames, field) for field in COLUMNS}
+        for record in reader:
+            state = record[columns['state']].upper().strip()
+            lat, lng = record[columns['lat']], record[columns['lng']]
+            if state not in STATE_CODES or not lat or not lng or float(lat) == 0:
+                continue
+            gazetteer.add(record[columns['locality']], state, record[columns['postcode']], lat, lng)
+    return gazetteer
+
+_default: Optional[Gazetteer] = None
+
+def default() -> Gazetteer:
+    """The gazetteer from GAZETTEER_FILE, loaded on first use"""
+    global _default
+    if _default is None:
+        _default = load()
+    return _default
+
+def save(rows: List[Tuple[str, str, int, float, float]], filename: str):
+    """Write rows sorted by state, locality and postcode (entries without a postcode first)"""
+    rows = sorted(rows, key=lambda r: (r[1], r[0], r[2]))
+    with open(filename, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['locality', 'state', 'postcode', 'lat', 'lng'])
+        for name, state, postcode, lat, lng in rows:
+            writer.writerow([name, state, f"{postcode:04d}" if postcode != NO_POSTCODE else '',
+                             f"{lat:.4f}", f"{lng:.4f}"])
+
+def add_sites(site_files: List[str], filename: str = GAZETTEER_FILE) -> int:
+    """
+    Extend a gazetteer file with the localities of geocoded sites.
+
+    Each new (locality, state, postcode) gets the mean of its sites'
+    coordinates; sites whose geocoding failed are ignored and existing
+    entries are kept unchanged.
+
+    Returns:
+        Number of localities added
+    """
+    existing = load(filename) if os.path.exists(filename) else Gazetteer()
+    rows = list(existing.rows())
+    known = {(name, state, postcode) for name, state, postcode, _, _ in rows}
+
+    points: Dict[Tuple[str, str, int], List[Tuple[float, float]]] = {}
+    for site_file in site_files:
+        with open(site_file, 'r') as f:
+            sites = json.load(f)
+        for site in sites:
+            if site.get('geocoding_failed') or not site.get('city') or 'lat' not in site:
+                continue
+            state = site.get('state', '').upper().strip()
+            if state not in STATE_CODES:
+                continue
+            key = (normalize_name(site['city']), state, _parse_postcode(site.get('postcode')))
+            if key not in known:
+                points.setdefault(key, []).append((site['lat'], site['lng']))
+
+    for (name, state, postcode), coords in points.items():
+        rows.append((name, state, postcode,
+                     sum(lat for lat, _ in coords) / len(coords),
+                     sum(lng for _, lng in coords) / len(coords)))
+
+    save(rows, filename)
+    return len(points)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or extend the locality gazetteer")
+    parser.add_argument('--add-sites', nargs='+', metavar='FILE',
+                        help="Add the localities of geocoded site JSON files")
+    parser.add_argument('--file', default=GAZETTEER_FILE, help="Gazetteer CSV (default: GAZETTEER_FILE)")
+    args = parser.parse_args()
+
+    if args.add_sites:
+        added = add_sites(args.add_sites, args.file)
+        print(f"Added {added} localities to {args.file}")
+
+    gazetteer = load(args.file)
+    print(f"{len(gazetteer)} localities, {len(gazetteer.by_postcode)} postcodes in {args.file}")
+
+if __name__ == "__main__":
+    main()
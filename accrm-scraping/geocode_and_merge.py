@@ -4,60 +4,28 @@ Geocode RANZCOG sites and merge with existing ACRRM data.
 """
 
 import json
-import time
-import requests
 from typing import Dict, Optional
-import sys
 import os
 
-def geocode_hospital(hospital_name: str) -> Optional[Dict[str, float]]:
-    """
-    Geocode a hospital name using Nominatim (OpenStreetMap).
+import dataset_store
+import geocode_async
+import geocode_cache
+import geocoder
+import paths
+from site_journal import GEOCODE_FIELDS, SiteJournal, journal_for
 
-    Args:
-        hospital_name: Name of the hospital
+def hospital_site(site: Dict) -> Dict:
+    """What geocoder needs of a hospital: its name and state (college pages have no addresses)"""
+    return {'name': site['name'], 'state': site.get('state', '')}
 
-    Returns:
-        Dict with 'lat' and 'lng' keys, or None if geocoding failed
-    """
-    # Build query string
-    query = f"{hospital_name}, Australia"
-
-    # Nominatim API endpoint
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        'q': query,
-        'format': 'json',
-        'limit': 1,
-        'countrycodes': 'au'
-    }
-    headers = {
-        'User-Agent': 'ACRRM-Training-Map/1.0 (Educational Use)'
-    }
-
-    try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        results = response.json()
-
-        if results and len(results) > 0:
-            lat = float(results[0]['lat'])
-            lng = float(results[0]['lon'])
-            return {'lat': lat, 'lng': lng}
-        else:
-            return None
-
-    except Exception as e:
-        print(f"Error geocoding '{hospital_name}': {e}", file=sys.stderr)
-        return None
-
-def geocode_ranzcog_sites(input_file: str, output_file: str):
+def geocode_ranzcog_sites(input_file: str, output_file: str, seed: Optional[str] = None):
     """
     Add coordinates to RANZCOG sites.
 
     Args:
         input_file: Path to input JSON file with raw RANZCOG data
         output_file: Path to output JSON file with geocoded data
+        seed: dataset_store partition whose coordinates unchanged sites reuse
     """
     # Load sites
     print(f"Loading RANZCOG sites from {input_file}...")
@@ -65,8 +33,24 @@ def geocode_ranzcog_sites(input_file: str, output_file: str):
         sites = json.load(f)
 
     print(f"Found {len(sites)} RANZCOG sites")
+
+    # Results are journaled per site, so an interrupted run resumes where it stopped
+    journal = SiteJournal(journal_for(output_file))
+    resumed = journal.replay(sites)
+    if resumed:
+        print(f"Resuming: {resumed} sites restored from {journal.filename}")
+
+    # Sites unchanged since they were stored keep their coordinates and aren't geocoded again
+    if seed:
+        seeded = dataset_store.seed_coordinates(seed, sites)
+        print(f"Reusing stored coordinates for {seeded} unchanged sites from the {seed} partition")
+
     print("Starting geocoding...\n")
 
+    # Geocode all uncached hospitals at the full rate limit; the loop then reads from the cache
+    geocode_async.prefetch(geocoder.site_queries(hospital_site(site))[0][0]
+                           for site in sites if not ('lat' in site and 'lng' in site))
+
     # Process each site
     successful = 0
     failed = 0
@@ -81,112 +65,38 @@ def geocode_ranzcog_sites(input_file: str, output_file: str):
         # Geocode
         print(f"[{i}/{len(sites)}] Geocoding {site['name']}...")
 
-        coords = geocode_hospital(site['name'])
+        candidate = geocoder.TIER_FUNCTIONS['remote'](hospital_site(site))
 
-        if coords:
-            site['lat'] = coords['lat']
-            site['lng'] = coords['lng']
-            print(f"  ✓ Success: {coords['lat']}, {coords['lng']}")
+        if candidate:
+            print(f"  ✓ Success: {candidate.lat}, {candidate.lng}")
             successful += 1
         else:
             print(f"  ✗ Failed to geocode")
             failed += 1
-            # Set default coordinates for Australian center so site still appears
-            site['lat'] = -25.2744
-            site['lng'] = 133.7751
-            site['geocoding_failed'] = True
-
-        # Rate limiting - Nominatim allows 1 request per second
-        if i < len(sites):  # Don't sleep after last item
-            time.sleep(1.1)  # Slightly over 1 second to be safe
+        # Failures go to the state capital (or centre of Australia) so the site still appears
+        geocoder.apply(site, candidate or geocoder.fallback(site))
 
-        # Save progress every 50 sites
-        if i % 50 == 0:
-            print(f"\nSaving progress... ({successful} successful, {failed} failed so far)\n")
-            with open(output_file, 'w') as f:
-                json.dump(sites, f, indent=2)
+        # Checkpoint this site's result (O(1), unlike rewriting the whole file)
+        journal.record(i - 1, site, GEOCODE_FIELDS)
 
     # Save final results
     print(f"\n{'='*60}")
     print(f"Geocoding complete!")
     print(f"Successful: {successful}/{len(sites)} ({successful/len(sites)*100:.1f}%)")
     print(f"Failed: {failed}/{len(sites)} ({failed/len(sites)*100:.1f}%)")
+    print(geocode_cache.summary())
     print(f"\nSaving to {output_file}...")
 
-    with open(output_file, 'w') as f:
-        json.dump(sites, f, indent=2)
+    journal.compact(sites, output_file)
 
     print("Done!")
     return sites
 
-def merge_datasets(acrrm_file: str, ranzcog_file: str, output_file: str):
-    """
-    Merge ACRRM and RANZCOG datasets, avoiding duplicates.
-
-    Args:
-        acrrm_file: Path to ACRRM training sites JSON
-        ranzcog_file: Path to geocoded RANZCOG sites JSON
-        output_file: Path to output merged JSON
-    """
-    print(f"\n{'='*60}")
-    print("Merging datasets...")
-
-    # Load both datasets
-    print(f"Loading ACRRM sites from {acrrm_file}...")
-    with open(acrrm_file, 'r') as f:
-        acrrm_sites = json.load(f)
-
-    print(f"Loading RANZCOG sites from {ranzcog_file}...")
-    with open(ranzcog_file, 'r') as f:
-        ranzcog_sites = json.load(f)
-
-    print(f"\nACRRM sites: {len(acrrm_sites)}")
-    print(f"RANZCOG sites: {len(ranzcog_sites)}")
-
-    # Create a set of normalized ACRRM hospital names for duplicate detection
-    acrrm_names = set()
-    for site in acrrm_sites:
-        name = site.get('name', '').upper().strip()
-        acrrm_names.add(name)
-
-    # Add RANZCOG sites that don't already exist in ACRRM data
-    new_sites = 0
-    duplicates = 0
-
-    for ranzcog_site in ranzcog_sites:
-        name = ranzcog_site.get('name', '').upper().strip()
-
-        # Check for duplicate
-        if name in acrrm_names:
-            print(f"Skipping duplicate: {ranzcog_site['name']}")
-            duplicates += 1
-            continue
-
-        # Add unique site
-        acrrm_sites.append(ranzcog_site)
-        acrrm_names.add(name)
-        new_sites += 1
-
-    print(f"\n{'='*60}")
-    print(f"Merge complete!")
-    print(f"New sites added: {new_sites}")
-    print(f"Duplicates skipped: {duplicates}")
-    print(f"Total sites in merged dataset: {len(acrrm_sites)}")
-    print(f"\nSaving to {output_file}...")
-
-    with open(output_file, 'w') as f:
-        json.dump(acrrm_sites, f, indent=2)
-
-    print("Done!")
-
 if __name__ == "__main__":
-    base_path = "/Users/fergaltemple/Documents/Utilities/Software/acrrmTrainingMap"
-
     # File paths
-    ranzcog_raw = f"{base_path}/accrm-scraping/ranzcog-sites-raw.json"
-    ranzcog_geocoded = f"{base_path}/accrm-scraping/ranzcog-sites-geocoded.json"
-    acrrm_data = f"{base_path}/public/data/training-sites-full.json"
-    merged_output = f"{base_path}/public/data/training-sites-full.json"
+    ranzcog_raw = paths.RANZCOG_RAW
+    ranzcog_geocoded = paths.RANZCOG_GEOCODED
+    merged_output = paths.PUBLISHED
 
     print("RANZCOG + ACRRM Data Integration")
     print("=" * 60)
@@ -194,13 +104,14 @@ if __name__ == "__main__":
     print("-" * 60)
 
     # Geocode RANZCOG sites
-    geocoded_sites = geocode_ranzcog_sites(ranzcog_raw, ranzcog_geocoded)
+    geocoded_sites = geocode_ranzcog_sites(ranzcog_raw, ranzcog_geocoded, seed='ranzcog')
 
-    print("\n\nStep 2: Merging with ACRRM data")
+    print("\n\nStep 2: Publishing with the other sources")
     print("-" * 60)
 
-    # Merge datasets
-    merge_datasets(acrrm_data, ranzcog_geocoded, merged_output)
+    # Store the RANZCOG partition and rebuild the published file from the partitions
+    dataset_store.put('ranzcog', geocoded_sites)
+    dataset_store.publish(merged_output, paths.MERGE_REPORT)
 
     print("\n" + "=" * 60)
     print("All tasks complete!")
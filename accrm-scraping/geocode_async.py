@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Asynchronous geocoding client that keeps every backend at its rate limit.
+
+The serial geocoding loops request, parse, print and write one site at a
+time, so each cycle spends part of its one-second budget on local work.
+prefetch() instead geocodes a whole batch of queries ahead of the loop:
+
+    - queries already in geocode_cache (or duplicates after normalization)
+      are dropped up front
+    - each backend takes queries from a shared queue and sends them on an
+      exact schedule of its own rate, without waiting for earlier responses
+      (up to a bound on requests in flight)
+    - results go to a separate task that writes them to geocode_cache, so
+      persistence is off the request path
+
+After prefetch() the existing loops run entirely from the cache.
+
+Backends are Nominatim-compatible search endpoints, each with its own rate
+limit; throughput is the sum of their rates. Configure them with the
+GEOCODE_BACKENDS environment variable as comma-separated url@rps entries:
+
+    GEOCODE_BACKENDS="https://nominatim.openstreetmap.org/search@0.9,http://localhost:8080/search@20"
+"""
+
+import asyncio
+import os
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import geocode_cache
+
+class Backend(NamedTuple):
+    url: str
+    requests_per_second: float
+    max_in_flight: int = 8     # Sends wait only if this many responses are outstanding
+
+DEFAULT_BACKENDS = [Backend(geocode_cache.NOMINATIM_URL, 1 / 1.1)]
+
+def parse_backends(spec: str) -> List[Backend]:
+    """Backends from a comma-separated list of url@requests_per_second entries"""
+    backends = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, rate = entry.rpartition('@')
+        if not url:
+            raise ValueError(f"Backend '{entry}' is not in url@requests_per_second form")
+        backends.append(Backend(url, float(rate)))
+    return backends
+
+def configured_backends() -> List[Backend]:
+    spec = os.environ.get('GEOCODE_BACKENDS')
+    return parse_backends(spec) if spec else DEFAULT_BACKENDS
+
+class AsyncRateLimiter:
+    """Hands out send times exactly 1/rate seconds apart"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_at = 0.0
+
+    async def acquire(self):
+        now = asyncio.get_running_loop().time()
+        send_at = max(now, self.next_at)
+        self.next_at = send_at + self.interval
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+async def _send(backend: Backend, query: str, done: asyncio.Queue, in_flight: asyncio.Semaphore):
+    try:
+        result = await asyncio.to_thread(geocode_cache.fetch, query, backend.url)
+        await done.put((query, result, None))
+    except Exception as e:
+        await done.put((query, None, e))
+    finally:
+        in_flight.release()
+
+async def _dispatch(backend: Backend, pending: asyncio.Queue, done: asyncio.Queue):
+    """Send queries from the shared queue to one backend on its rate schedule"""
+    limiter = AsyncRateLimiter(backend.requests_per_second)
+    in_flight = asyncio.Semaphore(backend.max_in_flight)
+    sends = []
+    while True:
+        # Claim a send slot before taking a query, so a faster backend gets the rest
+        await in_flight.acquire()
+        await limiter.acquire()
+        try:
+            query = pending.get_nowait()
+        except asyncio.QueueEmpty:
+            in_flight.release()
+            break
+        sends.append(asyncio.create_task(_send(backend, query, done, in_flight)))
+    await asyncio.gather(*sends)
+
+async def _persist(done: asyncio.Queue, results: Dict[str, Optional[Dict]]):
+    """Write results to the cache as they arrive; failed requests are not cached"""
+    while True:
+        item = await done.get()
+        if item is None:
+            return
+        query, result, error = item
+        if error is not None:
+            print(f"Error geocoding '{query}': {error}", file=sys.stderr)
+            continue
+        await asyncio.to_thread(geocode_cache.store, query, result)
+        results[query] = result
+
+async def geocode_many(queries: Iterable[str], backends: Optional[List[Backend]] = None) -> Dict[str, Optional[Dict]]:
+    """
+    Geocode queries not yet in the cache across all backends.
+
+    Returns:
+        Query -> top result (None if nothing was found) for every query
+        that was sent and answered
+    """
+    backends = backends or configured_backends()
+
+    unique = {}
+    for query in queries:
+        key = geocode_cache.normalize_query(query)
+        if key not in unique and not geocode_cache.lookup(query)[0]:
+            unique[key] = query
+
+    pending = asyncio.Queue()
+    for query in unique.values():
+        pending.put_nowait(query)
+
+    done = asyncio.Queue()
+    results: Dict[str, Optional[Dict]] = {}
+    persister = asyncio.create_task(_persist(done, results))
+
+    # http_client's per-host policy still applies underneath, as a safety net
+    await asyncio.gather(*(_dispatch(backend, pending, done) for backend in backends))
+    await done.put(None)
+    await persister
+    return results
+
+def prefetch(queries: Iterable[str], backends: Optional[List[Backend]] = None) -> Dict[str, Optional[Dict]]:
+    """
+    Warm geocode_cache with every query in a batch before a serial loop runs.
+
+    Returns:
+        See geocode_many
+    """
+    queries = list(queries)
+    if geocode_cache.is_offline():
+        print(f"Offline: not prefetching {len(queries)} geocoding queries")
+        return {}
+    backends = backends or configured_backends()
+    rate = sum(backend.requests_per_second for backend in backends)
+    print(f"Prefetching up to {len(queries)} geocoding queries across {len(backends)} backend(s) "
+          f"at {rate:.2f} requests/sec...")
+    results = asyncio.run(geocode_many(queries, backends))
+    print(f"Prefetched {len(results)} queries")
+    return results
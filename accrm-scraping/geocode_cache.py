@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Persistent geocode cache shared by the geocoding scripts.
+
+Every Nominatim search goes through search(), which remembers the result in
+SQLite keyed by the normalized query string, so "Mount Isa ,QLD, Australia"
+and "mount isa, qld, australia" share an entry. Queries Nominatim found
+nothing for are cached too, as negative entries with a shorter TTL, so
+repeated failures don't cost a request each run. Entries keep the result's
+provenance (display name, importance, OSM class and type) alongside the
+coordinates.
+
+Re-running a geocoding script on unchanged data is served entirely from
+the cache; set GEOCODE_CACHE_FILE to use a different cache file. Offline
+mode (set_offline(True) or GEOCODE_OFFLINE=1) answers only from the cache,
+expired entries included, and never sends a request.
+"""
+
+import contextlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+import http_client
+
+CACHE_FILE = os.environ.get('GEOCODE_CACHE_FILE',
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), '.geocode-cache.sqlite3'))
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+DAY = 24 * 60 * 60
+
+# Found locations rarely move; misses are retried sooner in case OSM gains them
+POSITIVE_TTL = 365 * DAY
+NEGATIVE_TTL = 30 * DAY
+
+_offline = os.environ.get('GEOCODE_OFFLINE', '') not in ('', '0')
+_lock = threading.Lock()
+
+# Lookups served from the cache vs sent to Nominatim, for run summaries.
+# geocode_async's worker threads count into it too, so updates take _stats_lock.
+stats = {'hits': 0, 'negative_hits': 0, 'requests': 0}
+_stats_lock = threading.Lock()
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a query would need a request"""
+
+def set_offline(offline: bool = True):
+    """Answer only from the cache (True) or allow requests to Nominatim (False)"""
+    global _offline
+    _offline = offline
+
+def is_offline() -> bool:
+    return _offline
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: case, spacing and empty comma-separated parts don't matter"""
+    query = unicodedata.normalize('NFKC', query).lower()
+    parts = (WHITESPACE_RE.sub(' ', part).strip() for part in query.split(','))
+    return ', '.join(part for part in parts if part)
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(CACHE_FILE)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocodes (
+                query TEXT PRIMARY KEY,
+                found INTEGER NOT NULL,
+                lat REAL,
+                lng REAL,
+                display_name TEXT,
+                importance REAL,
+                class TEXT,
+                type TEXT,
+                result TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+def _count(key: str):
+    with _stats_lock:
+        stats[key] += 1
+
+def lookup(query: str) -> Tuple[bool, Optional[Dict]]:
+    """
+    Look a query up in the cache.
+
+    Returns:
+        (cached, result): cached is False if the query is missing or
+        expired (entries never expire offline); result is the stored
+        Nominatim result, or None for a cached negative entry
+    """
+    key = normalize_query(query)
+    with _lock, contextlib.closing(_connect()) as conn:
+        row = conn.execute("SELECT found, result, fetched_at FROM geocodes WHERE query = ?", (key,)).fetchone()
+
+    if row is None:
+        return False, None
+    ttl = POSITIVE_TTL if row['found'] else NEGATIVE_TTL
+    if not _offline and time.time() - row['fetched_at'] >= ttl:
+        return False, None
+    return True, json.loads(row['result']) if row['found'] else None
+
+def store(query: str, result: Optional[Dict]):
+    """Remember a Nominatim result for a query (None records a negative entry)"""
+    key = normalize_query(query)
+    if result is None:
+        values = (key, 0, None, None, None, None, None, None, None, time.time())
+    else:
+        values = (key, 1, float(result['lat']), float(result['lon']), result.get('display_name'),
+                  result.get('importance'), result.get('class'), result.get('type'),
+                  json.dumps(result, ensure_ascii=False), time.time())
+
+    with _lock, contextlib.closing(_connect()) as conn:
+        conn.execute("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+        conn.commit()
+
+def search(query: str) -> Optional[Dict]:
+    """
+    Geocode a free-text Australian query with Nominatim, through the cache.
+
+    Args:
+        query: Query string, e.g. "Mount Isa Hospital, QLD, Australia"
+
+    Returns:
+        The top Nominatim result (with 'lat', 'lon', 'display_name',
+        'importance', 'class', 'type', ...), or None if nothing was found
+
+    Raises:
+        requests.RequestException: If the request fails (failures are not cached)
+        CacheMiss: In offline mode, if the query is not cached
+    """
+    cached, result = lookup(query)
+    if cached:
+        _count('hits' if result is not None else 'negative_hits')
+        return result
+
+    result = fetch(query)
+    store(query, result)
+    return result
+
+def fetch(query: str, url: str = NOMINATIM_URL) -> Optional[Dict]:
+    """
+    Send a query to a Nominatim-compatible search endpoint, bypassing the cache.
+
+    Returns:
+        The top result, or None if nothing was found
+
+    Raises:
+        CacheMiss: In offline mode
+    """
+    if _offline:
+        raise CacheMiss(f"Not cached (offline mode): {query}")
+    params = {
+        'q': query,
+        'format': 'json',
+        'limit': 1,
+        'countrycodes': 'au'
+    }
+    _count('requests')
+    response = http_client.get(url, params=params)
+    response.raise_for_status()
+    results = response.json()
+    return results[0] if results else None
+
+def summary() -> str:
+    """One-line description of cache use so far in this run"""
+    return (f"Geocode cache: {stats['hits']} hits, {stats['negative_hits']} cached misses, "
+            f"{stats['requests']} requests to Nominatim")
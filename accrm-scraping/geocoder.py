@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Tiered geocoding cascade for training sites.
+
+Each site is resolved by the cheapest tier that can answer it with enough
+confidence:
+
+    existing   coordinates already on the site (from an earlier run; those
+               without a recorded confidence count as UNRECORDED_CONFIDENCE)
+    cache      geocode_cache entries for the site's queries (no network)
+    gazetteer  offline locality/postcode lookup (locate)
+    remote     Nominatim via geocode_cache.search (rate limited)
+
+The cascade stops at the first result at or above the confidence threshold.
+If no tier reaches it, the best result found is used anyway; if there was
+none at all, the site falls back to its state capital (or the centre of
+Australia) and is marked geocoding_failed as before. Every site records the
+tier that answered and its confidence in geocode_tier and
+geocode_confidence, so later passes can find the weak ones.
+
+This module owns the tiers; the geocoding scripts (add_coordinates,
+add_coordinates_fast, geocode_and_merge, geocode_anzca, regeocode) run
+single tiers or the whole cascade through it rather than repeating them.
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import gazetteer
+import geocode_cache
+
+TIERS = ('existing', 'cache', 'gazetteer', 'remote')
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+# Confidence of a Nominatim result by the kind of query that found it
+QUERY_CONFIDENCE = {
+    'address': 0.95,    # Street address with locality
+    'place': 0.9,       # Named place such as a hospital
+    'locality': 0.85,   # Locality, state and postcode only
+}
+
+# Confidence of a hospital's coordinates taken from a locality in its name
+NAMED_LOCALITY_CONFIDENCE = 0.6
+
+FALLBACK_CONFIDENCE = 0.0
+
+# Confidence of coordinates from an earlier run that recorded none; low enough
+# that the cascade still tries every tier, kept only if nothing better turns up
+UNRECORDED_CONFIDENCE = 0.6
+
+# Used when a site's locality and postcode are both unknown
+STATE_CAPITALS = {
+    "QLD": (-27.4698, 153.0251),  # Brisbane
+    "NSW": (-33.8688, 151.2093),  # Sydney
+    "VIC": (-37.8136, 144.9631),  # Melbourne
+    "SA": (-34.9285, 138.6007),   # Adelaide
+    "WA": (-31.9505, 115.8605),   # Perth
+    "TAS": (-42.8806, 147.3250),  # Hobart
+    "NT": (-12.4634, 130.8456),   # Darwin
+    "ACT": (-35.2809, 149.1300),  # Canberra
+}
+AUSTRALIA_CENTRE = (-25.2744, 133.7751)
+
+# Fuzzy locality matches below this confidence are not trusted
+FUZZY_MIN_CONFIDENCE = 0.8
+
+# Confidence of each kind of gazetteer match
+MATCH_CONFIDENCE = {
+    'locality': 0.85,   # Exact locality name
+    'fuzzy': 0.85,      # Scaled by the fuzzy match's own confidence
+    'suburb': 0.75,     # Locality named within a longer place name
+    'postcode': 0.6,    # Centroid of the postcode's localities
+}
+
+class Candidate(NamedTuple):
+    lat: float
+    lng: float
+    confidence: float
+    tier: str
+    detail: str      # Which query or match kind produced it
+
+def build_query(address: str, city: str, state: str, postcode: str) -> str:
+    """Nominatim query string for an address"""
+    query_parts = []
+    if address:
+        query_parts.append(address)
+    if city:
+        query_parts.append(city)
+    if state:
+        query_parts.append(state)
+    if postcode:
+        query_parts.append(postcode)
+    query_parts.append("Australia")
+
+    return ", ".join(query_parts)
+
+def build_locality_query(city: str, state: str, postcode: str) -> str:
+    """Simpler query tried when the full address finds nothing"""
+    return f"{city}, {state} {postcode}, Australia"
+
+def place_query(name: str, state: str = '') -> str:
+    """Query string for a named place such as a hospital (with its state, when known)"""
+    if state:
+        return f"{name}, {state}, Australia"
+    return f"{name}, Australia"
+
+def site_queries(site: Dict) -> List[Tuple[str, str]]:
+    """Nominatim queries for a site, most specific first, as (query, kind) pairs"""
+    address = site.get('address') or ''
+    city = site.get('city') or ''
+    state = site.get('state') or ''
+    postcode = site.get('postcode') or ''
+
+    if address or city:
+        queries = [(build_query(address, city, state, postcode), 'address' if address else 'locality')]
+        if address:
+            queries.append((build_locality_query(city, state, postcode), 'locality'))
+        return queries
+
+    # Hospitals from ANZCA and RANZCOG only have a name (and maybe a state)
+    return [(place_query(site['name'], state), 'place')]
+
+def locate(city: str, state: str, postcode: str = '') -> Optional[Tuple[float, float, float, str]]:
+    """
+    Find a place in the gazetteer, most specific match first.
+
+    Returns:
+        (lat, lng, confidence, match kind) or None if nothing matched
+    """
+    locations = gazetteer.default()
+
+    # Normalize city name
+    city_upper = gazetteer.normalize_name(city)
+    state_upper = state.upper().strip()
+
+    # Try exact match
+    coords = locations.locality(city_upper, state_upper)
+    if coords:
+        return coords[0], coords[1], MATCH_CONFIDENCE['locality'], 'locality'
+
+    # Try partial match for suburbs within cities (most specific name wins)
+    row = locations.contained_locality(city_upper, state_upper)
+    if row is not None:
+        lat, lng = locations.coords(row)
+        return lat, lng, MATCH_CONFIDENCE['suburb'], 'suburb'
+
+    # Try a fuzzy match for misspelt or abbreviated names ("MT ISA", "TOWNSVLLE")
+    match = locations.fuzzy_locality(city_upper, state_upper)
+    if match and match[1] >= FUZZY_MIN_CONFIDENCE:
+        lat, lng = locations.coords(match[0])
+        return lat, lng, MATCH_CONFIDENCE['fuzzy'] * match[1], 'fuzzy'
+
+    # Try the centroid of the postcode's localities
+    coords = locations.postcode(postcode)
+    if coords:
+        return coords[0], coords[1], MATCH_CONFIDENCE['postcode'], 'postcode'
+
+    return None
+
+def _existing_tier(site: Dict) -> Optional[Candidate]:
+    if 'lat' not in site or 'lng' not in site or site.get('geocoding_failed'):
+        return None
+    return Candidate(site['lat'], site['lng'], site.get('geocode_confidence', UNRECORDED_CONFIDENCE),
+                     'existing', site.get('geocode_tier', ''))
+
+def _cache_tier(site: Dict) -> Optional[Candidate]:
+    for query, kind in site_queries(site):
+        cached, result = geocode_cache.lookup(query)
+        if cached and result is not None:
+            return Candidate(float(result['lat']), float(result['lon']), QUERY_CONFIDENCE[kind], 'cache', kind)
+    return None
+
+def _gazetteer_tier(site: Dict) -> Optional[Candidate]:
+    state = site.get('state') or ''
+    if site.get('city') or site.get('postcode'):
+        match = locate(site.get('city') or '', state, site.get('postcode') or '')
+        if match:
+            return Candidate(match[0], match[1], match[2], 'gazetteer', match[3])
+        return None
+
+    # A hospital named after its town ("Mount Isa Hospital") is at least there
+    if state and site.get('name'):
+        locations = gazetteer.default()
+        row = locations.contained_locality(site['name'], state)
+        if row is not None:
+            lat, lng = locations.coords(row)
+            return Candidate(lat, lng, NAMED_LOCALITY_CONFIDENCE, 'gazetteer', 'named locality')
+    return None
+
+def _remote_tier(site: Dict) -> Optional[Candidate]:
+    for query, kind in site_queries(site):
+        try:
+            result = geocode_cache.search(query)
+        except Exception as e:
+            print(f"Error geocoding '{query}': {e}", file=sys.stderr)
+            return None
+        if result is not None:
+            return Candidate(float(result['lat']), float(result['lon']), QUERY_CONFIDENCE[kind], 'remote', kind)
+    return None
+
+TIER_FUNCTIONS = {
+    'existing': _existing_tier,
+    'cache': _cache_tier,
+    'gazetteer': _gazetteer_tier,
+    'remote': _remote_tier,
+}
+
+def fallback(site: Dict) -> Candidate:
+    """State capital (or centre of Australia) for a site nothing could place"""
+    lat, lng = STATE_CAPITALS.get((site.get('state') or '').upper().strip(), AUSTRALIA_CENTRE)
+    return Candidate(lat, lng, FALLBACK_CONFIDENCE, 'fallback', 'state capital')
+
+def resolve(site: Dict, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+            tiers: Sequence[str] = TIERS) -> Candidate:
+    """
+    Run the cascade for one site.
+
+    Args:
+        site: Site dict
+        min_confidence: Stop at the first tier answering with at least this
+        tiers: Tiers to try, in order (leave out 'remote' to stay offline)
+
+    Returns:
+        The accepted Candidate: the first confident one, else the most
+        confident seen, else the fallback
+    """
+    best = None
+    for tier in tiers:
+        candidate = TIER_FUNCTIONS[tier](site)
+        if candidate is None:
+            continue
+        if candidate.confidence >= min_confidence:
+            return candidate
+        if best is None or candidate.confidence > best.confidence:
+            best = candidate
+    return best or fallback(site)
+
+def apply(site: Dict, candidate: Candidate):
+    """Store a cascade result on a site"""
+    site['lat'] = candidate.lat
+    site['lng'] = candidate.lng
+    site['geocode_tier'] = candidate.tier if candidate.tier != 'existing' else site.get('geocode_tier', 'existing')
+    site['geocode_confidence'] = round(candidate.confidence, 3)
+    if candidate.tier == 'fallback':
+        site['geocoding_failed'] = True
+    else:
+        site.pop('geocoding_failed', None)
+
+def geocode_sites(sites: List[Dict], min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+                  tiers: Sequence[str] = TIERS) -> Counter:
+    """
+    Resolve every site in place.
+
+    Returns:
+        Counter of sites per answering tier
+    """
+    answered = Counter()
+    for i, site in enumerate(sites, 1):
+        candidate = resolve(site, min_confidence, tiers)
+        apply(site, candidate)
+        answered[candidate.tier] += 1
+        if candidate.tier != 'existing':
+            print(f"[{i}/{len(sites)}] {site.get('name', '')}: {candidate.tier} "
+                  f"({candidate.detail}, confidence {candidate.confidence:.2f})")
+    return answered
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocode training sites, cheapest tier first")
+    parser.add_argument('input_file', help="Sites JSON file")
+    parser.add_argument('output_file', help="Output JSON file")
+    parser.add_argument('--min-confidence', type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help=f"Confidence at which to stop the cascade (default: {DEFAULT_MIN_CONFIDENCE})")
+    parser.add_argument('--offline', action='store_true',
+                        help="Skip the remote tier (no network requests)")
+    args = parser.parse_args()
+
+    tiers = [tier for tier in TIERS if not (args.offline and tier == 'remote')]
+
+    with open(args.input_file, 'r') as f:
+        sites = json.load(f)
+    print(f"Geocoding {len(sites)} sites through tiers: {', '.join(tiers)}")
+
+    answered = geocode_sites(sites, args.min_confidence, tiers)
+
+    print(f"\n{'='*60}")
+    print("Sites by answering tier:")
+    for tier in TIERS + ('fallback',):
+        if answered[tier]:
+            print(f"  {tier}: {answered[tier]}")
+    print(geocode_cache.summary())
+
+    with open(args.output_file, 'w') as f:
+        json.dump(sites, f, indent=2)
+    print(f"\nSaved to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
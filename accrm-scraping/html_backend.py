@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Pluggable HTML parser backends for the scrapers' extractors.
+
+The extractors in scrape_acrrm, scrape_anzca_v2 and scrape_ranzcog only use
+a small part of the BeautifulSoup API: find(), find_all() by tag name(s) and
+class, get_text() and get(). parse() returns a Node exposing exactly that
+API, backed by one of:
+
+    bs4   BeautifulSoup with html.parser - the reference implementation
+    lxml  lxml.html (libxml2) - roughly an order of magnitude faster
+
+Equivalence guarantee: for any document that html.parser and libxml2 build
+the same element tree for (which holds for all the committed page
+snapshots), the lxml backend returns the same elements, in the same
+document order, with the same get_text() output as bs4:
+
+    - class_ matches a single class token (or a compiled regex searched
+      against each token and the whole attribute), as in bs4
+    - get_text() concatenates text and tail strings in document order,
+      skipping comments and the contents of <script>, <style> and
+      <template>, as bs4 does
+    - get_text(strip=True) strips each string and drops empty ones
+
+Check a page with compare_backends(html, parse_fn) before relying on the
+fast backend for a new source. The backend can be chosen per call, or for
+the whole process with the HTML_BACKEND environment variable; it defaults
+to lxml when installed and falls back to bs4 otherwise.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is optional; bs4 is always available
+    lxml = None
+
+# Tags whose contents bs4 leaves out of get_text()
+NON_TEXT_TAGS = frozenset(['script', 'style', 'template'])
+
+class Node(ABC):
+    """
+    Backend-neutral element exposing the subset of the bs4 API we use.
+
+    A backend subclasses it and implements every abstract method; one that
+    misses any fails when its first Node is created, not mid-parse.
+    """
+
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self.raw is other.raw
+
+    def __hash__(self):
+        return id(self.raw)
+
+    @abstractmethod
+    def find(self, name=None, class_=None) -> Optional['Node']:
+        ...
+
+    @abstractmethod
+    def find_all(self, name=None, class_=None) -> List['Node']:
+        ...
+
+    @abstractmethod
+    def get_text(self, strip: bool = False) -> str:
+        ...
+
+    @abstractmethod
+    def get(self, attr: str, default=None):
+        ...
+
+class Bs4Node(Node):
+    """Node backed by a BeautifulSoup Tag"""
+
+    __slots__ = ()
+
+    def find(self, name=None, class_=None):
+        tag = self.raw.find(name, class_=class_) if class_ is not None else self.raw.find(name)
+        return Bs4Node(tag) if tag is not None else None
+
+    def find_all(self, name=None, class_=None):
+        tags = self.raw.find_all(name, class_=class_) if class_ is not None else self.raw.find_all(name)
+        return [Bs4Node(tag) for tag in tags]
+
+    def get_text(self, strip=False):
+        return self.raw.get_text(strip=strip)
+
+    def get(self, attr, default=None):
+        return self.raw.get(attr, default)
+
+class LxmlNode(Node):
+    """Node backed by an lxml.html element"""
+
+    __slots__ = ()
+
+    # Compiled XPath per (names, class) pair, shared by all documents
+    _xpaths: Dict[tuple, 'etree.XPath'] = {}
+
+    @classmethod
+    def _xpath_for(cls, name, class_) -> 'etree.XPath':
+        names = (name,) if isinstance(name, str) else tuple(name or ())
+        key = (names, class_)
+        xpath = cls._xpaths.get(key)
+        if xpath is None:
+            if names:
+                expr = 'descendant::*[' + ' or '.join(f'self::{n}' for n in names) + ']'
+            else:
+                expr = 'descendant::*'
+            if class_ is not None:
+                expr += f"[contains(concat(' ', normalize-space(@class), ' '), ' {class_} ')]"
+            xpath = etree.XPath(expr)
+            cls._xpaths[key] = xpath
+        return xpath
+
+    def _matches(self, name, class_):
+        if isinstance(class_, str) or class_ is None:
+            return self._xpath_for(name, class_)(self.raw)
+
+        # Compiled regex: search each class token and the whole attribute
+        elements = []
+        for element in self._xpath_for(name, None)(self.raw):
+            classes = element.get('class')
+            if classes is None:
+                continue
+            if class_.search(classes) or any(class_.search(c) for c in classes.split()):
+                elements.append(element)
+        return elements
+
+    def find(self, name=None, class_=None):
+        elements = self._matches(name, class_)
+        return LxmlNode(elements[0]) if elements else None
+
+    def find_all(self, name=None, class_=None):
+        return [LxmlNode(element) for element in self._matches(name, class_)]
+
+    def get_text(self, strip=False):
+        strings = _lxml_strings(self.raw)
+        if strip:
+            return ''.join(s for s in (s.strip() for s in strings) if s)
+        return ''.join(strings)
+
+    def get(self, attr, default=None):
+        if attr == 'class':
+            value = self.raw.get('class')
+            return value.split() if value is not None else default
+        return self.raw.get(attr, default)
+
+def _lxml_strings(element) -> List[str]:
+    """Text strings under an element in document order, as bs4 yields them"""
+    strings = []
+
+    def walk(el):
+        if el.text and el.tag not in NON_TEXT_TAGS:
+            strings.append(el.text)
+        for child in el:
+            # Comments and processing instructions have a non-string tag
+            if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+                walk(child)
+            if child.tail:
+                strings.append(child.tail)
+
+    walk(element)
+    return strings
+
+def _parse_bs4(html: Union[str, bytes]) -> Node:
+    return Bs4Node(BeautifulSoup(html, 'html.parser'))
+
+def _parse_lxml(html: Union[str, bytes]) -> Node:
+    return LxmlNode(lxml.html.document_fromstring(html))
+
+BACKENDS: Dict[str, Callable[[Union[str, bytes]], Node]] = {'bs4': _parse_bs4}
+if lxml is not None:
+    BACKENDS['lxml'] = _parse_lxml
+
+DEFAULT_BACKEND = os.environ.get('HTML_BACKEND') or ('lxml' if 'lxml' in BACKENDS else 'bs4')
+
+def parse(html: Union[str, bytes], backend: Optional[str] = None) -> Node:
+    """
+    Parse an HTML document.
+
+    Args:
+        html: Document as text or bytes
+        backend: Backend name from BACKENDS (defaults to DEFAULT_BACKEND)
+
+    Returns:
+        Root Node of the document
+    """
+    return BACKENDS[backend or DEFAULT_BACKEND](html)
+
+def compare_backends(html: Union[str, bytes], parse_fn: Callable[..., object],
+                     backends: Optional[List[str]] = None) -> Dict[str, bool]:
+    """
+    Run a parse function on every backend and compare each result with bs4's.
+
+    Args:
+        html: Document to parse
+        parse_fn: Function called as parse_fn(html, backend=name)
+        backends: Backend names to check (defaults to all available)
+
+    Returns:
+        Dict of backend name to whether its output matched bs4 exactly
+    """
+    reference = parse_fn(html, backend='bs4')
+    return {
+        name: parse_fn(html, backend=name) == reference
+        for name in (backends or BACKENDS)
+    }
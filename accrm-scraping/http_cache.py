@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk HTTP response cache for the scrapers.
+
+Responses are stored content-addressed (one file per distinct body, named by
+its SHA-256) and indexed in SQLite by a key built from the URL plus sorted
+query parameters. Each source has its own TTL; stale entries are revalidated
+with If-None-Match / If-Modified-Since, and the cache is kept under a size
+bound by evicting least recently used entries.
+
+Offline mode (set_offline(True) or HTTP_CACHE_OFFLINE=1) serves only from
+the cache, so parser changes can be re-run without touching the network.
+"""
+
+import contextlib
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+
+CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.http-cache'))
+
+# Maximum total size of cached bodies before LRU eviction kicks in
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+
+DAY = 24 * 60 * 60
+
+# Time-to-live per source, in seconds
+SOURCE_TTLS = {
+    'acrrm': 7 * DAY,
+    'anzca': 30 * DAY,
+    'ranzcog': 30 * DAY,
+}
+DEFAULT_TTL = 1 * DAY
+
+_offline = os.environ.get('HTTP_CACHE_OFFLINE', '') not in ('', '0')
+_lock = threading.Lock()
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a request is not in the cache"""
+
+def set_offline(offline: bool = True):
+    """Serve only from the cache (True) or allow network fetches (False)"""
+    global _offline
+    _offline = offline
+
+def cache_key(url: str, params: Optional[Dict] = None) -> str:
+    """Key for a request: SHA-256 of the URL plus its sorted query parameters"""
+    query = urlencode(sorted((params or {}).items()), doseq=True)
+    return hashlib.sha256(f"{url}?{query}".encode('utf-8')).hexdigest()
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.join(CACHE_DIR, 'bodies'), exist_ok=True)
+    conn = sqlite3.connect(os.path.join(CACHE_DIR, 'index.sqlite3'))
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                source TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                encoding TEXT,
+                content_type TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+def _body_path(body_hash: str) -> str:
+    return os.path.join(CACHE_DIR, 'bodies', body_hash[:2], body_hash)
+
+def _read_body(body_hash: str) -> Optional[bytes]:
+    try:
+        with open(_body_path(body_hash), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _write_body(body: bytes) -> str:
+    body_hash = hashlib.sha256(body).hexdigest()
+    path = _body_path(body_hash)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique temp file per writer, so concurrent writers of one body never share one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{body_hash}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return body_hash
+
+def _build_response(url: str, body: bytes, row: Dict) -> requests.Response:
+    """Wrap a cached body in a Response so callers need no changes"""
+    response = requests.Response()
+    response._content = body
+    response.status_code = 200
+    response.url = url
+    response.encoding = row['encoding']
+    response.headers = CaseInsensitiveDict()
+    if row['content_type']:
+        response.headers['Content-Type'] = row['content_type']
+    response.from_cache = True
+    return response
+
+def _evict(conn: sqlite3.Connection):
+    """Drop least recently used entries until the cache fits MAX_CACHE_BYTES"""
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= MAX_CACHE_BYTES:
+        return
+
+    rows = conn.execute("SELECT key, body_hash, size FROM responses ORDER BY accessed_at").fetchall()
+    for key, body_hash, size in rows:
+        if total <= MAX_CACHE_BYTES:
+            break
+        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        total -= size
+
+        # Bodies are shared between keys with identical content
+        still_used = conn.execute("SELECT 1 FROM responses WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+        if not still_used:
+            try:
+                os.remove(_body_path(body_hash))
+            except FileNotFoundError:
+                pass
+
+def get(url: str, params: Optional[Dict] = None, source: str = 'default',
+        ttl: Optional[float] = None) -> requests.Response:
+    """
+    GET a URL through the cache, falling back to http_client.
+
+    Args:
+        url: URL to fetch
+        params: Query parameters (part of the cache key)
+        source: Source name used to pick the TTL from SOURCE_TTLS
+        ttl: Seconds, overriding the source's TTL
+
+    Returns:
+        The response. Cached responses have `from_cache` set to True.
+
+    Raises:
+        CacheMiss: In offline mode, if the request is not cached
+    """
+    if ttl is None:
+        ttl = SOURCE_TTLS.get(source, DEFAULT_TTL)
+    key = cache_key(url, params)
+    now = time.time()
+
+    with _lock, contextlib.closing(_connect()) as conn:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM responses WHERE key = ?", (key,)).fetchone()
+        body = _read_body(row['body_hash']) if row else None
+        if body is not None and (_offline or now - row['fetched_at'] < ttl):
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return _build_response(url, body, row)
+
+    if _offline:
+        raise CacheMiss(f"Not cached (offline mode): {url} {params or ''}")
+
+    # Stale or missing: revalidate if we can, otherwise fetch in full
+    headers = {}
+    if body is not None:
+        if row['etag']:
+            headers['If-None-Match'] = row['etag']
+        if row['last_modified']:
+            headers['If-Modified-Since'] = row['last_modified']
+
+    response = http_client.get(url, params=params, headers=headers or None)
+
+    with _lock, contextlib.closing(_connect()) as conn:
+        if response.status_code == 304 and body is not None:
+            conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            conn.commit()
+            return _build_response(url, body, row)
+
+        if response.status_code == 200:
+            content = response.content
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, source, _write_body(content), len(content), response.encoding,
+                 response.headers.get('Content-Type'), response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), now, now)
+            )
+            _evict(conn)
+            conn.commit()
+
+    response.from_cache = False
+    return response
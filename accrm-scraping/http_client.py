@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for all scrapers and geocoders.
+
+Keeps one pooled keep-alive session per host and applies that host's
+concurrency limit, rate limit, timeout, retry policy and default headers
+to every request, so none of that is repeated at the call sites.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+GEOCODER_HEADERS = {
+    'User-Agent': 'ACRRM-Training-Map/1.0 (Educational Use)'
+}
+
+# Policy applied to any host without its own entry below
+DEFAULT_POLICY = {
+    'concurrency': 4,            # Maximum requests in flight to the host
+    'requests_per_second': None,  # None means no rate limit
+    'timeout': 30,               # Seconds
+    'retries': 3,                # Retries on connection errors, 429 and 5xx
+    'backoff': 1.0,              # Exponential backoff factor between retries
+    'headers': BROWSER_HEADERS,
+}
+
+# Per-host overrides of DEFAULT_POLICY
+HOST_POLICIES = {
+    'mycollege.acrrm.org.au': {'concurrency': 1, 'requests_per_second': 1.0},
+    'www.anzca.edu.au': {'concurrency': 1, 'requests_per_second': 1 / 3},
+    'ranzcog.edu.au': {'concurrency': 1, 'requests_per_second': 1.0},
+    # Nominatim usage policy: at most 1 request per second
+    'nominatim.openstreetmap.org': {
+        'concurrency': 1,
+        'requests_per_second': 1 / 1.1,
+        'timeout': 10,
+        'headers': GEOCODER_HEADERS,
+    },
+}
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+
+    Allows `rate` acquisitions per second on average, with bursts of up to
+    `capacity` acquisitions when the bucket is full.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            # Take the token now, even if that leaves the bucket in debt, so
+            # waiting callers are served in the order they arrived
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+class HostClient:
+    """Pooled session plus concurrency and rate limits for a single host"""
+
+    def __init__(self, policy: Dict):
+        self.policy = policy
+        self.semaphore = threading.BoundedSemaphore(policy['concurrency'])
+        self.limiter = None
+        if policy['requests_per_second']:
+            self.limiter = RateLimiter(policy['requests_per_second'])
+
+        retry = Retry(
+            total=policy['retries'],
+            backoff_factor=policy['backoff'],
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET', 'HEAD'),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=policy['concurrency'],
+            max_retries=retry,
+        )
+
+        self.session = requests.Session()
+        self.session.headers.update(policy['headers'])
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.policy['timeout'])
+        with self.semaphore:
+            if self.limiter:
+                self.limiter.acquire()
+            return self.session.get(url, **kwargs)
+
+_clients: Dict[str, HostClient] = {}
+_clients_lock = threading.Lock()
+
+def policy_for(host: str) -> Dict:
+    """Return the effective policy for a host"""
+    policy = dict(DEFAULT_POLICY)
+    policy.update(HOST_POLICIES.get(host, {}))
+    return policy
+
+def configure_host(host: str, **overrides):
+    """
+    Override the policy for a host, e.g. configure_host(host, concurrency=8).
+
+    Takes effect for requests made after the call.
+    """
+    with _clients_lock:
+        HOST_POLICIES.setdefault(host, {}).update(overrides)
+        old = _clients.pop(host, None)
+    if old:
+        old.session.close()
+
+def client_for(url: str) -> HostClient:
+    """Return the shared client for the host of a URL"""
+    host = urlsplit(url).hostname or ''
+    with _clients_lock:
+        client = _clients.get(host)
+        if client is None:
+            client = HostClient(policy_for(host))
+            _clients[host] = client
+        return client
+
+def get(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+        timeout: Optional[float] = None) -> requests.Response:
+    """
+    GET a URL through the shared client for its host.
+
+    Args:
+        url: URL to fetch
+        params: Query parameters
+        headers: Extra headers, merged over the host's default headers
+        timeout: Seconds, overriding the host's default timeout
+
+    Returns:
+        The response. Callers should still call raise_for_status().
+    """
+    kwargs = {'params': params, 'headers': headers}
+    if timeout is not None:
+        kwargs['timeout'] = timeout
+    return client_for(url).get(url, **kwargs)
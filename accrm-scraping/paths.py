@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Locations of the data files the scripts read and write, relative to this
+checkout, so the pipeline runs from any clone.
+"""
+
+import os
+
+SCRAPING_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SCRAPING_DIR)
+
+# Scraped and geocoded data per college
+ACRRM_RAW = os.path.join(SCRAPING_DIR, 'acrrm-all-sites.json')
+ACRRM_GEOCODED = os.path.join(SCRAPING_DIR, 'acrrm-all-sites-with-coords.json')
+RANZCOG_RAW = os.path.join(SCRAPING_DIR, 'ranzcog-sites-raw.json')
+RANZCOG_GEOCODED = os.path.join(SCRAPING_DIR, 'ranzcog-sites-geocoded.json')
+ANZCA_RAW = os.path.join(SCRAPING_DIR, 'anzca-sites-raw.json')
+ANZCA_GEOCODED = os.path.join(SCRAPING_DIR, 'anzca-sites-geocoded.json')
+
+# Canonical per-source partitions (see dataset_store)
+SOURCES_DIR = os.path.join(ROOT, 'data', 'sources')
+
+# Published dataset served by the app, and the copy kept under data/
+PUBLISHED = os.path.join(ROOT, 'public', 'data', 'training-sites-full.json')
+PUBLISHED_COLUMNAR = os.path.join(ROOT, 'public', 'data', 'training-sites-full.columnar.json')
+DATA_COPY = os.path.join(ROOT, 'data', 'training-sites-full.json')
+
+MERGE_REPORT = os.path.join(SCRAPING_DIR, 'merge-report.json')
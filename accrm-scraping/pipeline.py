@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the data pipeline.
+
+The stages are declared as a DAG by the files they read and write:
+
+    scrape-acrrm     -> acrrm-all-sites.json
+    scrape-ranzcog   -> ranzcog-sites-raw.json
+    scrape-anzca     -> anzca-sites-raw.json
+    geocode-acrrm    acrrm-all-sites.json -> acrrm-all-sites-with-coords.json
+    geocode-ranzcog  ranzcog-sites-raw.json -> ranzcog-sites-geocoded.json
+    geocode-anzca    anzca-sites-raw.json -> anzca-sites-geocoded.json
+    store-<source>   <source> geocoded sites, O&G labels merged -> data/sources/<source>.json
+    publish          data/sources/* -> public/data/training-sites-full.json (+ .columnar.json)
+    copy-data        public/data/training-sites-full.json -> data/training-sites-full.json
+
+A stage runs when the hash of its input files, its code and its options
+differs from the last successful run (its code being the modules it runs,
+every module of this directory they import and the data files those read,
+such as the gazetteer CSV), or when one of its outputs is missing
+or was changed by hand; otherwise it is skipped. Stages whose inputs are
+ready run in parallel (the three scrapes, the three geocodes, ...). Scrapes
+read the colleges' websites rather than files, so they only run when their
+output is missing or they are named with --refresh. Geocode stages give
+sites unchanged since the last store their stored coordinates
+(dataset_store.seed_coordinates) and only geocode new or changed ones; the
+partitions are a seed rather than an input, as the store stages write them.
+With --offline nothing touches the network: scrapes read the HTTP cache,
+geocodes only the geocode cache (ACRRM falls back to the gazetteer).
+
+    python pipeline.py                      # bring everything up to date
+    python pipeline.py --refresh scrape     # re-scrape all three colleges
+    python pipeline.py --offline            # no network: cached pages and geocodes, gazetteer
+    python pipeline.py --dry-run            # show what would run
+"""
+
+import argparse
+import ast
+import functools
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import paths
+
+STATE_FILE = os.path.join(paths.SCRAPING_DIR, '.pipeline-state.json')
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable[[], None]
+    inputs: Tuple[str, ...]      # Files read
+    outputs: Tuple[str, ...]     # Files written
+    code: Tuple[str, ...]        # Modules run; their source and their imports' are part of the input hash
+    external: bool = False       # Reads the web; only runs if missing or refreshed
+
+# Data files modules read, as module attributes naming them; hashed with the code of any stage importing the module
+MODULE_DATA = {
+    'gazetteer': ('GAZETTEER_FILE',),
+}
+
+def _code_file(module: str) -> str:
+    return os.path.join(paths.SCRAPING_DIR, f"{module}.py")
+
+@functools.lru_cache(maxsize=None)
+def imported_modules(module: str) -> Tuple[str, ...]:
+    """A module and every module of this directory it imports, directly or not"""
+    found = set()
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        if name in found or not os.path.exists(_code_file(name)):
+            continue
+        found.add(name)
+        with open(_code_file(name), 'r') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                pending.append(node.module.split('.')[0])
+    return tuple(sorted(found))
+
+def code_files(stage: Stage) -> Tuple[str, ...]:
+    """Source and data files of the modules a stage runs and everything they import"""
+    modules = sorted({name for module in stage.code for name in imported_modules(module)})
+    data = [getattr(importlib.import_module(module), attribute)
+            for module in modules for attribute in MODULE_DATA.get(module, ())]
+    return tuple(_code_file(module) for module in modules) + tuple(data)
+
+# File hashes, reused while a file's size and mtime are unchanged
+_hash_cache: Dict[str, Tuple[int, int, str]] = {}
+
+def file_hash(filename: str) -> Optional[str]:
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    cached = _hash_cache.get(filename)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    with open(filename, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _hash_cache[filename] = (stat.st_size, stat.st_mtime_ns, digest)
+    return digest
+
+def input_hash(stage: Stage, options: Dict) -> str:
+    """Hash of everything a stage's result depends on"""
+    digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode())
+    for filename in stage.inputs + code_files(stage):
+        digest.update(filename.encode())
+        digest.update((file_hash(filename) or 'missing').encode())
+    return digest.hexdigest()
+
+def load_state() -> Dict:
+    if not os.path.exists(STATE_FILE):
+        return {'stages': {}, 'file_hashes': {}}
+    with open(STATE_FILE, 'r') as f:
+        state = json.load(f)
+    _hash_cache.update({filename: tuple(entry) for filename, entry in state.get('file_hashes', {}).items()})
+    return state
+
+def save_state(state: Dict):
+    state['file_hashes'] = {filename: list(entry) for filename, entry in _hash_cache.items()}
+    tmp_file = f"{STATE_FILE}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, STATE_FILE)
+
+# --- Stage actions -----------------------------------------------------------
+
+def _scrape_acrrm(offline: bool):
+    import scrape_acrrm
+    scrape_acrrm.main(['--offline'] if offline else [])
+
+def _scrape_ranzcog():
+    import scrape_ranzcog
+    sites = scrape_ranzcog.scrape_ranzcog_sites()
+    if not sites:
+        raise RuntimeError("No RANZCOG sites found; check the page structure")
+    with open(paths.RANZCOG_RAW, 'w') as f:
+        json.dump(sites, f, indent=2)
+
+def _scrape_anzca():
+    import scrape_anzca_v2
+    scrape_anzca_v2.scrape_all_states()
+
+def _geocode_acrrm(offline: bool):
+    if offline:
+        import add_coordinates_fast
+        add_coordinates_fast.add_coordinates_fast(paths.ACRRM_RAW, paths.ACRRM_GEOCODED, seed='acrrm')
+    else:
+        import add_coordinates
+        add_coordinates.add_coordinates_batch(paths.ACRRM_RAW, paths.ACRRM_GEOCODED, seed='acrrm')
+
+def _geocode_ranzcog():
+    import geocode_and_merge
+    geocode_and_merge.geocode_ranzcog_sites(paths.RANZCOG_RAW, paths.RANZCOG_GEOCODED, seed='ranzcog')
+
+def _geocode_anzca():
+    import geocode_anzca
+    geocode_anzca.geocode_anzca_sites(paths.ANZCA_RAW, paths.ANZCA_GEOCODED, seed='anzca')
+
+def _store(source: str, geocoded_file: str):
+    import dataset_store
+    import update_og_labels
+    with open(geocoded_file, 'r') as f:
+        sites = json.load(f)
+    update_og_labels.merge_og_types(sites)
+    dataset_store.put(source, sites)
+
+def _publish():
+    import dataset_store
+    dataset_store.publish(paths.PUBLISHED, paths.MERGE_REPORT)
+
+def _copy_data():
+    shutil.copyfile(paths.PUBLISHED, paths.DATA_COPY)
+
+PARTITIONS = os.path.join(paths.SOURCES_DIR, 'manifest.json'), *(
+    os.path.join(paths.SOURCES_DIR, f"{source}.json") for source in ('acrrm', 'ranzcog', 'anzca'))
+
+def build_stages(offline: bool) -> List[Stage]:
+    stages = [
+        Stage('scrape-acrrm', lambda: _scrape_acrrm(offline), (), (paths.ACRRM_RAW,),
+              ('scrape_acrrm',), external=True),
+        Stage('scrape-ranzcog', _scrape_ranzcog, (), (paths.RANZCOG_RAW,),
+              ('scrape_ranzcog',), external=True),
+        Stage('scrape-anzca', _scrape_anzca, (), (paths.ANZCA_RAW,),
+              ('scrape_anzca_v2',), external=True),
+        Stage('geocode-acrrm', lambda: _geocode_acrrm(offline), (paths.ACRRM_RAW,), (paths.ACRRM_GEOCODED,),
+              ('add_coordinates_fast',) if offline else ('add_coordinates',)),
+        Stage('geocode-ranzcog', _geocode_ranzcog, (paths.RANZCOG_RAW,), (paths.RANZCOG_GEOCODED,),
+              ('geocode_and_merge',)),
+        Stage('geocode-anzca', _geocode_anzca, (paths.ANZCA_RAW,), (paths.ANZCA_GEOCODED,),
+              ('geocode_anzca',)),
+    ]
+    for source, geocoded in (('acrrm', paths.ACRRM_GEOCODED), ('ranzcog', paths.RANZCOG_GEOCODED),
+                             ('anzca', paths.ANZCA_GEOCODED)):
+        # Partitions share the manifest, so it is left out of the store stages' outputs
+        stages.append(Stage(f"store-{source}", lambda source=source, geocoded=geocoded: _store(source, geocoded),
+                            (geocoded,), (os.path.join(paths.SOURCES_DIR, f"{source}.json"),),
+                            ('update_og_labels', 'dataset_store')))
+    stages += [
+        Stage('publish', _publish, PARTITIONS, (paths.PUBLISHED, paths.PUBLISHED_COLUMNAR),
+              ('dataset_store',)),
+        Stage('copy-data', _copy_data, (paths.PUBLISHED,), (paths.DATA_COPY,), ()),
+    ]
+    return stages
+
+def dependencies(stages: List[Stage]) -> Dict[str, List[str]]:
+    """Stage -> stages producing its inputs"""
+    producers = {output: stage.name for stage in stages for output in stage.outputs}
+    deps = {stage.name: sorted({producers[f] for f in stage.inputs if f in producers} - {stage.name})
+            for stage in stages}
+    # The manifest changes with every partition, so publish waits for all store stages
+    deps['publish'] = sorted(set(deps['publish']) | {stage.name for stage in stages if stage.name.startswith('store-')})
+    return deps
+
+def needs_run(stage: Stage, state: Dict, options: Dict, refresh: List[str]) -> Optional[str]:
+    """Why a stage must run, or None to skip it"""
+    if any(stage.name == name or stage.name.startswith(f"{name}-") for name in refresh):
+        return 'refresh requested'
+    missing = [output for output in stage.outputs if not os.path.exists(output)]
+    if missing:
+        return f"{os.path.basename(missing[0])} missing"
+    if stage.external:
+        return None
+
+    previous = state['stages'].get(stage.name)
+    if previous is None:
+        return 'never run'
+    if previous['inputs'] != input_hash(stage, options):
+        return 'inputs changed'
+    if previous['outputs'] != [file_hash(output) for output in stage.outputs]:
+        return 'outputs changed since last run'
+    return None
+
+def run_pipeline(stages: List[Stage], options: Dict, refresh: List[str], jobs: int, dry_run: bool) -> bool:
+    """Run the stages that need it, in dependency order, independent ones in parallel"""
+    state = load_state()
+    deps = dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    pending = [stage.name for stage in stages]
+    done, ran, failed = set(), set(), set()
+    running = {}
+
+    def record(stage: Stage):
+        state['stages'][stage.name] = {'inputs': input_hash(stage, options),
+                                       'outputs': [file_hash(output) for output in stage.outputs],
+                                       'finished_at': time.time()}
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for name in list(pending):
+                if any(dep in failed for dep in deps[name]):
+                    pending.remove(name)
+                    failed.add(name)
+                    print(f"[{name}] not run: an upstream stage failed")
+                    continue
+                if not all(dep in done for dep in deps[name]):
+                    continue
+                pending.remove(name)
+                stage = by_name[name]
+                # Upstream stages that ran may have changed this stage's inputs
+                reason = needs_run(stage, state, options, refresh)
+                if reason is None and dry_run and any(dep in ran for dep in deps[name]):
+                    reason = 'upstream stage would run'
+                if reason is None:
+                    done.add(name)
+                    continue
+                print(f"[{name}] {'would run' if dry_run else 'running'}: {reason}")
+                if dry_run:
+                    ran.add(name)
+                    done.add(name)
+                    continue
+                running[executor.submit(stage.run)] = stage
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[{stage.name}] failed: {e}", file=sys.stderr)
+                    failed.add(stage.name)
+                    continue
+                # Outputs are re-hashed after the run, not served from stale cache entries
+                for output in stage.outputs:
+                    _hash_cache.pop(output, None)
+                record(stage)
+                ran.add(stage.name)
+                done.add(stage.name)
+                print(f"[{stage.name}] done")
+
+    if not dry_run:
+        # Stages skipped as up to date keep their records; record first runs of external stages too
+        for name in done - ran:
+            stage = by_name[name]
+            if stage.external and name not in state['stages']:
+                record(stage)
+        save_state(state)
+
+    print(f"\n{len(ran)} stages {'would run' if dry_run else 'run'}, {len(done) - len(ran)} up to date, {len(failed)} failed")
+    return not failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the scrape -> geocode -> merge -> publish pipeline")
+    parser.add_argument('--refresh', nargs='*', default=[], metavar='STAGE',
+                        help="Stages (or prefixes such as 'scrape') to run even if up to date")
+    parser.add_argument('--offline', action='store_true',
+                        help="No network: scrape from the HTTP cache, geocode from the geocode cache "
+                             "and ACRRM with the offline gazetteer")
+    parser.add_argument('--jobs', type=int, default=3, help="Stages to run at once (default: 3)")
+    parser.add_argument('--dry-run', action='store_true', help="Show which stages would run")
+    args = parser.parse_args()
+
+    if args.offline:
+        import geocode_cache
+        import http_cache
+        http_cache.set_offline()
+        geocode_cache.set_offline()
+
+    start = time.perf_counter()
+    options = {'offline': args.offline}
+    ok = run_pipeline(build_stages(args.offline), options, args.refresh, args.jobs, args.dry_run)
+    print(f"Finished in {time.perf_counter() - start:.2f}s")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Targeted re-geocoding pass for suspect coordinates.
+
+Rather than rerunning the whole geocoding pipeline, this finds the sites
+whose coordinates are probably wrong and re-geocodes only those:
+
+    failed       marked geocoding_failed
+    placeholder  exactly on a state capital or the centre of Australia,
+                 where the site's own locality isn't that capital
+    far          further than MAX_POSTCODE_DISTANCE_KM beyond the spread of
+                 its postcode's localities in the gazetteer (whose bundled
+                 rows come from our own geocodes, so a consistently wrong
+                 postcode is not caught; see gazetteer.py)
+
+Suspects go down a ladder of queries, most specific first. Each rung is
+prefetched for all still-unresolved suspects at once (geocode_async), and a
+result is only accepted if it lands near the site's postcode (when known).
+Sites no remote query places get the best offline gazetteer match, if any.
+Patched sites are journaled as they are resolved and each dataset is
+rewritten once at the end, so the pass costs time proportional to the bad
+records rather than the dataset.
+
+By default every dataset_store partition is checked, patched partitions
+are stored back with dataset_store.put() and the published dataset is
+rebuilt from them, so a fix survives the next publish. A sites file can be
+named instead, to be patched in place.
+
+    python regeocode.py
+    python regeocode.py some-sites.json
+
+Outliers ranked by spatial_qa.py can be queued as extra suspects with
+--queue (reason 'qa'); they are matched to sites by name and state.
+"""
+
+import argparse
+import json
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import dataset_store
+import gazetteer
+import geocode_async
+import geocode_cache
+import geocoder
+import paths
+from site_journal import GEOCODE_FIELDS, SiteJournal, journal_for
+
+# Rebuilt from the partitions once they are patched
+PUBLISHED_FILE = paths.PUBLISHED
+
+# Tolerance beyond the postcode's own spread before a point counts as far away
+MAX_POSTCODE_DISTANCE_KM = 50
+
+PLACEHOLDERS = set(geocoder.STATE_CAPITALS.values()) | {geocoder.AUSTRALIA_CENTRE}
+
+# Fields a re-geocoded site may change
+PATCHED_FIELDS = GEOCODE_FIELDS
+
+PAREN_RE = re.compile(r'\([^)]*\)')
+
+def _postcode_distance(site: Dict, lat: float, lng: float) -> Optional[float]:
+    """km by which a point lies beyond the spread of the site's postcode, or None if unknown"""
+    locations = gazetteer.default()
+    centroid = locations.postcode(site.get('postcode'))
+    if centroid is None:
+        return None
+    distance = gazetteer.haversine_km(lat, lng, centroid[0], centroid[1])
+    return distance - locations.postcode_radius(site.get('postcode'))
+
+def suspect_reason(site: Dict) -> Optional[str]:
+    """Why a site's coordinates look wrong, or None if they look fine"""
+    if site.get('geocoding_failed') or 'lat' not in site or 'lng' not in site:
+        return 'failed'
+
+    coords = (site['lat'], site['lng'])
+    if coords in PLACEHOLDERS:
+        own = gazetteer.default().locality(site.get('city') or '', site.get('state') or '')
+        if own != coords:
+            return 'placeholder'
+
+    excess = _postcode_distance(site, *coords)
+    if excess is not None and excess > MAX_POSTCODE_DISTANCE_KM:
+        return 'far'
+    return None
+
+def find_suspects(sites: List[Dict]) -> List[Tuple[int, str]]:
+    """(index, reason) for every suspect site"""
+    suspects = []
+    for index, site in enumerate(sites):
+        reason = suspect_reason(site)
+        if reason:
+            suspects.append((index, reason))
+    return suspects
+
+def load_queue(queue_file: str, sites: List[Dict]) -> List[Tuple[int, str]]:
+    """
+    (index, 'qa') for the sites named in a spatial_qa outliers file.
+
+    Outliers are ranked on the published (merged) dataset, so they are
+    matched by name, and by state where both have one, not by index.
+    """
+    with open(queue_file, 'r') as f:
+        outliers = json.load(f)
+    states_by_name: Dict[str, set] = {}
+    for outlier in outliers:
+        states_by_name.setdefault(outlier['name'], set()).add((outlier.get('state') or '').upper().strip())
+
+    queued = []
+    for index, site in enumerate(sites):
+        states = states_by_name.get(site.get('name'))
+        if states is None:
+            continue
+        state = (site.get('state') or '').upper().strip()
+        if not state or state in states or '' in states:
+            queued.append((index, 'qa'))
+    return queued
+
+def simplify_name(name: str) -> str:
+    """Drop parentheticals and organisation prefixes ("Miwatj Health: Galiwinku Clinic" -> "Galiwinku Clinic")"""
+    name = PAREN_RE.sub('', name)
+    for separator in (':', ' - '):
+        if separator in name:
+            name = name.rsplit(separator, 1)[1]
+    return ' '.join(name.split())
+
+def _address_query(site: Dict) -> Optional[str]:
+    if not site.get('address'):
+        return None
+    return geocoder.build_query(site['address'], site.get('city') or '', site.get('state') or '',
+                                site.get('postcode') or '')
+
+def _place_query(site: Dict) -> Optional[str]:
+    if not site.get('name'):
+        return None
+    parts = [site['name'], site.get('city'), site.get('state'), 'Australia']
+    return ', '.join(part for part in parts if part)
+
+def _simple_place_query(site: Dict) -> Optional[str]:
+    name = simplify_name(site.get('name') or '')
+    if not name or name == site.get('name'):
+        return None
+    parts = [name, site.get('city'), site.get('state'), 'Australia']
+    return ', '.join(part for part in parts if part)
+
+def _locality_query(site: Dict) -> Optional[str]:
+    if not site.get('city'):
+        return None
+    return geocoder.build_locality_query(site['city'], site.get('state') or '', site.get('postcode') or '')
+
+# Query ladder as (rung, confidence, query builder); builders return None when a rung doesn't apply
+LADDER: List[Tuple[str, float, Callable[[Dict], Optional[str]]]] = [
+    ('address', geocoder.QUERY_CONFIDENCE['address'], _address_query),
+    ('place', geocoder.QUERY_CONFIDENCE['place'], _place_query),
+    ('simplified place', geocoder.QUERY_CONFIDENCE['place'], _simple_place_query),
+    ('locality', geocoder.QUERY_CONFIDENCE['locality'], _locality_query),
+]
+
+def plausible(site: Dict, lat: float, lng: float) -> bool:
+    """A new position is plausible if it isn't a placeholder and is near the site's postcode"""
+    if (lat, lng) in PLACEHOLDERS:
+        return False
+    excess = _postcode_distance(site, lat, lng)
+    return excess is None or excess <= MAX_POSTCODE_DISTANCE_KM
+
+def _offline_candidate(site: Dict, reason: str) -> Optional[geocoder.Candidate]:
+    candidate = geocoder.TIER_FUNCTIONS['gazetteer'](site)
+    if candidate is None or not plausible(site, candidate.lat, candidate.lng):
+        return None
+    # A far-off geocode may be right and the postcode wrong; don't trade it for the postcode centroid
+    if reason in ('far', 'qa') and candidate.detail == 'postcode':
+        return None
+    return candidate
+
+def regeocode(sites: List[Dict], suspects: List[Tuple[int, str]], journal: SiteJournal,
+              offline: bool = False) -> Counter:
+    """
+    Re-geocode suspect sites in place, recording each patched site in the journal.
+
+    Returns:
+        Counter of suspects per resolving rung ('unresolved' for those left as they were)
+    """
+    resolved = Counter()
+    reasons = dict(suspects)
+    unresolved = [index for index, _ in suspects]
+
+    def patch(index: int, candidate: geocoder.Candidate, rung: str):
+        site = sites[index]
+        geocoder.apply(site, candidate)
+        journal.record(index, site, PATCHED_FIELDS)
+        resolved[rung] += 1
+        print(f"  {site.get('name', '')}: {rung} -> ({candidate.lat:.4f}, {candidate.lng:.4f})")
+
+    for rung, confidence, build in ([] if offline else LADDER):
+        queries = {index: build(sites[index]) for index in unresolved}
+        queries = {index: query for index, query in queries.items() if query}
+        if not queries:
+            continue
+
+        print(f"\nRung '{rung}': {len(queries)} queries")
+        geocode_async.prefetch(queries.values())
+
+        for index, query in queries.items():
+            cached, result = geocode_cache.lookup(query)
+            if not cached or result is None:
+                continue
+            lat, lng = float(result['lat']), float(result['lon'])
+            if plausible(sites[index], lat, lng):
+                patch(index, geocoder.Candidate(lat, lng, confidence, 'remote', rung), rung)
+                unresolved.remove(index)
+        journal.sync()
+
+    print(f"\nOffline gazetteer: {len(unresolved)} sites")
+    for index in list(unresolved):
+        candidate = _offline_candidate(sites[index], reasons[index])
+        if candidate is not None:
+            patch(index, candidate, f"gazetteer {candidate.detail}")
+            unresolved.remove(index)
+
+    journal.sync()
+    resolved['unresolved'] = len(unresolved)
+    return resolved
+
+def regeocode_dataset(label: str, sites: List[Dict], journal: SiteJournal, queue_file: Optional[str] = None,
+                      offline: bool = False, dry_run: bool = False) -> bool:
+    """
+    Find and re-geocode one dataset's suspect sites in place.
+
+    Returns:
+        True if any site was patched, in this run or a journaled earlier one
+    """
+    replayed = journal.replay(sites)
+    if replayed:
+        print(f"Resuming: {replayed} patched sites restored from {journal.filename}")
+
+    suspects = find_suspects(sites)
+    if queue_file:
+        found = {index for index, _ in suspects}
+        suspects += [(index, reason) for index, reason in load_queue(queue_file, sites) if index not in found]
+    reasons = Counter(reason for _, reason in suspects)
+    print(f"\n{label}: {len(suspects)} of {len(sites)} sites have suspect coordinates"
+          + ''.join(f", {count} {reason}" for reason, count in reasons.most_common()))
+
+    if dry_run:
+        for index, reason in suspects:
+            site = sites[index]
+            print(f"  [{reason}] {site.get('name', '')} ({site.get('city') or ''} {site.get('state') or ''} "
+                  f"{site.get('postcode') or ''}): {site.get('lat')}, {site.get('lng')}")
+        return False
+
+    resolved = regeocode(sites, suspects, journal, offline)
+
+    print(f"\n{'='*60}")
+    print(f"{label} suspects by resolving rung:")
+    for rung, count in resolved.most_common():
+        if count:
+            print(f"  {rung}: {count}")
+    return bool(replayed) or sum(resolved.values()) > resolved['unresolved']
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-geocode only the sites with suspect coordinates")
+    parser.add_argument('input_file', nargs='?',
+                        help="Sites JSON file to patch in place (default: every dataset_store partition, "
+                             "then re-publish)")
+    parser.add_argument('--offline', action='store_true',
+                        help="Only use the offline gazetteer (no network requests)")
+    parser.add_argument('--queue', help="spatial_qa.py outliers file whose sites are re-geocoded too")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="List the suspects without re-geocoding them")
+    args = parser.parse_args()
+
+    if args.input_file:
+        with open(args.input_file, 'r') as f:
+            sites = json.load(f)
+        journal = SiteJournal(journal_for(args.input_file))
+        patched = regeocode_dataset(args.input_file, sites, journal, args.queue, args.offline, args.dry_run)
+        if args.dry_run:
+            return
+        print(geocode_cache.summary())
+        if patched:
+            journal.compact(sites, args.input_file)
+            print(f"\nPatched {args.input_file}")
+        else:
+            journal.close()
+            print("\nNothing to patch")
+        return
+
+    # Partitions are the canonical data; the published file is rebuilt from them
+    patched = []
+    for name in dataset_store.partition_order(dataset_store.load_manifest()):
+        sites = dataset_store.load(name)
+        journal = SiteJournal(journal_for(dataset_store.partition_file(name)))
+        if regeocode_dataset(name, sites, journal, args.queue, args.offline, args.dry_run):
+            dataset_store.put(name, sites)
+            patched.append(name)
+        if not args.dry_run:
+            journal.discard()
+    if args.dry_run:
+        return
+
+    print(geocode_cache.summary())
+    if patched:
+        print(f"\nPatched the {', '.join(patched)} partitions")
+        dataset_store.publish(PUBLISHED_FILE, paths.MERGE_REPORT)
+    else:
+        print("\nNothing to patch")
+
+if __name__ == "__main__":
+    main()
@@ -4,158 +4,160 @@ ACRRM Training Posts Scraper
 Scrapes all training posts from ACRRM website handling pagination
 """
 
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import argparse
+import collections
+import hashlib
 import json
-import time
+import queue
 import re
-from typing import List, Dict
-
-def fetch_page(page_num: int, retries: int = 3) -> str:
-    """Fetch a page of results with retry logic"""
-    url = "https://mycollege.acrrm.org.au/search/find-training-post"
-
-    for attempt in range(retries):
-        try:
-            # Add headers to mimic a browser
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Connection': 'keep-alive',
-            }
-
-            # Calculate start rank for pagination
-            start_rank = (page_num - 1) * 10 + 1
-
-            # Add required parameters for pagination
-            params = {
-                'query': '',
-                'collection': 'acrrm-fatp-public',
-                'start_rank': start_rank
-            }
-
-            response = requests.get(url, params=params, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.text
-
-        except Exception as e:
-            print(f"Attempt {attempt + 1} failed for page {page_num}: {e}")
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                raise
-
-    return ""
-
-def parse_training_post(container) -> Dict:
-    """Parse a single training post container"""
-    data = {}
-
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from crawl_journal import CrawlJournal
+import field_rules
+from field_rules import FieldRule
+import html_backend
+import http_cache
+import http_client
+import paths
+
+ACRRM_SEARCH_URL = "https://mycollege.acrrm.org.au/search/find-training-post"
+
+# Results per page the search endpoint serves when num_ranks is not given
+DEFAULT_PAGE_SIZE = 10
+
+# Page sizes to probe for bulk mode, largest first
+BULK_PAGE_SIZES = (1000, 500, 200, 100, 50)
+
+# Used only if the result count cannot be read from the first page
+DEFAULT_TOTAL_EXPECTED = 1174
+
+TOTAL_RESULTS_RE = re.compile(r'Found\s+([\d,]+)\s+results?')
+
+def start_rank_for(page_num: int, posts_per_page: int = DEFAULT_PAGE_SIZE) -> int:
+    """Rank of the first result on a page (pages are numbered from 1)"""
+    return (page_num - 1) * posts_per_page + 1
+
+def fetch_page(page_num: int, posts_per_page: int = DEFAULT_PAGE_SIZE) -> str:
+    """Fetch a page of results (cached by http_cache; retries and rate limiting by http_client)"""
+    # Calculate start rank for pagination
+    start_rank = start_rank_for(page_num, posts_per_page)
+
+    # Add required parameters for pagination
+    params = {
+        'query': '',
+        'collection': 'acrrm-fatp-public',
+        'start_rank': start_rank
+    }
+    if posts_per_page != DEFAULT_PAGE_SIZE:
+        params['num_ranks'] = posts_per_page
+
+    response = http_cache.get(ACRRM_SEARCH_URL, params=params, source='acrrm')
+    response.raise_for_status()
+    return response.text
+
+ICON_RE = re.compile(r'^(icon-tick|icon-cross)\s+(green|red)\s*')
+LIST_SEPARATOR_RE = re.compile(r'[,;]')
+# What is left of the "Associated/Branch sites:" label after its prefix
+SITES_LABEL_RE = re.compile(r'^[/\s]*(?:Branch)?\s*sites?:', re.IGNORECASE)
+
+def _parse_address(value: str) -> Optional[Dict]:
+    """Parse: 83 Wilmot Street, BURNIE, TAS, 7320"""
+    parts = [p.strip() for p in value.strip().split(',')]
+    if len(parts) < 3:
+        return None
+
+    fields = {}
+    # Last part might be postcode
+    if parts[-1].isdigit():
+        fields['postcode'] = parts[-1]
+        parts = parts[:-1]
+
+    # Second to last should be state
+    if len(parts) >= 2:
+        fields['state'] = parts[-1]
+        fields['city'] = parts[-2]
+
+    # First part(s) are street address
+    if len(parts) >= 3:
+        fields['address'] = ', '.join(parts[:-2])
+    else:
+        fields['address'] = parts[0] if parts else ""
+
+    return fields
+
+def _parse_mmm(value: str) -> Optional[int]:
     try:
+        return int(value.strip())
+    except ValueError:
+        return None
+
+def _split_accreditation(value: str) -> Optional[List[str]]:
+    # May have multiple, separated by commas or semicolons
+    value = value.strip()
+    return [a.strip() for a in LIST_SEPARATOR_RE.split(value)] if value else None
+
+def _split_associated_sites(value: str) -> Optional[List[str]]:
+    sites_text = SITES_LABEL_RE.sub('', value).strip()
+    return [s.strip() for s in sites_text.split(',')] if sites_text else None
+
+def _rotation(text: str) -> Optional[str]:
+    # Remove icon text if present
+    text = ICON_RE.sub('', text)
+    if text and not text.startswith('FACRRM'):  # Skip supervisor info
+        return text
+    return None
+
+def _supervisor(text: str) -> Optional[str]:
+    return text if 'FACRRM supervisor' in text or 'supervisor' in text.lower() else None
+
+DETAILS = (('div', 'srTpDetails'),)
+
+POST_SCHEMA = field_rules.Schema(
+    records=(('div', 'srContainer'),),
+    required=('name',),
+    rules=[
         # Site name
-        name_elem = container.find('div', class_='srTitle')
-        if name_elem:
-            data['name'] = name_elem.get_text(strip=True)
-
-        # Parse all the srTpDetails divs
-        details_divs = container.find_all('div', class_='srTpDetails')
-
-        for div in details_divs:
-            text = div.get_text(strip=True)
-
-            # Post type
-            if text.startswith('Post type:'):
-                data['type'] = text.replace('Post type:', '').strip()
-
-            # Address
-            elif text.startswith('Address:'):
-                address_text = text.replace('Address:', '').strip()
-                # Parse: 83 Wilmot Street, BURNIE, TAS, 7320
-                parts = [p.strip() for p in address_text.split(',')]
-
-                if len(parts) >= 3:
-                    # Last part might be postcode
-                    if parts[-1].isdigit():
-                        data['postcode'] = parts[-1]
-                        parts = parts[:-1]
-
-                    # Second to last should be state
-                    if len(parts) >= 2:
-                        data['state'] = parts[-1]
-                        data['city'] = parts[-2]
-
-                    # First part(s) are street address
-                    if len(parts) >= 3:
-                        data['address'] = ', '.join(parts[:-2])
-                    else:
-                        data['address'] = parts[0] if parts else ""
-
-            # MMM level
-            elif text.startswith('MMM:'):
-                mmm_text = text.replace('MMM:', '').strip()
-                try:
-                    data['mmm'] = int(mmm_text)
-                except ValueError:
-                    pass
-
-            # Accreditation
-            elif text.startswith('Accreditation:'):
-                accred_text = text.replace('Accreditation:', '').strip()
-                # May have multiple, separated by commas or semicolons
-                if accred_text:
-                    data['trainingTypes'] = [a.strip() for a in re.split(r'[,;]', accred_text)]
-
-            # Associated/Branch sites
-            elif text.startswith('Associated') or text.startswith('Branch'):
-                sites_text = re.sub(r'^Associated[/\s]*Branch sites?:', '', text, flags=re.IGNORECASE).strip()
-                if sites_text:
-                    data['associatedSites'] = [s.strip() for s in sites_text.split(',')]
-
-            # Training organisation
-            elif text.startswith('Training organisation:'):
-                org = text.replace('Training organisation:', '').strip()
-                if 'additionalDetails' in data:
-                    data['additionalDetails'] += f" | Organisation: {org}"
-                else:
-                    data['additionalDetails'] = f"Organisation: {org}"
+        FieldRule('name', (('div', 'srTitle'),)),
+
+        # One srTpDetails div per labelled field
+        FieldRule('type', DETAILS, prefix='Post type:', transform=str.strip),
+        FieldRule(None, DETAILS, prefix='Address:', transform=_parse_address),
+        FieldRule('mmm', DETAILS, prefix='MMM:', transform=_parse_mmm),
+        FieldRule('trainingTypes', DETAILS, prefix='Accreditation:', transform=_split_accreditation),
+        FieldRule('associatedSites', DETAILS, prefix='Associated', transform=_split_associated_sites),
+        FieldRule('associatedSites', DETAILS, prefix='Branch', transform=_split_associated_sites),
+        FieldRule('additionalDetails', DETAILS, prefix='Training organisation:',
+                  transform=lambda org: f"Organisation: {org.strip()}", join=' | '),
 
         # Experience offered (rotations)
-        exp_section = container.find('div', class_='srCallOut')
-        if exp_section:
-            exp_items = exp_section.find_all('li')
-            experiences = []
-            for li in exp_items:
-                text = li.get_text(strip=True)
-                # Remove icon text if present
-                text = re.sub(r'^(icon-tick|icon-cross)\s+(green|red)\s*', '', text)
-                if text and not text.startswith('FACRRM'):  # Skip supervisor info
-                    experiences.append(text)
-
-            if experiences:
-                data['rotations'] = experiences
+        FieldRule('rotations', (('div', 'srCallOut'), 'li'), transform=_rotation, many=True),
 
         # Supervisor information
-        supervisor_items = container.find_all('li')
-        for li in supervisor_items:
-            text = li.get_text(strip=True)
-            if 'FACRRM supervisor' in text or 'supervisor' in text.lower():
-                if 'additionalDetails' in data:
-                    data['additionalDetails'] += f" | {text}"
-                else:
-                    data['additionalDetails'] = text
+        FieldRule('additionalDetails', ('li',), transform=_supervisor, many=True, join=' | '),
+    ],
+)
+
+def parse_training_post(container: html_backend.Node) -> Dict:
+    """Parse a single training post container"""
+    data = {}
 
+    try:
+        POST_SCHEMA.extract_record(container, data)
     except Exception as e:
         print(f"Error parsing container: {e}")
 
     return data
 
-def parse_page(html: str) -> List[Dict]:
-    """Parse all training posts from a page"""
-    soup = BeautifulSoup(html, 'html.parser')
+def parse_page(html: str, backend: Optional[str] = None) -> List[Dict]:
+    """Parse all training posts from a page (see html_backend for backends)"""
+    soup = html_backend.parse(html, backend)
 
     # Find all training post containers
-    containers = soup.find_all('div', class_='srContainer')
+    containers = field_rules.select(soup, POST_SCHEMA.records)
 
     posts = []
     for container in containers:
@@ -165,44 +167,427 @@ def parse_page(html: str) -> List[Dict]:
 
     return posts
 
-def scrape_all_posts(total_expected: int = 1174, posts_per_page: int = 10) -> List[Dict]:
-    """Scrape all training posts from all pages"""
-    all_posts = []
+def parse_total_results(html: str) -> Optional[int]:
+    """Read the total result count ("Found 1,174 results") from a results page"""
+    match = TOTAL_RESULTS_RE.search(html)
+    return int(match.group(1).replace(',', '')) if match else None
+
+def discover_page_size(candidates: Tuple[int, ...] = BULK_PAGE_SIZES) -> Tuple[int, Optional[int]]:
+    """
+    Find the largest page size the search endpoint honours, and the total.
+
+    Each candidate is tried on the first page, largest first. A size is
+    accepted when the page holds a full page of results (or all of them),
+    so a server that rejects num_ranks, or silently caps it, falls through
+    to a smaller size and finally to DEFAULT_PAGE_SIZE. Probes go through
+    http_cache, so the crawl's own request for page 1 is served from cache.
+
+    Returns:
+        (posts_per_page, total_results); total_results is None if no page
+        reported it
+    """
+    total = None
+    for size in candidates:
+        print(f"Probing page size {size}...", end=' ')
+        try:
+            html = fetch_page(1, size)
+        except Exception as e:
+            print(f"rejected ({e})")
+            continue
+
+        total = parse_total_results(html) or total
+        found = len(parse_page(html))
+        expected = min(size, total) if total else size
+        if found and found >= expected:
+            print(f"OK ({found} results on the first page)")
+            return size, total
+        print(f"only {found} results on the first page")
+
+    print(f"Falling back to {DEFAULT_PAGE_SIZE} results per page")
+    if total is None:
+        try:
+            total = parse_total_results(fetch_page(1))
+        except Exception as e:
+            print(f"Could not read the result count: {e}")
+    return DEFAULT_PAGE_SIZE, total
+
+def _content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+# (page_num, html, error) for one fetched page
+FetchResult = Tuple[int, Optional[str], Optional[Exception]]
+
+# (page_num, posts, content_hash, error) for one fetched and parsed page
+PageResult = Tuple[int, Optional[List[Dict]], Optional[str], Optional[Exception]]
+
+# Parsed pages allowed in flight per parse worker before fetching pauses
+PARSE_QUEUE_PER_WORKER = 2
+
+def _fetch_and_parse(page_num: int, posts_per_page: int) -> PageResult:
+    """Fetch and parse one page, capturing any error in the result"""
+    try:
+        html = fetch_page(page_num, posts_per_page)
+    except Exception as e:
+        return page_num, None, None, e
+    try:
+        return page_num, parse_page(html), _content_hash(html), None
+    except Exception as e:
+        return page_num, None, None, e
+
+async def _fetch(page_num: int, posts_per_page: int, semaphore: asyncio.Semaphore, parse: bool):
+    """Fetch one page within the concurrency budget, parsing it on the same worker thread if asked"""
+    async with semaphore:
+        if parse:
+            return await asyncio.to_thread(_fetch_and_parse, page_num, posts_per_page)
+        return await asyncio.to_thread(fetch_page, page_num, posts_per_page)
+
+async def _produce_pages_async(page_nums: List[int], posts_per_page: int, concurrency: int,
+                               results: queue.Queue, stop: threading.Event, parse: bool = False):
+    """
+    Fetch pages concurrently, handing them over in the given order.
+
+    Every page is scheduled up front; the semaphore bounds in-flight requests
+    and the shared http_client's token bucket for the ACRRM host bounds the
+    request rate. Pages are awaited in order and put on `results` until
+    `stop` is set: FetchResult tuples, or PageResult tuples when `parse` is
+    set, in which case each page is parsed on its fetch thread as soon as it
+    arrives. `results` is bounded, so a slow consumer pauses the hand-over;
+    the blocking put runs on a thread so fetches already in flight carry on.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.create_task(_fetch(page_num, posts_per_page, semaphore, parse))
+        for page_num in page_nums
+    ]
+
+    try:
+        for page_num, task in zip(page_nums, tasks):
+            try:
+                item = await task
+                if not parse:
+                    item = (page_num, item, None)
+            except Exception as e:
+                item = (page_num, None, None, e) if parse else (page_num, None, e)
+
+            if stop.is_set():
+                break
+            await asyncio.to_thread(results.put, item)
+    finally:
+        # Drop any pages still queued after an early stop
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(results.put, None)
+
+def _fetch_pages_concurrent(page_nums: List[int], posts_per_page: int, concurrency: int,
+                            queue_size: int, parse: bool = False) -> Iterator:
+    """
+    Run the asyncio fetcher on a background thread and yield its pages in order
+    (PageResults if `parse` is set, else FetchResults)
+    """
+    results = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=lambda: asyncio.run(_produce_pages_async(page_nums, posts_per_page, concurrency, results, stop,
+                                                        parse)),
+        daemon=True,
+    )
+    producer.start()
+
+    item = ()
+    try:
+        while True:
+            item = results.get()
+            if item is None:
+                return
+            yield item
+    finally:
+        stop.set()
+        # Unblock a producer waiting on the full queue so it can finish
+        while item is not None:
+            item = results.get()
+        producer.join()
+
+def _fetch_pages_sequential(page_nums: List[int], posts_per_page: int) -> Iterator[FetchResult]:
+    """Fetch pages one at a time, only when the consumer asks for them"""
+    for page_num in page_nums:
+        try:
+            # Requests are spaced by the ACRRM host's rate limit in http_client
+            yield page_num, fetch_page(page_num, posts_per_page), None
+        except Exception as e:
+            yield page_num, None, e
+
+def _parse_pages_inline(fetched: Iterator[FetchResult]) -> Iterator[PageResult]:
+    """Parse fetched pages in this process as they arrive"""
+    try:
+        for page_num, html, error in fetched:
+            if error is None:
+                try:
+                    item = (page_num, parse_page(html), _content_hash(html), None)
+                except Exception as e:
+                    item = (page_num, None, None, e)
+            else:
+                item = (page_num, None, None, error)
+            yield item
+    finally:
+        fetched.close()
+
+def _parse_pages_pool(fetched: Iterator[FetchResult], workers: int,
+                      queue_size: int) -> Iterator[PageResult]:
+    """
+    Parse fetched pages on a process pool, yielding them in fetch order.
+
+    At most `queue_size` pages are submitted and not yet yielded; while the
+    queue is full no further pages are pulled from `fetched`, which in turn
+    holds back the fetcher.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = collections.deque()  # (page_num, future, content_hash, error), in page order
+
+    def collect() -> PageResult:
+        page_num, future, content_hash, error = pending.popleft()
+        if future is None:
+            return page_num, None, None, error
+        try:
+            return page_num, future.result(), content_hash, None
+        except Exception as e:
+            return page_num, None, None, e
+
+    try:
+        for page_num, html, error in fetched:
+            if error is not None:
+                pending.append((page_num, None, None, error))
+            else:
+                pending.append((page_num, pool.submit(parse_page, html), _content_hash(html), None))
+
+            # Hand over finished pages straight away; block on the oldest only when full
+            while pending and (len(pending) >= queue_size or pending[0][1] is None or pending[0][1].done()):
+                yield collect()
+
+        while pending:
+            yield collect()
+    finally:
+        fetched.close()
+        pool.shutdown(cancel_futures=True)
+
+def _iter_pages(page_nums: List[int], posts_per_page: int, concurrency: int,
+                parse_workers: int = 1) -> Iterator[PageResult]:
+    """
+    Fetch and parse pages, yielding PageResults in the order of `page_nums`.
+
+    Fetching is sequential or asyncio-concurrent depending on `concurrency`.
+    Concurrent fetches parse each page on their own worker thread; otherwise
+    parsing runs in this process, or on a pool of `parse_workers` processes
+    fed through a bounded queue.
+    """
+    queue_size = max(parse_workers, 1) * PARSE_QUEUE_PER_WORKER
+    if concurrency > 1 and parse_workers <= 1:
+        # Each fetch thread parses its own page, so parsing overlaps the other fetches
+        return _fetch_pages_concurrent(page_nums, posts_per_page, concurrency, queue_size, parse=True)
+    if concurrency > 1:
+        fetched = _fetch_pages_concurrent(page_nums, posts_per_page, concurrency, queue_size)
+    else:
+        fetched = _fetch_pages_sequential(page_nums, posts_per_page)
+
+    if parse_workers > 1:
+        return _parse_pages_pool(fetched, parse_workers, queue_size)
+    return _parse_pages_inline(fetched)
+
+def iter_posts(total_expected: int = DEFAULT_TOTAL_EXPECTED, posts_per_page: int = DEFAULT_PAGE_SIZE,
+               concurrency: int = 1,
+               journal: Optional[CrawlJournal] = None, max_rounds: int = 3,
+               parse_workers: int = 1) -> Iterator[Dict]:
+    """
+    Crawl all result pages, yielding each post as soon as its page is parsed.
+
+    Pages are consumed in page order, so sequential, concurrent and
+    process-pool crawls yield exactly the same posts in the same order. A page that fails
+    is re-queued at the back and retried in up to `max_rounds` rounds. Pages
+    after the first failure are held back until the retries are done and
+    then yielded in page order, so a crawl with retried pages produces the
+    same order as a clean one.
+
+    With a journal, pages it records as completed are replayed from it
+    instead of being fetched, and every attempt is recorded, so an
+    interrupted crawl can be resumed.
+
+    Args:
+        total_expected: Expected number of posts across all pages
+        posts_per_page: Number of posts on each results page
+        concurrency: Maximum number of requests in flight. 1 keeps the
+            original sequential crawl; higher values use the asyncio fetcher,
+            within the ACRRM host's http_client policy (main() sets it from
+            --concurrency and --rate)
+        journal: Optional CrawlJournal to resume from and record into
+        max_rounds: Attempts per page before giving up on it
+        parse_workers: Processes parsing pages. 1 parses in this process;
+            higher values parse on a process pool while fetching continues,
+            pausing the fetcher when PARSE_QUEUE_PER_WORKER pages per
+            worker are waiting
+
+    Yields:
+        Parsed posts
+    """
     total_pages = (total_expected + posts_per_page - 1) // posts_per_page  # Ceiling division
 
     print(f"Starting scrape of {total_expected} posts across {total_pages} pages...")
 
-    for page_num in range(1, total_pages + 1):
-        try:
+    def in_journal(page_num: int) -> bool:
+        return journal is not None and journal.is_done(start_rank_for(page_num, posts_per_page), posts_per_page)
+
+    def record(page_num: int, posts: Optional[List[Dict]], content_hash: Optional[str],
+               error: Optional[Exception]):
+        if journal is None:
+            return
+        start_rank = start_rank_for(page_num, posts_per_page)
+        if error is not None:
+            journal.record_failed(start_rank, error, posts_per_page)
+        else:
+            journal.record_done(start_rank, content_hash, posts, posts_per_page)
+
+    to_fetch = [page_num for page_num in range(1, total_pages + 1) if not in_journal(page_num)]
+    if len(to_fetch) < total_pages:
+        print(f"Resuming: {total_pages - len(to_fetch)} pages already completed in the journal")
+
+    collected = 0
+    failed = []
+    # Posts of pages after the first failure, by page, held back to keep page order
+    held: Dict[int, List[Dict]] = {}
+    if parse_workers > 1:
+        print(f"Parsing on {parse_workers} worker processes")
+    pages = _iter_pages(to_fetch, posts_per_page, concurrency, parse_workers)
+    try:
+        for page_num in range(1, total_pages + 1):
             print(f"Fetching page {page_num}/{total_pages}...", end=' ')
-            html = fetch_page(page_num)
+            if in_journal(page_num):
+                posts = journal.posts(start_rank_for(page_num, posts_per_page))
+                print("(journal)", end=' ')
+            else:
+                item = next(pages, None)
+                if item is None:
+                    break
+
+                _, posts, content_hash, error = item
+                record(page_num, posts, content_hash, error)
+                if error is not None:
+                    print(f"Error on page {page_num}: {error}")
+                    failed.append(page_num)
+                    continue
 
-            posts = parse_page(html)
             print(f"Found {len(posts)} posts")
 
             if posts:
-                all_posts.extend(posts)
+                collected += len(posts)
+                if failed:
+                    held[page_num] = posts
+                else:
+                    yield from posts
             else:
                 print(f"  Warning: No posts found on page {page_num}")
                 # If we get multiple empty pages in a row, stop
-                if page_num > 1 and len(all_posts) < (page_num - 1) * posts_per_page * 0.5:
+                if page_num > 1 and collected < (page_num - 1) * posts_per_page * 0.5:
                     print("  Stopping due to too many empty pages")
                     break
 
-            # Be respectful with rate limiting
-            if page_num < total_pages:
-                time.sleep(1)  # 1 second between requests
-
             # Progress update every 10 pages
             if page_num % 10 == 0:
-                print(f"Progress: {len(all_posts)} posts collected so far...")
+                print(f"Progress: {collected} posts collected so far...")
+    finally:
+        pages.close()
+
+    # Failed pages went to the back of the queue; retry them in further rounds
+    for round_num in range(2, max_rounds + 1):
+        if not failed:
+            break
+
+        print(f"\nRetrying {len(failed)} failed pages (round {round_num}/{max_rounds})...")
+        retry, failed = failed, []
+        for page_num, posts, content_hash, error in _iter_pages(retry, posts_per_page, concurrency, parse_workers):
+            print(f"Fetching page {page_num}/{total_pages}...", end=' ')
+            record(page_num, posts, content_hash, error)
+            if error is not None:
+                print(f"Error on page {page_num}: {error}")
+                failed.append(page_num)
+                continue
 
-        except Exception as e:
-            print(f"Error on page {page_num}: {e}")
-            continue
+            print(f"Found {len(posts)} posts")
+            collected += len(posts)
+            held[page_num] = posts
+
+    for page_num in sorted(held):
+        yield from held[page_num]
+
+    if failed:
+        print(f"\nGave up on {len(failed)} pages: {failed}. Re-run to retry them.")
+
+    print(f"\nScraping complete! Collected {collected} posts")
+
+def scrape_all_posts(total_expected: int = DEFAULT_TOTAL_EXPECTED, posts_per_page: int = DEFAULT_PAGE_SIZE,
+                     concurrency: int = 1, parse_workers: int = 1) -> List[Dict]:
+    """Scrape all training posts from all pages into a list (see iter_posts)"""
+    return list(iter_posts(total_expected, posts_per_page, concurrency, parse_workers=parse_workers))
 
-    print(f"\nScraping complete! Collected {len(all_posts)} posts")
-    return all_posts
+def dedupe_posts(posts: Iterable[Dict], stats: Optional[Dict] = None) -> Iterator[Dict]:
+    """
+    Drop posts without a name or with a name already seen.
+
+    Args:
+        posts: Posts to filter
+        stats: Optional dict; its 'duplicates' entry is set to the number
+            of posts dropped once the input is exhausted
+
+    Yields:
+        Unique posts, in input order
+    """
+    seen_names = set()
+    duplicates = 0
+    for post in posts:
+        name = post.get('name', '')
+        if name and name not in seen_names:
+            seen_names.add(name)
+            yield post
+        else:
+            duplicates += 1
+
+    if stats is not None:
+        stats['duplicates'] = duplicates
+
+def append_ndjson(posts: Iterable[Dict], filename: str) -> Iterator[Dict]:
+    """
+    Write posts to an NDJSON file as they arrive, passing each one through.
+
+    Each line is flushed as soon as it is written, so other processes can
+    tail the file while the crawl is still running.
+    """
+    with open(filename, 'w', encoding='utf-8') as f:
+        for post in posts:
+            f.write(json.dumps(post, ensure_ascii=False) + '\n')
+            f.flush()
+            yield post
+
+def iter_ndjson(filename: str) -> Iterator[Dict]:
+    """Read posts back from an NDJSON file one at a time"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def ndjson_to_json(ndjson_file: str, json_file: str):
+    """
+    Build the pretty-printed JSON array from an NDJSON file.
+
+    Streams one record at a time; the output is byte-for-byte what
+    save_to_json would write for the same posts.
+    """
+    with open(json_file, 'w', encoding='utf-8') as out:
+        out.write('[')
+        first = True
+        for post in iter_ndjson(ndjson_file):
+            out.write('\n  ' if first else ',\n  ')
+            out.write(json.dumps(post, indent=2, ensure_ascii=False).replace('\n', '\n  '))
+            first = False
+        out.write(']' if first else '\n]')
+    print(f"Data saved to {json_file}")
 
 def save_to_json(posts: List[Dict], filename: str):
     """Save posts to JSON file"""
@@ -210,51 +595,106 @@ def save_to_json(posts: List[Dict], filename: str):
         json.dump(posts, f, indent=2, ensure_ascii=False)
     print(f"Data saved to {filename}")
 
-def main():
+def main(argv=None):
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Scrape ACRRM training posts")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="Maximum requests in flight (default: 1, sequential)")
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="Requests per second for concurrent mode (default: 1.0)")
+    parser.add_argument('--parse-workers', type=int, default=1,
+                        help="Processes parsing pages alongside fetching (default: 1, in-process)")
+    parser.add_argument('--offline', action='store_true',
+                        help="Serve pages only from the on-disk HTTP cache")
+    parser.add_argument('--fresh', action='store_true',
+                        help="Discard the journal of an interrupted crawl and fetch every page again")
+    parser.add_argument('--page-size', default='auto',
+                        help="Results per request: 'auto' probes for the largest size the "
+                             f"search accepts (default), or a number such as {DEFAULT_PAGE_SIZE}")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        http_cache.set_offline()
+
     print("ACRRM Training Posts Scraper")
     print("=" * 50)
 
-    # Scrape all posts
-    all_posts = scrape_all_posts()
-
+    # The host policy is process-wide, so it is set here, once, rather than by the crawl
+    if args.concurrency > 1:
+        print(f"Using {args.concurrency} concurrent requests at {args.rate} requests/sec")
+        http_client.configure_host(urlsplit(ACRRM_SEARCH_URL).hostname,
+                                   concurrency=args.concurrency, requests_per_second=args.rate)
+
+    output_file = paths.ACRRM_RAW
+    ndjson_file = output_file.replace('.json', '.ndjson')
+
+    # Completed pages are journaled so an interrupted crawl can be resumed
+    journal = CrawlJournal(output_file.replace('.json', '.journal.ndjson'))
+    if args.fresh:
+        journal.reset()
+
+    # Bulk mode: request as many results per page as the search accepts and
+    # read the real total from the first page rather than assuming it
+    if args.page_size == 'auto':
+        posts_per_page, total_expected = discover_page_size()
+    else:
+        posts_per_page = int(args.page_size)
+        try:
+            total_expected = parse_total_results(fetch_page(1, posts_per_page))
+        except Exception as e:
+            # Page 1 is fetched again, with retries and journaling, by the crawl itself
+            print(f"Could not read the result count: {e}")
+            total_expected = None
+    if total_expected is None:
+        print(f"Result count not found on the first page; assuming {DEFAULT_TOTAL_EXPECTED}")
+        total_expected = DEFAULT_TOTAL_EXPECTED
+
+    # Pipeline: fetch -> parse -> dedupe -> NDJSON sink, one post at a time.
+    # Statistics are gathered on the way through so nothing is held in memory.
+    dedupe_stats = {}
+    posts = iter_posts(total_expected, posts_per_page, concurrency=args.concurrency, journal=journal,
+                       parse_workers=args.parse_workers)
     # Remove duplicates based on name (in case any duplicates slip through)
-    seen_names = set()
-    unique_posts = []
-    for post in all_posts:
-        name = post.get('name', '')
-        if name and name not in seen_names:
-            seen_names.add(name)
-            unique_posts.append(post)
-
-    if len(unique_posts) < len(all_posts):
-        print(f"Removed {len(all_posts) - len(unique_posts)} duplicate posts")
-        all_posts = unique_posts
-
-    # Save to JSON
-    output_file = "/Users/fergaltemple/acrrm-all-sites.json"
-    save_to_json(all_posts, output_file)
+    posts = dedupe_posts(posts, dedupe_stats)
+    posts = append_ndjson(posts, ndjson_file)
+
+    total = 0
+    sample_post = None
+    states = {}
+    types = {}
+    mmm_levels = {}
+
+    for post in posts:
+        total += 1
+        if sample_post is None:
+            sample_post = post
+        if 'state' in post:
+            states[post['state']] = states.get(post['state'], 0) + 1
+        if 'type' in post:
+            types[post['type']] = types.get(post['type'], 0) + 1
+        if 'mmm' in post:
+            mmm = post['mmm']
+            mmm_levels[mmm] = mmm_levels.get(mmm, 0) + 1
+
+    if dedupe_stats.get('duplicates'):
+        print(f"Removed {dedupe_stats['duplicates']} duplicate posts")
+
+    # Save to JSON, built from the NDJSON written during the crawl
+    ndjson_to_json(ndjson_file, output_file)
+
+    # The journal only resumes an interrupted crawl; once every page is in,
+    # clear it so the next run fetches (through http_cache's TTL) afresh
+    if journal.failed():
+        print(f"Keeping {journal.filename} to retry {len(journal.failed())} failed pages next run")
+    else:
+        journal.reset()
 
     # Print summary
     print("\n" + "=" * 50)
     print("Summary:")
-    print(f"Total posts collected: {len(all_posts)}")
-
-    if all_posts:
-        # Show some statistics
-        states = {}
-        types = {}
-        mmm_levels = {}
-
-        for post in all_posts:
-            if 'state' in post:
-                states[post['state']] = states.get(post['state'], 0) + 1
-            if 'type' in post:
-                types[post['type']] = types.get(post['type'], 0) + 1
-            if 'mmm' in post:
-                mmm = post['mmm']
-                mmm_levels[mmm] = mmm_levels.get(mmm, 0) + 1
+    print(f"Total posts collected: {total}")
 
+    if total:
         print(f"\nBy State:")
         for state, count in sorted(states.items()):
             print(f"  {state}: {count}")
@@ -269,7 +709,7 @@ def main():
 
         # Show sample post
         print(f"\nSample post:")
-        print(json.dumps(all_posts[0], indent=2))
+        print(json.dumps(sample_post, indent=2))
 
     print("\nDone!")
 
@@ -4,11 +4,12 @@ Scrape ANZCA Rural Generalist Anaesthesia training sites.
 """
 
 import json
-import time
-import requests
 from bs4 import BeautifulSoup
 import sys
 
+import http_cache
+import paths
+
 def scrape_anzca_state_page(state_code: str, state_name: str) -> list:
     """
     Scrape training sites for a specific state.
@@ -26,12 +27,8 @@ def scrape_anzca_state_page(state_code: str, state_name: str) -> list:
     print(f"\nScraping {state_name} ({state_code})...")
     print(f"URL: {url}")
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
-    }
-
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http_cache.get(url, source='anzca')
         response.raise_for_status()
 
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -129,8 +126,7 @@ def scrape_all_anzca_sites(output_file: str):
         sites = scrape_anzca_state_page(state_code, state_name)
         all_sites.extend(sites)
 
-        # Be polite to the server
-        time.sleep(2)
+        # Requests to ANZCA are spaced out by http_client
 
     print(f"\n{'=' * 60}")
     print(f"Total sites scraped: {len(all_sites)}")
@@ -148,7 +144,6 @@ def scrape_all_anzca_sites(output_file: str):
         print(f"  {state_code}: {count}")
 
 if __name__ == "__main__":
-    base_path = "/Users/fergaltemple/Documents/Utilities/Software/acrrmTrainingMap"
-    output_file = f"{base_path}/accrm-scraping/anzca-sites-raw.json"
+    output_file = paths.ANZCA_RAW
 
     scrape_all_anzca_sites(output_file)
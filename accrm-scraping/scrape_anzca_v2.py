@@ -1,16 +1,118 @@
 #!/usr/bin/env python3
 """
 Scrape ANZCA Rural Generalist Anaesthesia training sites from state pages.
-Uses requests + BeautifulSoup to extract hospital names and cities.
+Uses the shared http_cache + html_backend to extract hospital names and cities.
 """
 
 import json
-import time
-import requests
-from bs4 import BeautifulSoup
+import os
 import re
 import sys
 
+import field_rules
+from field_rules import FieldRule
+import html_backend
+import http_cache
+import paths
+
+HOSPITAL_KEYWORDS = ('hospital', 'health campus', 'health service', 'medical centre', 'medical center')
+
+# Paragraphs mentioning these are descriptions, not hospital names
+NON_NAME_WORDS = (
+    'find an', 'training site', 'director of', 'supervisor',
+    'email', '@', 'http', 'phone', 'contact', 'accredited',
+    'must be', 'should', 'will', 'can be', 'training time'
+)
+
+WHITESPACE_RE = re.compile(r'\s+')
+NBSP_RE = re.compile(r'&nbsp;')
+PAREN_RE = re.compile(r'\(([^)]+)\)')
+PAREN_STRIP_RE = re.compile(r'\s*\([^)]+\)')
+
+def _hospital_from_paragraph(text):
+    """Hospital name (and city, if given in parentheses) from a <p>, or None"""
+    text = text.strip()
+    lower = text.lower()
+
+    # Look for hospital keywords
+    if not any(keyword in lower for keyword in HOSPITAL_KEYWORDS):
+        return None
+
+    # Skip very long paragraphs (descriptions, not names)
+    if not 5 < len(text) < 150:
+        return None
+
+    # Skip paragraphs that are clearly not hospital names
+    if any(skip in lower for skip in NON_NAME_WORDS):
+        return None
+
+    # Remove HTML entities and extra whitespace
+    hospital_name = WHITESPACE_RE.sub(' ', text)
+    hospital_name = NBSP_RE.sub(' ', hospital_name)
+
+    # Skip standalone words like "Hospital"
+    if not hospital_name or hospital_name.lower().strip() == 'hospital':
+        return None
+
+    # Try to extract city name (often in parentheses)
+    city = None
+    paren_match = PAREN_RE.search(hospital_name)
+    if paren_match:
+        potential_city = paren_match.group(1)
+        # If it's likely an abbreviation, keep it in the name
+        if len(potential_city) > 10:  # Likely a full description, not abbreviation
+            city = potential_city
+            hospital_name = PAREN_STRIP_RE.sub('', hospital_name).strip()
+
+    return {'name': hospital_name, 'city': city}
+
+# Look for hospital names in <p> tags
+SITE_SCHEMA = field_rules.Schema(
+    records=('p',),
+    required=('name',),
+    rules=[FieldRule(None, transform=_hospital_from_paragraph, strip=False)],
+)
+
+def parse_state_page(html, state_code, url, backend=None):
+    """
+    Extract training sites from a state's training sites page.
+
+    Args:
+        html: Page HTML
+        state_code: State abbreviation (NSW, VIC, etc.)
+        url: URL the page was fetched from, recorded on each site
+        backend: html_backend parser name (defaults to the fastest available)
+
+    Returns:
+        List of training sites
+    """
+    soup = html_backend.parse(html, backend)
+
+    sites = []
+    seen_names = set()
+
+    for record in SITE_SCHEMA.extract(soup):
+        # Check if already in list
+        if record['name'] in seen_names:
+            continue
+        seen_names.add(record['name'])
+
+        site = {
+            'name': record['name'],
+            'source': 'ANZCA',
+            'trainingTypes': ['AST - Anaesthetics'],
+            'type': 'Hospital',
+            'state': state_code,
+            'sourceUrl': url
+        }
+
+        if record['city']:
+            site['city'] = record['city']
+
+        sites.append(site)
+
+    return sites
+
 def scrape_state_page(state_code, state_name, url):
     """
     Scrape training sites for a specific state.
@@ -26,82 +128,19 @@ def scrape_state_page(state_code, state_name, url):
     print(f"\nScraping {state_name} ({state_code})...")
     print(f"URL: {url}")
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
-    }
-
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http_cache.get(url, source='anzca')
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        sites = []
-
         # Save HTML for debugging
-        debug_file = f"/Users/fergaltemple/Documents/Utilities/Software/acrrmTrainingMap/accrm-scraping/anzca_{state_code.lower()}_page.html"
+        debug_file = os.path.join(paths.SCRAPING_DIR, f"anzca_{state_code.lower()}_page.html")
         with open(debug_file, 'w', encoding='utf-8') as f:
             f.write(response.text)
         print(f"  Saved HTML to: {debug_file}")
 
-        # Look for hospital names in <p> tags
-        # Find all paragraphs that contain hospital keywords
-        paragraphs = soup.find_all('p')
-
-        for p in paragraphs:
-            text = p.get_text().strip()
-
-            # Look for hospital keywords
-            if any(keyword in text.lower() for keyword in [
-                'hospital', 'health campus', 'health service', 'medical centre', 'medical center'
-            ]):
-                # Skip very long paragraphs (descriptions, not names)
-                if len(text) < 150 and len(text) > 5:
-                    # Skip paragraphs that are clearly not hospital names
-                    if not any(skip in text.lower() for skip in [
-                        'find an', 'training site', 'director of', 'supervisor',
-                        'email', '@', 'http', 'phone', 'contact', 'accredited',
-                        'must be', 'should', 'will', 'can be', 'training time'
-                    ]):
-                        # Clean up the hospital name
-                        hospital_name = text.strip()
-
-                        # Remove HTML entities and extra whitespace
-                        hospital_name = re.sub(r'\s+', ' ', hospital_name)
-                        hospital_name = re.sub(r'&nbsp;', ' ', hospital_name)
-
-                        # Skip standalone words like "Hospital"
-                        if hospital_name.lower().strip() == 'hospital':
-                            continue
-
-                        # Check if already in list
-                        if hospital_name and hospital_name not in [s['name'] for s in sites]:
-                            # Try to extract city name (often in parentheses)
-                            city = None
-
-                            # Look for parentheses with potential city/abbreviation
-                            paren_match = re.search(r'\(([^)]+)\)', hospital_name)
-                            if paren_match:
-                                potential_city = paren_match.group(1)
-                                # If it's likely an abbreviation, keep it in the name
-                                if len(potential_city) > 10:  # Likely a full description, not abbreviation
-                                    city = potential_city
-                                    hospital_name = re.sub(r'\s*\([^)]+\)', '', hospital_name).strip()
-
-                            site = {
-                                'name': hospital_name,
-                                'source': 'ANZCA',
-                                'trainingTypes': ['AST - Anaesthetics'],
-                                'type': 'Hospital',
-                                'state': state_code,
-                                'sourceUrl': url
-                            }
-
-                            if city:
-                                site['city'] = city
-
-                            sites.append(site)
-                            print(f"  Found: {hospital_name}" + (f" ({city})" if city else ""))
+        sites = parse_state_page(response.text, state_code, url)
+        for site in sites:
+            print(f"  Found: {site['name']}" + (f" ({site['city']})" if 'city' in site else ""))
 
         print(f"  Total sites found: {len(sites)}")
         return sites
@@ -137,14 +176,13 @@ def scrape_all_states():
         sites = scrape_state_page(state_code, state_name, url)
         all_sites.extend(sites)
 
-        # Be polite to the server
-        time.sleep(3)
+        # Requests to ANZCA are spaced 3 seconds apart by http_client
 
     print(f"\n{'=' * 70}")
     print(f"Total sites scraped: {len(all_sites)}")
 
     # Save results
-    output_file = "/Users/fergaltemple/Documents/Utilities/Software/acrrmTrainingMap/accrm-scraping/anzca-sites-raw.json"
+    output_file = paths.ANZCA_RAW
     print(f"Saving to {output_file}...")
 
     with open(output_file, 'w') as f:
@@ -4,101 +4,141 @@ Scrape RANZCOG training sites from https://ranzcog.edu.au/training/sites/
 Extracts hospital names and training types (CWH, PTP, APTP) from all state tabs.
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
-import time
+import os
 import re
 
-def scrape_ranzcog_sites():
-    """
-    Scrape RANZCOG training sites from all state tabs.
-    """
-    url = "https://ranzcog.edu.au/training/sites/"
+import field_rules
+from field_rules import FieldRule
+import geocode_cache
+import html_backend
+import http_cache
+import paths
 
-    print("Fetching RANZCOG training sites page...")
-    print(f"URL: {url}")
+TICKS = ('✔', '✓')
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+# Training type for a tick in each column after the hospital name
+TICK_COLUMNS = (
+    (1, 'Core Women\'s Health (CWH)'),
+    (2, 'Practical Training Programme (PTP)'),
+    (3, 'Advanced Practical Training Programme (APTP)'),
+)
+
+# Text of every cell in a table row
+ROW_SCHEMA = field_rules.Schema(rules=[FieldRule('cells', (['td', 'th'],), many=True)])
+
+def _site_from_cells(cells, url):
+    """Build a site from a table row's cell texts, or None if it isn't one"""
+    if len(cells) < 2:
+        return None
+
+    hospital_name = cells[0]
+    if not hospital_name or hospital_name.lower() == 'hospital':
+        return None
+
+    # Extract training types from checkmarks in cells
+    training_types = []
+
+    # Check for CWH, PTP, APTP columns
+    if len(cells) >= 4:
+        # Assuming columns are: Hospital, CWH, PTP, APTP
+        for column, training_type in TICK_COLUMNS:
+            if any(tick in cells[column] for tick in TICKS):
+                training_types.append(training_type)
+
+    return {
+        'name': hospital_name,
+        'source': 'RANZCOG',
+        'trainingTypes': training_types if training_types else ['O&G Training'],
+        'type': 'Hospital',
+        'sourceUrl': url
     }
 
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        print(f"Successfully fetched page (status {response.status_code})")
-    except Exception as e:
-        print(f"Error fetching page: {e}")
-        return []
+def parse_ranzcog_page(html, url, backend=None, verbose=False):
+    """
+    Extract training sites from the RANZCOG training sites page.
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    Args:
+        html: Page HTML (text or bytes)
+        url: URL the page was fetched from, recorded on each site
+        backend: html_backend parser name (defaults to the fastest available)
+        verbose: Print progress for each table and site
 
-    # Save the HTML for debugging
-    with open('ranzcog_page_source.html', 'w', encoding='utf-8') as f:
-        f.write(response.text)
-    print("Saved page source to ranzcog_page_source.html")
+    Returns:
+        List of training sites
+    """
+    soup = html_backend.parse(html, backend)
 
     sites = []
 
-    # The page uses tab content for different states
-    # Look for state tabs/content sections
-    states = ['NSW/ACT', 'QLD', 'SA/NT', 'TAS', 'VIC', 'WA', 'NZ']
-
-    print("\nLooking for training sites data...")
+    if verbose:
+        print("\nLooking for training sites data...")
 
     # Try to find tables or structured content
     tables = soup.find_all('table')
-    print(f"Found {len(tables)} tables on page")
+    if verbose:
+        print(f"Found {len(tables)} tables on page")
 
     for idx, table in enumerate(tables):
-        print(f"\nProcessing table {idx + 1}...")
+        if verbose:
+            print(f"\nProcessing table {idx + 1}...")
 
         # Look for header row to identify columns
         headers = []
         header_row = table.find('thead')
         if header_row:
             headers = [th.get_text(strip=True) for th in header_row.find_all('th')]
-            print(f"Headers: {headers}")
+            if verbose:
+                print(f"Headers: {headers}")
 
         # Process table rows
         rows = table.find_all('tr')
-        print(f"Found {len(rows)} rows")
+        if verbose:
+            print(f"Found {len(rows)} rows")
 
         for row in rows[1:]:  # Skip header row
-            cells = row.find_all(['td', 'th'])
-            if len(cells) >= 2:
-                hospital_name = cells[0].get_text(strip=True)
-
-                if not hospital_name or hospital_name.lower() == 'hospital':
-                    continue
-
-                # Extract training types from checkmarks in cells
-                training_types = []
-
-                # Check for CWH, PTP, APTP columns
-                if len(cells) >= 4:
-                    # Assuming columns are: Hospital, CWH, PTP, APTP
-                    if '✔' in cells[1].get_text() or '✓' in cells[1].get_text():
-                        training_types.append('Core Women\'s Health (CWH)')
-                    if '✔' in cells[2].get_text() or '✓' in cells[2].get_text():
-                        training_types.append('Practical Training Programme (PTP)')
-                    if '✔' in cells[3].get_text() or '✓' in cells[3].get_text():
-                        training_types.append('Advanced Practical Training Programme (APTP)')
-
-                site = {
-                    'name': hospital_name,
-                    'source': 'RANZCOG',
-                    'trainingTypes': training_types if training_types else ['O&G Training'],
-                    'type': 'Hospital',
-                    'sourceUrl': url
-                }
-
-                sites.append(site)
-                print(f"  Added: {hospital_name} - {', '.join(training_types) if training_types else 'O&G Training'}")
+            cells = ROW_SCHEMA.extract_record(row).get('cells', [])
+            site = _site_from_cells(cells, url)
+            if site is None:
+                continue
+
+            sites.append(site)
+            if verbose:
+                print(f"  Added: {site['name']} - {', '.join(site['trainingTypes'])}")
 
     # Also try to find tab panels/content
-    tab_panels = soup.find_all(['div'], class_=re.compile('tab|panel|content', re.I))
-    print(f"\nFound {len(tab_panels)} potential tab panels")
+    if verbose:
+        tab_panels = soup.find_all(['div'], class_=re.compile('tab|panel|content', re.I))
+        print(f"\nFound {len(tab_panels)} potential tab panels")
+
+    return sites
+
+def scrape_ranzcog_sites():
+    """
+    Scrape RANZCOG training sites from all state tabs.
+    """
+    url = "https://ranzcog.edu.au/training/sites/"
+
+    print("Fetching RANZCOG training sites page...")
+    print(f"URL: {url}")
+
+    try:
+        response = http_cache.get(url, source='ranzcog')
+        response.raise_for_status()
+        print(f"Successfully fetched page (status {response.status_code})")
+    except Exception as e:
+        print(f"Error fetching page: {e}")
+        return []
+
+    # Save the HTML for debugging
+    debug_file = os.path.join(paths.SCRAPING_DIR, 'ranzcog_page_source.html')
+    with open(debug_file, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    print(f"Saved page source to {debug_file}")
+
+    # The page uses tab content for different states
+    # (NSW/ACT, QLD, SA/NT, TAS, VIC, WA, NZ), each holding a table
+    sites = parse_ranzcog_page(response.content, url, verbose=True)
 
     print(f"\n{'='*60}")
     print(f"Total sites scraped: {len(sites)}")
@@ -114,28 +154,15 @@ def geocode_hospital(hospital_name, state=None):
     if state:
         query = f"{hospital_name}, {state}, Australia"
 
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        'q': query,
-        'format': 'json',
-        'limit': 1,
-        'countrycodes': 'au'
-    }
-    headers = {
-        'User-Agent': 'ACRRM-Training-Map/1.0 (Educational Use)'
-    }
-
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        results = response.json()
+        result = geocode_cache.search(query)
 
-        if results and len(results) > 0:
-            lat = float(results[0]['lat'])
-            lng = float(results[0]['lon'])
+        if result:
+            lat = float(result['lat'])
+            lng = float(result['lon'])
 
             # Extract address components
-            display_name = results[0].get('display_name', '')
+            display_name = result.get('display_name', '')
             address_parts = display_name.split(', ')
 
             return {
@@ -163,14 +190,14 @@ if __name__ == "__main__":
         exit(1)
 
     # Save raw scraped data
-    output_file = 'ranzcog-sites-raw.json'
+    output_file = paths.RANZCOG_RAW
     with open(output_file, 'w') as f:
         json.dump(sites, f, indent=2)
     print(f"\nSaved raw data to {output_file}")
 
     # Ask user if they want to geocode
     print("\nWould you like to geocode the addresses now?")
-    print("This will take approximately {} seconds (1 second delay between requests)".format(len(sites)))
+    print("Uncached hospitals take about a second each (Nominatim allows 1 request per second)")
     response = input("Geocode now? (y/n): ")
 
     if response.lower() == 'y':
@@ -199,17 +226,14 @@ if __name__ == "__main__":
                 site['lng'] = 133.7751
                 site['geocoding_failed'] = True
 
-            # Rate limiting - Nominatim allows 1 request per second
-            if i < len(sites):
-                time.sleep(1.1)
-
         print(f"\n{'='*60}")
         print(f"Geocoding complete!")
         print(f"Successful: {successful}/{len(sites)} ({successful/len(sites)*100:.1f}%)")
         print(f"Failed: {failed}/{len(sites)} ({failed/len(sites)*100:.1f}%)")
+        print(geocode_cache.summary())
 
         # Save geocoded data
-        geocoded_file = 'ranzcog-sites-geocoded.json'
+        geocoded_file = paths.RANZCOG_GEOCODED
         with open(geocoded_file, 'w') as f:
             json.dump(sites, f, indent=2)
         print(f"\nSaved geocoded data to {geocoded_file}")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Append-only checkpoint journal for per-site geocoding loops.
+
+Instead of rewriting the whole output JSON every N sites, each site's
+result is appended as one NDJSON line holding the fields the loop set:
+
+    {"index": 12, "name": "Mount Isa Hospital", "fields": {"lat": -20.72, "lng": 139.49}}
+
+Lines are buffered and fsynced in batches, so a checkpoint costs O(1) per
+site however large the dataset is; at most the last unsynced batch is lost
+in a crash, and a line truncated by one is ignored on load. A restarted
+run replays the journal onto the freshly loaded sites (skipping entries
+whose name no longer matches the site at that index) and carries on.
+compact() writes the final JSON once, atomically, and removes the journal;
+discard() just removes it, for results saved some other way.
+"""
+
+import json
+import os
+from typing import Dict, List
+
+# Fields the geocoding loops set on a site (see geocoder.apply)
+GEOCODE_FIELDS = ('lat', 'lng', 'geocoding_failed', 'geocode_tier', 'geocode_confidence')
+
+def journal_for(output_file: str) -> str:
+    """Journal file kept alongside an output file while it is being built"""
+    return os.path.splitext(output_file)[0] + '.journal.ndjson'
+
+class SiteJournal:
+    """Append-only record of per-site results, replayable onto the input sites"""
+
+    def __init__(self, filename: str, fsync_every: int = 50):
+        self.filename = filename
+        self.fsync_every = fsync_every
+        self._file = None
+        self._unsynced = 0
+
+    def replay(self, sites: List[Dict]) -> int:
+        """Apply journaled results to sites in place; returns how many were applied"""
+        if not os.path.exists(self.filename):
+            return 0
+
+        applied = 0
+        with open(self.filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partial line from an interrupted write
+
+                index = entry['index']
+                if index < len(sites) and sites[index].get('name') == entry['name']:
+                    for field, value in entry['fields'].items():
+                        if value is None:
+                            sites[index].pop(field, None)
+                        else:
+                            sites[index][field] = value
+                    applied += 1
+        return applied
+
+    def record(self, index: int, site: Dict, fields: List[str]):
+        """Append a site's result fields (null for those not on it, removed on replay)"""
+        if self._file is None:
+            self._file = open(self.filename, 'a', encoding='utf-8')
+
+        entry = {'index': index, 'name': site.get('name'),
+                 'fields': {field: site.get(field) for field in fields}}
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        """Flush and fsync buffered entries"""
+        if self._file is None or not self._unsynced:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def compact(self, sites: List[Dict], output_file: str):
+        """Write the sites to output_file atomically, then drop the journal"""
+        self.close()
+
+        tmp_file = f"{output_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(sites, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, output_file)
+        self.discard()
+
+    def discard(self):
+        """Drop the journal, once its results are saved"""
+        self.close()
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
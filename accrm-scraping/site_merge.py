@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+N-way entity-resolution merge of training site datasets.
+
+Colleges list the same hospital under different names ("Bundaberg Hospital"
+vs "Bundaberg General Hospital"), so exact name matching keeps both. Instead
+of comparing every pair of records, candidates are blocked first:
+
+    name tokens   records sharing an informative name token (tokens in more
+                  than MAX_BLOCK_SIZE records, like HOSPITAL, don't block)
+    spatial grid  records in the same or a neighbouring GRID_DEGREES cell
+                  that share any name token
+
+A source listing one site more than once (same name and location fields,
+as RANZCOG's scrape does) has the repeats folded into the first listing
+before anything is scored. Each pair of sources is scored separately, so a caller can reuse the scores
+of unchanged pairs (dataset_store does). Only candidate pairs between the
+two sources are scored: name token overlap weighted by IDF over both,
+rejected outright if the records are in different states, have
+incompatible site types, differ in being marked inactive or lie more than
+MAX_MATCH_DISTANCE_KM apart, with a bonus when they are within
+NEAR_DISTANCE_KM. Names that differ only match when the records' locations
+agree too (same postcode or locality, or within LOCATION_DISTANCE_KM);
+otherwise the score is capped at REVIEW_THRESHOLD. Pairs scoring at least
+MATCH_THRESHOLD are merged, best first, into clusters holding at most one
+record per source; those between REVIEW_THRESHOLD and MATCH_THRESHOLD are
+listed for review. A merged record is the first source's record with the
+others' trainingTypes (and other list fields) unioned in and any missing
+fields filled from them, except their source and sourceUrl.
+
+    python site_merge.py merged.json acrrm=acrrm-all-sites-with-coords.json \\
+        ranzcog=ranzcog-sites-geocoded.json anzca=anzca-sites-geocoded.json
+"""
+
+import argparse
+import json
+import math
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+
+import gazetteer
+
+# Name tokens that say nothing about which site a record is
+STOPWORDS = {'AND', 'THE', 'OF', 'FOR', 'WITH', 'INCLUDING', 'SATELLITE', 'AT'}
+
+# Marks a site no longer training ("Lismore Base Hospital (Inactive)"); never matched with an active one
+INACTIVE_TOKEN = 'INACTIVE'
+
+# Tokens shared by more records than this don't form a block (HOSPITAL, HEALTH, ...)
+MAX_BLOCK_SIZE = 50
+
+# Spatial grid cell size (about 5 km)
+GRID_DEGREES = 0.05
+
+MATCH_THRESHOLD = 0.8
+REVIEW_THRESHOLD = 0.6
+
+# Records further apart than this are never the same site; closer than NEAR_DISTANCE_KM earns NEAR_BONUS
+MAX_MATCH_DISTANCE_KM = 25
+NEAR_DISTANCE_KM = 2
+NEAR_BONUS = 0.1
+
+# Records with differing names must be this close, or share a postcode or locality, to match
+LOCATION_DISTANCE_KM = 5
+
+# Bumped whenever scoring changes, so stored pair scores are not reused across versions
+SCORE_VERSION = 3
+
+# List fields unioned across a merged cluster
+LIST_FIELDS = ('trainingTypes', 'rotations', 'associatedSites')
+
+# Provenance of the record a merged site is based on; never filled in from the others
+PROVENANCE_FIELDS = ('source', 'sourceUrl')
+
+# Fields that must all agree for two of a source's sites to be one site listed twice
+LISTING_FIELDS = ('name', 'address', 'city', 'state', 'postcode')
+
+class Record:
+    """A site from one source, with what blocking and scoring need precomputed"""
+
+    def __init__(self, source: int, source_name: str, index: int, site: Dict):
+        self.source = source
+        self.source_name = source_name
+        self.index = index
+        self.site = site
+        self.tokens: Set[str] = {token.replace("'", '') for token in gazetteer.canonical_tokens(site.get('name') or '')
+                                 if token not in STOPWORDS}
+        self.inactive = INACTIVE_TOKEN in self.tokens
+        self.state = (site.get('state') or '').upper().strip()
+        self.postcode = str(site.get('postcode') or '').strip()
+        self.locality: Set[str] = set(gazetteer.canonical_tokens(site.get('city') or ''))
+        self.types = {part.strip() for part in (site.get('type') or '').split(',') if part.strip()}
+        located = 'lat' in site and 'lng' in site and not site.get('geocoding_failed')
+        self.coords: Optional[Tuple[float, float]] = (site['lat'], site['lng']) if located else None
+
+    @property
+    def origin(self) -> str:
+        """College the site came from, one label per source (its input's name, upper-cased)"""
+        return self.source_name.upper()
+
+    def cell(self) -> Optional[Tuple[int, int]]:
+        if self.coords is None:
+            return None
+        return math.floor(self.coords[0] / GRID_DEGREES), math.floor(self.coords[1] / GRID_DEGREES)
+
+def candidate_pairs(records: List[Record]) -> Set[Tuple[int, int]]:
+    """Pairs of record ids from different sources that share a name or spatial block"""
+    by_token: Dict[str, List[int]] = defaultdict(list)
+    by_cell: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for rid, record in enumerate(records):
+        for token in record.tokens:
+            by_token[token].append(rid)
+        cell = record.cell()
+        if cell is not None:
+            by_cell[cell].append(rid)
+
+    pairs = set()
+    for members in by_token.values():
+        if len(members) <= MAX_BLOCK_SIZE:
+            pairs.update(combinations(members, 2))
+
+    for (row, col), members in by_cell.items():
+        neighbours = [rid for dr in (-1, 0, 1) for dc in (-1, 0, 1) for rid in by_cell.get((row + dr, col + dc), ())]
+        for a in members:
+            for b in neighbours:
+                if a < b and records[a].tokens & records[b].tokens:
+                    pairs.add((a, b))
+
+    return {(a, b) for a, b in pairs if records[a].source != records[b].source}
+
+def token_weights(records: List[Record]) -> Dict[str, float]:
+    """Inverse document frequency of each name token"""
+    counts = Counter(token for record in records for token in record.tokens)
+    return {token: math.log((len(records) + 1) / count) for token, count in counts.items()}
+
+def located_together(a: Record, b: Record) -> bool:
+    """Whether anything but the name places two records at the same site"""
+    if a.postcode and a.postcode == b.postcode:
+        return True
+    if a.locality and b.locality and a.locality == b.locality:
+        return True
+    # Colleges without addresses often name the town ("Broken Hill Hospital")
+    if (a.locality and a.locality <= b.tokens) or (b.locality and b.locality <= a.tokens):
+        return True
+    if a.coords and b.coords:
+        return gazetteer.haversine_km(a.coords[0], a.coords[1], b.coords[0], b.coords[1]) <= LOCATION_DISTANCE_KM
+    return False
+
+def score(a: Record, b: Record, weights: Dict[str, float]) -> float:
+    """How likely two records are the same site, 0 to 1"""
+    if a.state and b.state and a.state != b.state:
+        return 0.0
+    if a.inactive != b.inactive:
+        return 0.0
+    if a.types and b.types and not a.types & b.types:
+        return 0.0
+
+    shared = sum(weights[token] for token in a.tokens & b.tokens)
+    if not shared:
+        return 0.0
+    union = sum(weights[token] for token in a.tokens | b.tokens)
+    smaller = min(sum(weights[token] for token in a.tokens), sum(weights[token] for token in b.tokens))
+    # Half overlap, half containment, so an extra word ("General") costs little
+    similarity = 0.5 * shared / union + 0.5 * shared / smaller
+
+    if a.coords and b.coords:
+        distance = gazetteer.haversine_km(a.coords[0], a.coords[1], b.coords[0], b.coords[1])
+        if distance > MAX_MATCH_DISTANCE_KM:
+            return 0.0
+        if distance <= NEAR_DISTANCE_KM:
+            similarity += NEAR_BONUS
+
+    # A similar name alone ("Tweed Valley Hospital", "The Tweed Hospital") is only worth a review
+    if a.tokens != b.tokens and not located_together(a, b):
+        similarity = min(similarity, REVIEW_THRESHOLD)
+    return min(similarity, 1.0)
+
+def listing_key(site: Dict) -> Tuple[str, ...]:
+    """Sites of one source with the same key are the same site listed twice"""
+    return tuple(' '.join(str(site.get(field) or '').upper().split()) for field in LISTING_FIELDS)
+
+def _absorb(merged: Dict, site: Dict):
+    """Union a site's list fields into merged and fill in the fields merged lacks"""
+    for field in LIST_FIELDS:
+        if field in site:
+            values = merged.setdefault(field, [])
+            merged[field] = values + [value for value in site[field] if value not in values]
+    for field, value in site.items():
+        if field not in PROVENANCE_FIELDS:
+            merged.setdefault(field, value)
+
+def merge_cluster(records: List[Record]) -> Dict:
+    """One site from a cluster of matching records, the first source's taking precedence"""
+    records = sorted(records, key=lambda record: (record.source, record.index))
+    merged = dict(records[0].site)
+
+    for record in records[1:]:
+        _absorb(merged, record.site)
+
+    # Coordinates from the best-located record
+    if merged.get('geocoding_failed'):
+        located = next((record for record in records if record.coords), None)
+        if located is not None:
+            merged['lat'], merged['lng'] = located.coords
+            merged.pop('geocoding_failed', None)
+
+    merged['sources'] = [record.origin for record in records]
+    return merged
+
+def score_source_pair(a: List[Record], b: List[Record]) -> List[Tuple[float, int, int]]:
+    """
+    Score the candidate pairs between two sources' records.
+
+    Returns:
+        (score, index in a, index in b) for pairs scoring at least REVIEW_THRESHOLD
+    """
+    records = a + b
+    weights = token_weights(records)
+    scored = []
+    for x, y in candidate_pairs(records):
+        pair_score = score(records[x], records[y], weights)
+        if pair_score >= REVIEW_THRESHOLD:
+            scored.append((pair_score, x, y - len(a)))
+    return scored
+
+def merge_sources(sources: List[Tuple[str, List[Dict]]],
+                  pair_scores: Optional[Dict[Tuple[int, int], List[Tuple[float, int, int]]]] = None
+                  ) -> Tuple[List[Dict], Dict]:
+    """
+    Merge sites from several sources, in priority order.
+
+    Args:
+        sources: (source name, sites) pairs; within a cluster, the earliest
+                 source's record is the base of the merged site
+        pair_scores: score_source_pair results by (source, source) position;
+                     pairs present are reused, missing ones are scored and added
+
+    Returns:
+        (merged sites, match report)
+    """
+    records = []
+    offsets = []
+    duplicates = Counter()
+    for source, (name, sites) in enumerate(sources):
+        offsets.append(len(records))
+        listed: Dict[Tuple[str, ...], Record] = {}
+        for index, site in enumerate(sites):
+            key = listing_key(site)
+            if key in listed:
+                _absorb(listed[key].site, site)
+                duplicates[name] += 1
+                continue
+            listed[key] = Record(source, name, index, dict(site))
+            records.append(listed[key])
+    offsets.append(len(records))
+
+    # Each pair of sources is scored on its own, so unchanged pairs can be reused
+    pair_scores = {} if pair_scores is None else pair_scores
+    scored = []
+    for i, j in combinations(range(len(sources)), 2):
+        if (i, j) not in pair_scores:
+            pair_scores[(i, j)] = score_source_pair(records[offsets[i]:offsets[i + 1]],
+                                                    records[offsets[j]:offsets[j + 1]])
+        scored.extend((pair_score, offsets[i] + a, offsets[j] + b) for pair_score, a, b in pair_scores[(i, j)])
+    scored.sort(reverse=True)
+
+    # Greedy clustering, best pairs first, never two records of one source in a cluster
+    cluster_of = list(range(len(records)))
+    members: Dict[int, List[int]] = {rid: [rid] for rid in range(len(records))}
+    matches, review = [], []
+    for pair_score, a, b in scored:
+        ca, cb = cluster_of[a], cluster_of[b]
+        if ca == cb:
+            continue
+        entry = {'score': round(pair_score, 3),
+                 'records': [_describe(records[a]), _describe(records[b])]}
+        sources_a = {records[rid].source for rid in members[ca]}
+        if pair_score < MATCH_THRESHOLD or any(records[rid].source in sources_a for rid in members[cb]):
+            review.append(entry)
+            continue
+        matches.append(entry)
+        # Keep the earliest record as the cluster's root, so merged sites stay in source order
+        ca, cb = min(ca, cb), max(ca, cb)
+        for rid in members[cb]:
+            cluster_of[rid] = ca
+        members[ca].extend(members.pop(cb))
+
+    merged = []
+    for rid, record in enumerate(records):
+        if cluster_of[rid] != rid:
+            continue
+        cluster = [records[member] for member in members[rid]]
+        merged.append(merge_cluster(cluster) if len(cluster) > 1 else dict(record.site))
+
+    report = {
+        'sources': {name: len(sites) for name, sites in sources},
+        'duplicates': dict(duplicates),
+        'scored_pairs': len(scored),
+        'merged_sites': len(merged),
+        'matches': matches,
+        'review': review,
+    }
+    return merged, report
+
+def _describe(record: Record) -> Dict:
+    return {'source': record.origin, 'index': record.index, 'name': record.site.get('name')}
+
+def merge_files(sources: List[Tuple[str, str]], output_file: str, report_file: Optional[str] = None) -> List[Dict]:
+    """
+    Merge source JSON files into output_file, optionally writing the match report.
+
+    Args:
+        sources: (source name, JSON file) pairs, in priority order
+    """
+    loaded = []
+    for name, filename in sources:
+        with open(filename, 'r') as f:
+            sites = json.load(f)
+        print(f"{name}: {len(sites)} sites from {filename}")
+        loaded.append((name, sites))
+
+    merged, report = merge_sources(loaded)
+
+    print(f"\n{'='*60}")
+    print("Merge complete!")
+    for name, count in report['duplicates'].items():
+        print(f"Repeated listings folded in {name}: {count}")
+    print(f"Pairs scoring {REVIEW_THRESHOLD} or more: {report['scored_pairs']}")
+    print(f"Matches merged: {len(report['matches'])}")
+    for match in report['matches']:
+        print(f"  {match['score']:.2f}  " + '  ==  '.join(f"[{r['source']}] {r['name']}" for r in match['records']))
+    print(f"Near misses for review: {len(report['review'])}")
+    print(f"Total sites in merged dataset: {len(merged)}")
+
+    print(f"\nSaving to {output_file}...")
+    with open(output_file, 'w') as f:
+        json.dump(merged, f, indent=2)
+    if report_file:
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Match report saved to {report_file}")
+    return merged
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge training site datasets, matching the same site across sources")
+    parser.add_argument('output_file', help="Merged JSON file")
+    parser.add_argument('sources', nargs='+', metavar='name=file',
+                        help="Source JSON files in priority order, e.g. acrrm=acrrm-all-sites-with-coords.json")
+    parser.add_argument('--report', help="Write the match report (matches and near misses) to this JSON file")
+    args = parser.parse_args()
+
+    sources = []
+    for spec in args.sources:
+        name, sep, filename = spec.partition('=')
+        if not sep:
+            parser.error(f"Source '{spec}' is not in name=file form")
+        sources.append((name, filename))
+
+    merge_files(sources, args.output_file, args.report)
+
+if __name__ == "__main__":
+    main()
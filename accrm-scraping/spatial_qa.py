@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Bulk spatial QA of site coordinates.
+
+Loads every site's coordinates into NumPy arrays and checks them all at
+once against two expectations:
+
+    state     the point lies inside its state's boundary (australian_states.geojson,
+              simplified outlines with the inhabited islands), allowing
+              STATE_TOLERANCE_KM for the simplification
+    expected  the point lies near its locality in the gazetteer, or within
+              its postcode's spread of the postcode centroid, allowing
+              MAX_EXPECTED_DISTANCE_KM; with the bundled gazetteer, built
+              from our own geocodes, this only finds sites at odds with
+              the rest of their locality (see gazetteer.py)
+
+Outliers are ranked by how far off they are and written as a JSON queue
+that regeocode.py takes with --queue. It matches them to the partitions'
+sites by name and state, patches the partitions and re-publishes:
+
+    python spatial_qa.py ../public/data/training-sites-full.json
+    python regeocode.py --queue training-sites-full.outliers.json
+
+Unlike the other scripts here, this one needs NumPy (pip install numpy).
+
+Point the SPATIAL_BOUNDARY_FILE environment variable at another GeoJSON
+file of state (Multi)Polygons, with a `state` property, to check against
+more detailed boundaries.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Only this script needs NumPy; the rest of the pipeline runs without it
+    raise ImportError("spatial_qa.py needs NumPy, which the other scrapers don't: pip install numpy") from None
+
+import gazetteer
+
+BOUNDARY_FILE = os.environ.get('SPATIAL_BOUNDARY_FILE',
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), 'australian_states.geojson'))
+
+# Points this far outside their state's simplified outline still pass
+STATE_TOLERANCE_KM = 25
+
+# Tolerance beyond a locality (or a postcode's own spread) before a point is flagged
+MAX_EXPECTED_DISTANCE_KM = 50
+
+# Points per block when measuring distances to every boundary edge, to bound memory
+DISTANCE_BLOCK = 4096
+
+EARTH_RADIUS_KM = gazetteer.EARTH_RADIUS_KM
+
+def load_boundaries(filename: str = BOUNDARY_FILE) -> Dict[str, List[np.ndarray]]:
+    """State -> outer rings of its polygons, each an (n, 2) array of lng, lat"""
+    with open(filename, 'r') as f:
+        collection = json.load(f)
+
+    boundaries: Dict[str, List[np.ndarray]] = {}
+    for feature in collection['features']:
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        rings = boundaries.setdefault(feature['properties']['state'].upper(), [])
+        rings.extend(np.asarray(polygon[0], dtype=float) for polygon in polygons)
+    return boundaries
+
+def haversine_km(lat1: np.ndarray, lng1: np.ndarray, lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+    """Element-wise great-circle distances in km (NaN where any input is NaN)"""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def points_in_rings(lngs: np.ndarray, lats: np.ndarray, rings: List[np.ndarray]) -> np.ndarray:
+    """Even-odd ray casting of every point against every edge of the rings"""
+    inside = np.zeros(len(lngs), dtype=bool)
+    for ring in rings:
+        x1, y1 = ring[:-1, 0], ring[:-1, 1]
+        x2, y2 = ring[1:, 0], ring[1:, 1]
+        for ex1, ey1, ex2, ey2 in zip(x1, y1, x2, y2):
+            crosses = (ey1 > lats) != (ey2 > lats)
+            if not crosses.any():
+                continue
+            x_at = ex1 + (lats - ey1) * (ex2 - ex1) / (ey2 - ey1 if ey2 != ey1 else 1e-12)
+            inside ^= crosses & (lngs < x_at)
+    return inside
+
+def distance_to_rings_km(lngs: np.ndarray, lats: np.ndarray, rings: List[np.ndarray]) -> np.ndarray:
+    """Distance in km from every point to the nearest edge of the rings"""
+    edges = np.concatenate([np.concatenate([ring[:-1], ring[1:]], axis=1) for ring in rings])
+    if len(lngs) > DISTANCE_BLOCK:
+        return np.concatenate([_distance_to_edges_km(lngs[i:i + DISTANCE_BLOCK], lats[i:i + DISTANCE_BLOCK], edges)
+                               for i in range(0, len(lngs), DISTANCE_BLOCK)])
+    return _distance_to_edges_km(lngs, lats, edges)
+
+def _distance_to_edges_km(lngs: np.ndarray, lats: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    # Equirectangular projection around each point is plenty at these distances
+    kx = EARTH_RADIUS_KM * np.radians(1) * np.cos(np.radians(lats))[:, None]
+    ky = EARTH_RADIUS_KM * np.radians(1)
+
+    ax = (edges[None, :, 0] - lngs[:, None]) * kx
+    ay = (edges[None, :, 1] - lats[:, None]) * ky
+    bx = (edges[None, :, 2] - lngs[:, None]) * kx
+    by = (edges[None, :, 3] - lats[:, None]) * ky
+
+    dx, dy = bx - ax, by - ay
+    length2 = np.maximum(dx * dx + dy * dy, 1e-12)
+    t = np.clip(-(ax * dx + ay * dy) / length2, 0, 1)
+    return np.hypot(ax + t * dx, ay + t * dy).min(axis=1)
+
+def site_arrays(sites: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """lat and lng arrays for the sites, NaN where a site has no coordinates"""
+    lats = np.array([site.get('lat', np.nan) for site in sites], dtype=float)
+    lngs = np.array([site.get('lng', np.nan) for site in sites], dtype=float)
+    return lats, lngs
+
+def expected_positions(sites: List[Dict], locations: gazetteer.Gazetteer) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Where each site should be according to the gazetteer.
+
+    Returns:
+        lat, lng and radius (km) arrays: the site's locality (radius 0), else
+        its postcode centroid (radius: the postcode's spread), else NaN
+    """
+    known: Dict[Tuple[str, str, str], Tuple[float, float, float]] = {}
+    expected = np.full((len(sites), 3), np.nan)
+    for i, site in enumerate(sites):
+        key = (site.get('city') or '', site.get('state') or '', str(site.get('postcode') or ''))
+        if key not in known:
+            coords = locations.locality(key[0], key[1]) if key[0] and key[1] in gazetteer.STATE_CODES else None
+            if coords:
+                known[key] = (coords[0], coords[1], 0.0)
+            else:
+                centroid = locations.postcode(key[2])
+                known[key] = ((centroid[0], centroid[1], locations.postcode_radius(key[2]))
+                              if centroid else (np.nan, np.nan, np.nan))
+        expected[i] = known[key]
+    return expected[:, 0], expected[:, 1], expected[:, 2]
+
+def check(sites: List[Dict], boundaries: Dict[str, List[np.ndarray]] = None,
+          locations: gazetteer.Gazetteer = None) -> List[Dict]:
+    """
+    Check every site's coordinates.
+
+    Returns:
+        Outliers, worst first, as dicts with the site's index, name, state,
+        coordinates, the reasons it was flagged and a score (km off)
+    """
+    boundaries = boundaries if boundaries is not None else load_boundaries()
+    locations = locations if locations is not None else gazetteer.default()
+
+    lats, lngs = site_arrays(sites)
+    states = np.array([(site.get('state') or '').upper().strip() for site in sites])
+    missing = np.isnan(lats) | np.isnan(lngs)
+
+    # Distance outside the state's boundary (0 inside, NaN if the state is unknown)
+    outside_km = np.full(len(sites), np.nan)
+    for state, rings in boundaries.items():
+        rows = np.flatnonzero((states == state) & ~missing)
+        if not len(rows):
+            continue
+        inside = points_in_rings(lngs[rows], lats[rows], rings)
+        outside_km[rows] = 0.0
+        outside = rows[~inside]
+        if len(outside):
+            outside_km[outside] = distance_to_rings_km(lngs[outside], lats[outside], rings)
+
+    # Distance beyond the expected locality or postcode spread (NaN if unknown)
+    exp_lats, exp_lngs, radii = expected_positions(sites, locations)
+    expected_km = haversine_km(lats, lngs, exp_lats, exp_lngs) - radii
+
+    with np.errstate(invalid='ignore'):
+        bad_state = outside_km > STATE_TOLERANCE_KM
+        bad_expected = expected_km > MAX_EXPECTED_DISTANCE_KM
+    flagged = missing | bad_state | bad_expected
+
+    scores = np.fmax(np.where(bad_state, outside_km, 0), np.where(bad_expected, expected_km, 0))
+    scores[missing] = np.inf
+    order = np.flatnonzero(flagged)
+    order = order[np.argsort(-scores[order], kind='stable')]
+
+    outliers = []
+    for i in order:
+        reasons = []
+        if missing[i]:
+            reasons.append('no coordinates')
+        if bad_state[i]:
+            reasons.append(f"{outside_km[i]:.0f} km outside {states[i]}")
+        if bad_expected[i]:
+            reasons.append(f"{expected_km[i]:.0f} km from its locality or postcode")
+        outliers.append({
+            'index': int(i),
+            'name': sites[i].get('name'),
+            'state': sites[i].get('state'),
+            'lat': None if missing[i] else float(lats[i]),
+            'lng': None if missing[i] else float(lngs[i]),
+            'score': None if missing[i] else round(float(scores[i]), 1),
+            'reasons': reasons,
+        })
+    return outliers
+
+def outliers_file_for(input_file: str) -> str:
+    """Outliers queue for a sites file, kept here rather than next to published data"""
+    name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{name}.outliers.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check all site coordinates against their state and postcode")
+    parser.add_argument('input_file', help="Sites JSON file")
+    parser.add_argument('--output', help="Ranked outliers JSON (default: <input name>.outliers.json here)")
+    parser.add_argument('--top', type=int, default=20, help="Outliers to print (default: 20)")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="Check the sites repeated this many times, to time larger datasets")
+    args = parser.parse_args()
+
+    with open(args.input_file, 'r') as f:
+        sites = json.load(f)
+
+    boundaries = load_boundaries()
+    locations = gazetteer.default()
+    checked = sites * args.repeat
+
+    start = time.perf_counter()
+    outliers = check(checked, boundaries, locations)
+    elapsed = time.perf_counter() - start
+    print(f"Checked {len(checked)} sites in {elapsed:.3f}s: {len(outliers)} outliers")
+
+    if args.repeat > 1:
+        return
+
+    for outlier in outliers[:args.top]:
+        print(f"  [{outlier['index']}] {outlier['name']} ({outlier['state']}): {'; '.join(outlier['reasons'])}")
+
+    output_file = args.output or outliers_file_for(args.input_file)
+    with open(output_file, 'w') as f:
+        json.dump(outliers, f, indent=2)
+    print(f"\nSaved ranked outliers to {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Tests for columnar's round trip.
+
+    python -m pytest test_columnar.py
+"""
+
+import json
+
+import columnar
+import paths
+
+def _assert_round_trip(sites):
+    decoded = columnar.decode(json.loads(columnar.dumps(columnar.encode(sites))))
+    assert len(decoded) == len(sites)
+    for site, back in zip(sites, decoded):
+        site = {field: value for field, value in site.items() if value is not None}
+        assert set(back) == set(site)
+        for field, value in site.items():
+            if field in columnar.COORD_FIELDS:
+                assert abs(back[field] - value) < 1 / columnar.COORD_SCALE
+            else:
+                assert back[field] == value, (site.get('name'), field)
+
+def test_list_order_is_kept():
+    sites = [{'name': 'A', 'sources': ['ACRRM', 'RANZCOG']},
+             {'name': 'B', 'sources': ['RANZCOG', 'ACRRM']},
+             {'name': 'C', 'sources': ['ACRRM']}]
+    _assert_round_trip(sites)
+
+def test_ordered_lists_still_use_masks():
+    sites = [{'name': 'A', 'rotations': ['Emergency', 'Obstetrics']},
+             {'name': 'B', 'rotations': ['Emergency']}]
+    assert columnar.encode(sites)['columns']['rotations']['kind'] == 'set'
+    _assert_round_trip(sites)
+
+def test_published_dataset_round_trips():
+    with open(paths.PUBLISHED, 'r') as f:
+        sites = json.load(f)
+    _assert_round_trip(sites)
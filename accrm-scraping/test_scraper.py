@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 """Test the scraper on first page only"""
 
+import os
 import requests
 from bs4 import BeautifulSoup
 import json
 
+import paths
+
 url = "https://mycollege.acrrm.org.au/search/find-training-post"
 
 headers = {
@@ -21,7 +24,7 @@ print(f"Content length: {len(response.text)}")
 soup = BeautifulSoup(response.text, 'html.parser')
 
 # Save HTML for inspection
-with open('/Users/fergaltemple/page_source.html', 'w', encoding='utf-8') as f:
+with open(os.path.join(paths.SCRAPING_DIR, 'page_source.html'), 'w', encoding='utf-8') as f:
     f.write(soup.prettify())
 print("HTML saved to page_source.html")
 
@@ -1,9 +1,6 @@
 #!/usr/bin/env python3
 """Test scraper on first 3 pages"""
 
-import sys
-sys.path.insert(0, '/Users/fergaltemple')
-
 from scrape_acrrm import fetch_page, parse_page
 import json
 
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for site_merge's matching rules.
+
+    python -m pytest test_site_merge.py
+"""
+
+import site_merge
+
+def _acrrm(name, city, postcode, lat, lng, state='NSW'):
+    return {'name': name, 'type': 'Hospital', 'state': state, 'city': city, 'postcode': postcode,
+            'lat': lat, 'lng': lng, 'trainingTypes': ['Core Generalist Training']}
+
+def _college(name, lat=-25.2744, lng=133.7751, state='NSW', located=True):
+    site = {'name': name, 'source': 'ANZCA', 'sourceUrl': 'https://www.anzca.edu.au/',
+            'type': 'Hospital', 'state': state, 'lat': lat, 'lng': lng, 'trainingTypes': ['AST - Anaesthetics']}
+    if not located:
+        site['geocoding_failed'] = True
+    return site
+
+# Unrelated sites, so common words like BASE and HOSPITAL get a realistically low weight
+OTHER_SITES = [_acrrm(f"{town.title()} Base Hospital", town, '6000', -31.95 - i, 115.86, 'WA')
+               for i, town in enumerate(['ALBANY', 'BUNBURY', 'BROOME', 'CARNARVON', 'ESPERANCE', 'KALGOORLIE'])]
+
+def _merge(acrrm, anzca):
+    return site_merge.merge_sources([('acrrm', acrrm + OTHER_SITES), ('anzca', anzca)])
+
+def test_inactive_site_is_not_merged_into_active_one():
+    merged, report = _merge([_acrrm('Lismore Base Hospital', 'LISMORE', '2480', -28.8107, 153.2896)],
+                            [_college('Lismore Base Hospital (Inactive)', located=False)])
+    assert report['matches'] == []
+    assert len(merged) == 2 + len(OTHER_SITES)
+
+def test_inactive_is_a_name_token():
+    record = site_merge.Record(0, 'anzca', 0, _college('Launceston General Hospital (Inactive)'))
+    assert record.inactive
+    assert site_merge.INACTIVE_TOKEN in record.tokens
+
+def test_inactive_sites_match_each_other():
+    _, report = _merge([_acrrm('Launceston General Hospital (Inactive)', 'LAUNCESTON', '7250', -41.4451, 147.1367, 'TAS')],
+                       [_college('Launceston General Hospital (Inactive)', -41.4452, 147.1369, 'TAS')])
+    assert len(report['matches']) == 1
+
+def test_similar_name_at_another_location_is_only_reviewed():
+    # Tweed Valley Hospital (Cudgen) and The Tweed Hospital (Tweed Heads) are 10 km apart
+    merged, report = _merge([_acrrm('Tweed Valley Hospital', 'CUDGEN', '2487', -28.2640, 153.5665)],
+                            [_college('The Tweed Hospital', -28.1769, 153.5455)])
+    assert report['matches'] == []
+    assert [entry['score'] for entry in report['review']] == [site_merge.REVIEW_THRESHOLD]
+    assert len(merged) == 2 + len(OTHER_SITES)
+
+def test_similar_name_without_location_is_only_reviewed():
+    _, report = _merge([_acrrm('Tweed Valley Hospital', 'CUDGEN', '2487', -28.2640, 153.5665)],
+                       [_college('The Tweed Hospital', located=False)])
+    assert report['matches'] == []
+
+def test_similar_name_nearby_is_merged():
+    merged, report = _merge([_acrrm('Gympie General Hospital', 'GYMPIE', '4570', -26.1981, 152.6664, 'QLD')],
+                            [_college('Gympie Hospital', -26.1990, 152.6650, 'QLD')])
+    assert len(report['matches']) == 1
+    assert merged[0]['sources'] == ['ACRRM', 'ANZCA']
+
+def test_merged_site_keeps_its_own_provenance():
+    acrrm = dict(_acrrm('Logan Hospital', 'MEADOWBROOK', '4131', -27.6634, 153.1405, 'QLD'),
+                 source='ACRRM', sourceUrl='https://www.acrrm.org.au/')
+    merged, report = _merge([acrrm], [_college('Logan Hospital', -27.6637, 153.1402, 'QLD')])
+    assert len(report['matches']) == 1
+    assert (merged[0]['source'], merged[0]['sourceUrl']) == ('ACRRM', 'https://www.acrrm.org.au/')
+
+def test_merged_site_without_provenance_gains_none():
+    merged, _ = _merge([_acrrm('Logan Hospital', 'MEADOWBROOK', '4131', -27.6634, 153.1405, 'QLD')],
+                       [_college('Logan Hospital', -27.6637, 153.1402, 'QLD')])
+    assert 'source' not in merged[0] and 'sourceUrl' not in merged[0]
+    assert merged[0]['sources'] == ['ACRRM', 'ANZCA']
+
+def test_similar_name_naming_the_locality_is_merged():
+    _, report = _merge([_acrrm('Broken Hill Base Hospital', 'BROKEN HILL', '2880', -31.9590, 141.4583)],
+                       [_college('Broken Hill Hospital', located=False)])
+    assert len(report['matches']) == 1
+
+def test_same_name_needs_no_location_evidence():
+    _, report = _merge([_acrrm('Mount Isa Hospital', 'MOUNT ISA', '4825', -20.7256, 139.4927, 'QLD')],
+                       [_college('Mt Isa Hospital', state='QLD', located=False)])
+    assert len(report['matches']) == 1
+
+def test_repeated_listing_in_one_source_is_folded():
+    site = _college('John Hunter Hospital', -32.9225, 151.6932)
+    repeat = dict(site, trainingTypes=['AST - Anaesthetics', 'Provisional Fellowship'])
+    merged, report = _merge([], [site, repeat])
+    assert report['duplicates'] == {'anzca': 1}
+    assert len(merged) == 1 + len(OTHER_SITES)
+    assert merged[-1]['trainingTypes'] == ['AST - Anaesthetics', 'Provisional Fellowship']
+
+def test_same_name_at_another_address_is_kept():
+    merged, report = _merge([_acrrm('Royal Flying Doctor Service', 'DUBBO', '2830', -32.2569, 148.6011),
+                             _acrrm('Royal Flying Doctor Service', 'BROKEN HILL', '2880', -31.9539, 141.4539)], [])
+    assert report['duplicates'] == {}
+    assert len(merged) == 2 + len(OTHER_SITES)
@@ -1,44 +1,47 @@
 #!/usr/bin/env python3
 """
 Update O&G training type labels to merge them into a single 'AST - O&G' category.
+
+By default the labels are updated in the dataset_store partitions, which
+are then re-published; the pipeline's store stages apply the same update
+on the way in. A sites file can be named instead, to be updated in place.
+
+    python update_og_labels.py
+    python update_og_labels.py some-sites.json
 """
 
+import argparse
 import json
 
-def update_training_types(input_file: str, output_file: str):
-    """
-    Update O&G training type labels to 'AST - O&G'.
+import dataset_store
+import paths
 
-    Args:
-        input_file: Path to input JSON file
-        output_file: Path to output JSON file
-    """
-    # O&G training types to merge
-    og_types = {
-        'Advanced Practical Training Programme (APTP)',
-        "Core Women's Health (CWH)",
-        'O&G Training',
-        'Practical Training Programme (PTP)'
-    }
+# O&G training types to merge
+OG_TYPES = {
+    'Advanced Practical Training Programme (APTP)',
+    "Core Women's Health (CWH)",
+    'O&G Training',
+    'Practical Training Programme (PTP)'
+}
 
-    print(f"Loading sites from {input_file}...")
-    with open(input_file, 'r') as f:
-        sites = json.load(f)
-
-    print(f"Found {len(sites)} sites")
+def merge_og_types(sites: list) -> int:
+    """
+    Replace O&G training type labels with 'AST - O&G' in place.
 
-    # Count sites affected
+    Returns:
+        Number of sites updated
+    """
     sites_updated = 0
 
     for site in sites:
         if 'trainingTypes' in site and site['trainingTypes']:
             # Check if any O&G types are present
-            has_og = any(t in og_types for t in site['trainingTypes'])
+            has_og = any(t in OG_TYPES for t in site['trainingTypes'])
 
             if has_og:
                 # Remove all O&G types and add single 'AST - O&G' label
                 site['trainingTypes'] = [
-                    t for t in site['trainingTypes'] if t not in og_types
+                    t for t in site['trainingTypes'] if t not in OG_TYPES
                 ]
 
                 # Add AST - O&G if not already there
@@ -47,6 +50,25 @@ def update_training_types(input_file: str, output_file: str):
 
                 sites_updated += 1
 
+    return sites_updated
+
+def update_training_types(input_file: str, output_file: str):
+    """
+    Update O&G training type labels to 'AST - O&G'.
+
+    Args:
+        input_file: Path to input JSON file
+        output_file: Path to output JSON file
+    """
+    print(f"Loading sites from {input_file}...")
+    with open(input_file, 'r') as f:
+        sites = json.load(f)
+
+    print(f"Found {len(sites)} sites")
+
+    # Count sites affected
+    sites_updated = merge_og_types(sites)
+
     print(f"\nUpdated {sites_updated} sites")
     print(f"Saving to {output_file}...")
 
@@ -65,10 +87,45 @@ def update_training_types(input_file: str, output_file: str):
     for t in sorted(all_types):
         print(f"  - {t}")
 
-if __name__ == "__main__":
-    base_path = "/Users/fergaltemple/Documents/Utilities/Software/acrrmTrainingMap"
+def update_partitions():
+    """
+    Update the labels in every dataset_store partition, then re-publish.
 
-    input_file = f"{base_path}/public/data/training-sites-full.json"
-    output_file = f"{base_path}/public/data/training-sites-full.json"
+    The published dataset is rebuilt from the partitions, so edits to it
+    directly would be lost at the next publish.
+    """
+    updated = []
+    all_types = set()
+    for name in dataset_store.partition_order(dataset_store.load_manifest()):
+        sites = dataset_store.load(name)
+        sites_updated = merge_og_types(sites)
+        print(f"{name}: updated {sites_updated} of {len(sites)} sites")
+        if sites_updated:
+            dataset_store.put(name, sites)
+            updated.append(name)
+        for site in sites:
+            all_types.update(site.get('trainingTypes') or [])
+
+    if updated:
+        dataset_store.publish(paths.PUBLISHED, paths.MERGE_REPORT)
+    else:
+        print("\nNothing to update")
 
-    update_training_types(input_file, output_file)
+    print(f"\nAll training types in dataset:")
+    for t in sorted(all_types):
+        print(f"  - {t}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the O&G training type labels into 'AST - O&G'")
+    parser.add_argument('input_file', nargs='?',
+                        help="Sites JSON file to update in place (default: every dataset_store partition, "
+                             "then re-publish)")
+    args = parser.parse_args()
+
+    if args.input_file:
+        update_training_types(args.input_file, args.input_file)
+    else:
+        update_partitions()
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo } from 'react';
 import Sidebar from './components/Sidebar';
 import MapView from './components/MapView';
 import { trackPageView, trackEvent } from './utils/analytics';
+import { loadSites } from './utils/siteData';
+import { matchFilters, selectSites, countBits } from './utils/filterIndex';
 import './styles/App.css';
 
 function App() {
   const [sites, setSites] = useState([]);
+  const [filterIndex, setFilterIndex] = useState(null);
   const [filters, setFilters] = useState({
     trainingTypes: [],
     rotations: [],
@@ -22,19 +25,18 @@ function App() {
       timestamp: new Date().toISOString()
     });
 
-    // Load training sites data - now using full dataset with 921+ sites
+    // Load training sites data - the compact columnar form of the full dataset
     // Use import.meta.env.BASE_URL to work with both dev and GitHub Pages
     const basePath = import.meta.env.BASE_URL;
-    fetch(`${basePath}data/training-sites-full.json`)
-      .then(response => response.json())
-      .then(data => {
-        // Data is already an array, not nested under trainingSites
+    loadSites(basePath)
+      .then(({ sites: data, filterIndex }) => {
         // Generate IDs for sites that don't have them
         const sitesWithIds = data.map((site, index) => ({
           ...site,
           id: site.id || `site-${index}`
         }));
         setSites(sitesWithIds);
+        setFilterIndex(filterIndex);
 
         // Track data load event
         trackEvent('Data Loaded', {
@@ -45,10 +47,28 @@ function App() {
       .catch(error => console.error('Error loading training sites:', error));
   }, []);
 
+  // Filter once, with the bitmap index: the map gets the matching sites,
+  // the sidebar count comes straight from the bitset
+  const matches = useMemo(
+    () => (filterIndex ? matchFilters(filterIndex, filters) : null),
+    [filterIndex, filters]
+  );
+  const filteredSites = useMemo(
+    () => (matches ? selectSites(sites, matches) : sites),
+    [sites, matches]
+  );
+  const filteredCount = matches ? countBits(matches) : sites.length;
+
   return (
     <div className="app-container">
-      <Sidebar filters={filters} setFilters={setFilters} sites={sites} />
-      <MapView sites={sites} filters={filters} />
+      <Sidebar
+        filters={filters}
+        setFilters={setFilters}
+        sites={sites}
+        filterIndex={filterIndex}
+        filteredCount={filteredCount}
+      />
+      <MapView sites={filteredSites} />
     </div>
   );
 }
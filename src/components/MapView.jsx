@@ -1,4 +1,4 @@
-import React, { useMemo } from 'react';
+import React from 'react';
 import { MapContainer, TileLayer, Marker, Popup } from 'react-leaflet';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
@@ -29,18 +29,8 @@ const createCustomIcon = (trainingTypes) => {
   });
 };
 
-const MapView = ({ sites, filters }) => {
-  // Filter sites based on selected filters
-  const filteredSites = useMemo(() => {
-    return sites.filter(site => {
-      if (filters.trainingTypes.length > 0 && !filters.trainingTypes.some(type => site.trainingTypes?.includes(type))) return false;
-      if (filters.rotations.length > 0 && !filters.rotations.some(rotation => site.rotations?.includes(rotation))) return false;
-      if (filters.mmm.length > 0 && !filters.mmm.includes(site.mmm)) return false;
-      if (filters.siteTypes.length > 0 && !filters.siteTypes.includes(site.type)) return false;
-      return true;
-    });
-  }, [sites, filters]);
-
+// Sites arrive already filtered (App filters with the bitmap index)
+const MapView = ({ sites }) => {
   // Australia center coordinates
   const australiaCenter = [-25.2744, 133.7751];
 
@@ -57,7 +47,7 @@ const MapView = ({ sites, filters }) => {
           url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
         />
 
-        {filteredSites.map(site => (
+        {sites.map(site => (
           <Marker
             key={site.id}
             position={[site.lat, site.lng]}
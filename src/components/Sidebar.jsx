@@ -1,7 +1,8 @@
-import React, { useState } from 'react';
+import React, { useState, useMemo } from 'react';
 import { trackFilterUsage } from '../utils/analytics';
+import { filterValues } from '../utils/filterIndex';
 
-const Sidebar = ({ filters, setFilters, sites }) => {
+const Sidebar = ({ filters, setFilters, sites, filterIndex, filteredCount }) => {
   // State to track which filter sections are collapsed
   const [collapsed, setCollapsed] = useState({
     trainingTypes: true,
@@ -56,19 +57,11 @@ const Sidebar = ({ filters, setFilters, sites }) => {
     });
   };
 
-  // Extract unique values from sites
-  const trainingTypes = [...new Set(sites.flatMap(site => site.trainingTypes || []))].sort();
-  const rotations = [...new Set(sites.flatMap(site => site.rotations || []))].sort();
+  // Filter options are the values the index has bitsets for
+  const trainingTypes = useMemo(() => filterValues(filterIndex, 'trainingTypes'), [filterIndex]);
+  const rotations = useMemo(() => filterValues(filterIndex, 'rotations'), [filterIndex]);
   const mmmLevels = [1, 2, 3, 4, 5, 6, 7];
-  const siteTypes = [...new Set(sites.map(site => site.type))].sort();
-
-  const filteredSitesCount = sites.filter(site => {
-    if (filters.trainingTypes.length > 0 && !filters.trainingTypes.some(type => site.trainingTypes?.includes(type))) return false;
-    if (filters.rotations.length > 0 && !filters.rotations.some(rotation => site.rotations?.includes(rotation))) return false;
-    if (filters.mmm.length > 0 && !filters.mmm.includes(site.mmm)) return false;
-    if (filters.siteTypes.length > 0 && !filters.siteTypes.includes(site.type)) return false;
-    return true;
-  }).length;
+  const siteTypes = useMemo(() => filterValues(filterIndex, 'siteTypes'), [filterIndex]);
 
   return (
     <div className="sidebar">
@@ -239,7 +232,7 @@ const Sidebar = ({ filters, setFilters, sites }) => {
       </div>
 
       <div className="stats">
-        <p><strong>{filteredSitesCount}</strong> of <strong>{sites.length}</strong> sites displayed</p>
+        <p><strong>{filteredCount}</strong> of <strong>{sites.length}</strong> sites displayed</p>
       </div>
 
       <div className="data-disclaimer">
@@ -0,0 +1,112 @@
+/**
+ * Filtering with the bitmap index published by accrm-scraping/filter_index.py.
+ * Each filter value maps to a bitset of the sites having it (bit i = site i),
+ * so a filter combination is an OR of bitsets within each filter and an AND
+ * across filters.
+ */
+
+// App filter -> indexed site field
+const FILTER_FIELDS = {
+  trainingTypes: 'trainingTypes',
+  rotations: 'rotations',
+  mmm: 'mmm',
+  siteTypes: 'type'
+};
+
+const decodeBits = (encoded, words) => {
+  const bytes = Uint8Array.from(atob(encoded), c => c.charCodeAt(0));
+  const view = new DataView(bytes.buffer);
+  const bits = new Uint32Array(words);
+  for (let i = 0; i < words; i++) bits[i] = view.getUint32(i * 4, true);
+  return bits;
+};
+
+/**
+ * Decode the index embedded in the columnar data file
+ * @param {Object} index - The payload's `index` section
+ * @returns {Object} { count, words, fields: { field: Map(value -> Uint32Array) } }
+ */
+export const decodeFilterIndex = (index) => {
+  const words = Math.ceil(index.count / 32);
+  const fields = {};
+  for (const [field, bitsets] of Object.entries(index.fields)) {
+    fields[field] = new Map(Object.entries(bitsets).map(([value, encoded]) => [value, decodeBits(encoded, words)]));
+  }
+  return { count: index.count, words, fields };
+};
+
+/**
+ * Values a filter can take, sorted (MMM levels as numbers)
+ * @param {Object} filterIndex - Decoded filter index
+ * @param {string} category - App filter name
+ * @returns {Array} Values
+ */
+export const filterValues = (filterIndex, category) => {
+  const bitsets = filterIndex?.fields[FILTER_FIELDS[category]];
+  if (!bitsets) return [];
+  const values = [...bitsets.keys()];
+  return category === 'mmm' ? values.map(Number).sort((a, b) => a - b) : values.sort();
+};
+
+/**
+ * Sites matching the filters as a bitset
+ * @param {Object} filterIndex - Decoded filter index
+ * @param {Object} filters - Selected values per app filter
+ * @returns {Uint32Array|null} Bitset, or null when no filter is active
+ */
+export const matchFilters = (filterIndex, filters) => {
+  let matches = null;
+  for (const [category, field] of Object.entries(FILTER_FIELDS)) {
+    const selected = filters[category];
+    if (!selected || selected.length === 0) continue;
+
+    const bitsets = filterIndex.fields[field] || new Map();
+    const union = new Uint32Array(filterIndex.words);
+    for (const value of selected) {
+      const bits = bitsets.get(String(value));
+      if (!bits) continue;
+      for (let i = 0; i < union.length; i++) union[i] |= bits[i];
+    }
+
+    if (matches === null) {
+      matches = union;
+    } else {
+      for (let i = 0; i < matches.length; i++) matches[i] &= union[i];
+    }
+  }
+  return matches;
+};
+
+/**
+ * Number of sites in a bitset
+ * @param {Uint32Array} bits - Bitset
+ * @returns {number} Count
+ */
+export const countBits = (bits) => {
+  let count = 0;
+  for (let word of bits) {
+    word -= (word >>> 1) & 0x55555555;
+    word = (word & 0x33333333) + ((word >>> 2) & 0x33333333);
+    count += (((word + (word >>> 4)) & 0x0f0f0f0f) * 0x01010101) >>> 24;
+  }
+  return count;
+};
+
+/**
+ * The sites whose bits are set
+ * @param {Array<Object>} sites - Sites in index order
+ * @param {Uint32Array} bits - Bitset
+ * @returns {Array<Object>} Selected sites
+ */
+export const selectSites = (sites, bits) => {
+  const selected = [];
+  for (let i = 0; i < bits.length; i++) {
+    let word = bits[i];
+    while (word !== 0) {
+      const bit = 31 - Math.clz32(word & -word);
+      selected.push(sites[i * 32 + bit]);
+      word &= word - 1;
+    }
+  }
+  return selected;
+};
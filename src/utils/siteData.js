@@ -0,0 +1,79 @@
+/**
+ * Decoder for the columnar training sites file written by
+ * accrm-scraping/columnar.py (see its docstring for the format).
+ */
+
+import { decodeFilterIndex } from './filterIndex';
+
+const FORMAT = 'training-sites-columnar';
+const VERSION = 1;
+
+/**
+ * Decode a columnar payload into an array of site objects
+ * @param {Object} data - Parsed training-sites-full.columnar.json
+ * @returns {Array<Object>} Sites, as in training-sites-full.json
+ */
+export const decodeSites = (data) => {
+  if (data.format !== FORMAT || data.version !== VERSION) {
+    throw new Error(`Not a version ${VERSION} ${FORMAT} file`);
+  }
+
+  const { strings, coordScale, columns } = data;
+  const sites = Array.from({ length: data.count }, () => ({}));
+
+  for (const [field, column] of Object.entries(columns)) {
+    const { kind, rows, values } = column;
+    if (kind === 'flag') {
+      for (const row of rows) sites[row][field] = true;
+      continue;
+    }
+
+    // Sites sharing a mask share one (frozen) array
+    const vocab = kind === 'set' ? column.vocab.map(i => strings[i]) : null;
+    const sets = new Map();
+    const decodeSet = (mask) => {
+      if (!sets.has(mask)) {
+        sets.set(mask, Object.freeze(vocab.filter((_, bit) => mask & (1 << bit))));
+      }
+      return sets.get(mask);
+    };
+
+    for (let i = 0; i < values.length; i++) {
+      const value = values[i];
+      if (value === null || (value === -1 && (kind === 'string' || kind === 'set'))) continue;
+      const row = rows ? rows[i] : i;
+      switch (kind) {
+        case 'coord':
+          sites[row][field] = value / coordScale;
+          break;
+        case 'string':
+          sites[row][field] = strings[value];
+          break;
+        case 'set':
+          sites[row][field] = decodeSet(value);
+          break;
+        case 'list':
+          sites[row][field] = value.map(index => strings[index]);
+          break;
+        default:
+          sites[row][field] = value;
+      }
+    }
+  }
+
+  return sites;
+};
+
+/**
+ * Fetch and decode the published training sites and their filter index
+ * @param {string} basePath - Base URL the app is served from
+ * @returns {Promise<Object>} { sites, filterIndex }
+ */
+export const loadSites = async (basePath) => {
+  const response = await fetch(`${basePath}data/training-sites-full.columnar.json`);
+  if (!response.ok) {
+    throw new Error(`Failed to load training sites (${response.status})`);
+  }
+  const data = await response.json();
+  return { sites: decodeSites(data), filterIndex: decodeFilterIndex(data.index) };
+};